@@ -8,50 +8,94 @@ Usage:
     print(result.success)  # True
 """
 
+import importlib
 import os
-import json
-import requests
-from typing import Optional, Dict, Any, Union
-from dataclasses import dataclass
+import threading
+from typing import Optional, Dict, Any, Iterator, Union, TYPE_CHECKING
+
+from ._version import __version__
+from ._protocol import DEFAULT_BASE_URL, DEFAULT_TIMEOUT, DEFAULT_POOL_SIZE
+from .errors import AgentPayError
+from .models import PaymentResult
+
+if TYPE_CHECKING:  # pragma: no cover
+    from datetime import date, datetime
+    from .batch import BatchItem, pay_many
+    from .breaker import CircuitBreaker
+    from .client import Client
+    from .deadline import Deadline
+    from .history import Transaction
+    from .limitscache import SpendingLimits
+    from .policy import Policy
+    from .ratelimit import RateLimiter
+    from .profile import Profiler, RequestProfile
+    from .retry import RetryPolicy, DEFAULT_RETRY
+
+__all__ = [
+    "configure", "pay", "pay_many", "transactions", "limits", "get_client",
+    "Client", "PaymentResult", "BatchItem", "Transaction", "SpendingLimits", "Policy", "AgentPayError",
+    "RetryPolicy", "Deadline", "CircuitBreaker", "RateLimiter", "Profiler", "RequestProfile",
+]
+
+# Loaded on first attribute access, so "import agentpay" (and importing
+# PaymentResult / AgentPayError) never pulls in requests or urllib3
+_LAZY_ATTRIBUTES = {
+    "Client": ".client",
+    "BatchItem": ".batch",
+    "pay_many": ".batch",
+    "CircuitBreaker": ".breaker",
+    "Deadline": ".deadline",
+    "Transaction": ".history",
+    "SpendingLimits": ".limitscache",
+    "Policy": ".policy",
+    "RateLimiter": ".ratelimit",
+    "Profiler": ".profile",
+    "RequestProfile": ".profile",
+    "RetryPolicy": ".retry",
+    "DEFAULT_RETRY": ".retry",
+}
+_LAZY_SUBMODULES = ("events", "ledger", "merchant", "metrics", "testing")
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(module, __name__), name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_SUBMODULES))
 
-__version__ = "0.1.0"
-__all__ = ["configure", "pay", "PaymentResult", "AgentPayError"]
 
 # Global configuration
 _config = {
     "token": None,
-    "base_url": "https://api.agentpay.org",  # Production URL
-    "timeout": 30
+    "base_url": DEFAULT_BASE_URL,  # Production URL
+    "timeout": DEFAULT_TIMEOUT,
+    "pool_size": DEFAULT_POOL_SIZE,
+    "retry": None,  # None = DEFAULT_RETRY
+    "policy": None,
+    "rate_limiter": None
 }
 
-class AgentPayError(Exception):
-    """Base exception for AgentPay SDK errors"""
-    def __init__(self, message: str, code: Optional[str] = None, details: Optional[Dict] = None):
-        super().__init__(message)
-        self.message = message
-        self.code = code
-        self.details = details or {}
-
-@dataclass
-class PaymentResult:
-    """Result of a payment operation"""
-    success: bool
-    transaction_id: Optional[str] = None
-    amount: Optional[float] = None
-    service: Optional[str] = None
-    message: Optional[str] = None
-    details: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
-    
-    @property
-    def failed(self) -> bool:
-        """Check if payment failed"""
-        return not self.success
+# Shared client used by pay() and the convenience functions
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
 
 def configure(
     token: Optional[str] = None,
     base_url: Optional[str] = None,
-    timeout: Optional[int] = None
+    timeout: Optional[int] = None,
+    pool_size: Optional[int] = None,
+    retry: Optional["RetryPolicy"] = None,
+    policy: Optional["Policy"] = None,
+    rate_limiter: Optional["RateLimiter"] = None
 ) -> None:
     """
     Configure AgentPay SDK
@@ -60,11 +104,15 @@ def configure(
         token: Agent token (can also be set via AGENTPAY_TOKEN env var)
         base_url: API base URL (defaults to production)
         timeout: Request timeout in seconds
+        pool_size: Keep-alive connections held by the shared client
+        retry: Retry policy for transient failures (RetryPolicy(max_attempts=1) disables)
+        policy: Pre-flight spending Policy checked before each purchase is sent
+        rate_limiter: RateLimiter pacing requests across every process sharing it
     
     Example:
         agentpay.configure(token="agent_abc123")
     """
-    global _config
+    global _config, _client
     
     if token:
         _config["token"] = token
@@ -76,6 +124,58 @@ def configure(
     
     if timeout:
         _config["timeout"] = timeout
+    
+    if retry:
+        _config["retry"] = retry
+    
+    if policy:
+        _config["policy"] = policy
+    
+    if rate_limiter:
+        _config["rate_limiter"] = rate_limiter
+    
+    with _client_lock:
+        if pool_size and pool_size != _config["pool_size"]:
+            _config["pool_size"] = pool_size
+            # Rebuild lazily with the new pool size; close the old pool now
+            # rather than leaving its sockets open until garbage collection
+            if _client is not None:
+                _client.close()
+            _client = None
+        elif _client is not None:
+            _client.base_url = _config["base_url"]
+            _client.timeout = _config["timeout"]
+            if _config["retry"] is not None:
+                _client.retry = _config["retry"]
+            _client.policy = _config["policy"]
+            _client.rate_limiter = _config["rate_limiter"]
+
+def get_client() -> "Client":
+    """
+    Return the shared client used by pay() and the convenience functions
+    
+    The client is created on first use from the current configuration and
+    reused afterwards, so every call shares one connection pool.
+    """
+    global _client
+    
+    client = _client
+    if client is None:
+        from .client import Client
+        from .retry import DEFAULT_RETRY
+        
+        with _client_lock:
+            if _client is None:
+                _client = Client(
+                    base_url=_config["base_url"],
+                    timeout=_config["timeout"],
+                    pool_size=_config["pool_size"],
+                    retry=_config["retry"] or DEFAULT_RETRY,
+                    policy=_config["policy"],
+                    rate_limiter=_config["rate_limiter"]
+                )
+            client = _client
+    return client
 
 def pay(
     intent: str,
@@ -83,7 +183,10 @@ def pay(
     details: Optional[Dict[str, Any]] = None,
     *,
     token: Optional[str] = None,
-    direct_card: bool = True
+    direct_card: bool = True,
+    idempotency_key: Optional[str] = None,
+    deadline: Union["Deadline", float, None] = None,
+    purchase_key: Optional[str] = None
 ) -> PaymentResult:
     """
     Make a payment with AgentPay
@@ -94,6 +197,11 @@ def pay(
         details: Service-specific parameters
         token: Override configured token
         direct_card: Use direct card charging (recommended)
+        idempotency_key: Key identifying this purchase across retries (generated if omitted)
+        deadline: Total seconds allowed for the call, including retries
+        purchase_key: Key naming this purchase; concurrent calls with the same key
+            (or the same idempotency_key) and details share one request. Calls
+            without either key are never merged
     
     Returns:
         PaymentResult: Payment outcome with transaction details
@@ -120,93 +228,72 @@ def pay(
             "brand": "amazon"
         })
     """
-    # Get token from parameter, global config, or environment
-    agent_token = token or _config["token"] or os.getenv("AGENTPAY_TOKEN")
-    
-    if not agent_token:
-        raise AgentPayError(
-            "No agent token provided. Call agentpay.configure(token='...') or set AGENTPAY_TOKEN env var",
-            code="MISSING_TOKEN"
-        )
-    
-    # Prepare request
-    endpoint = "/v1/purchase-direct" if direct_card else "/v1/purchase"
-    url = f"{_config['base_url']}{endpoint}"
-    
-    # Build payload
-    payload = {
-        "agentToken": agent_token,
-        "service": intent,
-        "params": details or {}
-    }
-    
-    # Add amount to params if provided
-    if amount is not None:
-        payload["params"]["maxPrice"] = amount
-        payload["params"]["budget"] = amount
-    
-    # Make HTTP request
-    try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers={
-                "Content-Type": "application/json",
-                "User-Agent": f"agentpay-python/{__version__}",
-                "X-SDK-Version": __version__
-            },
-            timeout=_config["timeout"]
-        )
-        
-        # Parse response
-        try:
-            data = response.json()
-        except json.JSONDecodeError:
-            raise AgentPayError(
-                f"Invalid JSON response from AgentPay API (status {response.status_code})",
-                code="INVALID_RESPONSE"
-            )
-        
-        # Handle success
-        if response.status_code == 200 and data.get("success"):
-            return PaymentResult(
-                success=True,
-                transaction_id=data.get("transactionId"),
-                amount=data.get("amount"),
-                service=data.get("service"),
-                message=data.get("message"),
-                details=data.get("details", {})
-            )
-        
-        # Handle approval required (direct card only)
-        elif response.status_code == 202 and data.get("requiresApproval"):
-            return PaymentResult(
-                success=False,
-                error="approval_required",
-                message=data.get("message", "Purchase requires user approval"),
-                details={
-                    "approval_id": data.get("approvalId"),
-                    "action": data.get("action"),
-                    "estimated_amount": data.get("estimatedAmount")
-                }
-            )
-        
-        # Handle errors
-        else:
-            error_message = data.get("error", f"Request failed with status {response.status_code}")
-            return PaymentResult(
-                success=False,
-                error=data.get("code", "UNKNOWN_ERROR"),
-                message=error_message,
-                details=data.get("details", {})
-            )
-            
-    except requests.RequestException as e:
-        raise AgentPayError(
-            f"Network error connecting to AgentPay API: {str(e)}",
-            code="NETWORK_ERROR",
-            details={"original_error": str(e)}
-        )
+    return get_client().pay(
+        intent,
+        amount,
+        details,
+        token=token or _config["token"],
+        direct_card=direct_card,
+        idempotency_key=idempotency_key,
+        deadline=deadline,
+        purchase_key=purchase_key
+    )
+
+def transactions(
+    *,
+    since: Union["datetime", "date", str, float, None] = None,
+    until: Union["datetime", "date", str, float, None] = None,
+    merchant: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    token: Optional[str] = None,
+    **options: Any
+) -> Iterator["Transaction"]:
+    """
+    Iterate the account's transaction history, newest first
+    
+    Pages are fetched lazily, with the next page requested in the background
+    while the current one is processed, so memory stays constant however
+    long the history is.
+    
+    Args:
+        since: Earliest creation time (datetime, date, ISO string or Unix seconds)
+        until: Latest creation time (inclusive)
+        merchant: Only transactions for this merchant/service
+        category: Only transactions in this category
+        status: Only transactions with this status
+        token: Override configured token
+        **options: agent_id, where, page_size, prefetch
+            (see agentpay.history.iter_transactions)
+    
+    Example:
+        total = sum(t.amount for t in agentpay.transactions(since="2025-01-01", category="travel"))
+    """
+    return get_client().transactions(
+        since=since,
+        until=until,
+        merchant=merchant,
+        category=category,
+        status=status,
+        token=token or _config["token"],
+        **options
+    )
+
+def limits(*, max_age: Optional[float] = None, refresh: bool = False,
+           token: Optional[str] = None) -> "SpendingLimits":
+    """
+    Current spending limits and usage, cached for a short TTL
+    
+    Args:
+        max_age: Freshness required for this read (defaults to 30 seconds)
+        refresh: Bypass the cache
+        token: Override configured token
+    
+    Example:
+        if agentpay.limits().allows(25.00):
+            agentpay.pay("food-delivery", 25.00, {"restaurant": "Pizza Palace"})
+    """
+    return get_client().limits(max_age=max_age, refresh=refresh, token=token or _config["token"])
 
 # Convenience functions for common use cases
 def buy_food(restaurant: str, budget: float = 30.0, **kwargs) -> PaymentResult:
@@ -227,4 +314,4 @@ def send_sms(phone: str, message: str) -> PaymentResult:
 
 # Auto-configure from environment on import
 if os.getenv("AGENTPAY_TOKEN"):
-    configure() 
\ No newline at end of file
+    configure() 
@@ -0,0 +1,108 @@
+"""
+Wire format helpers shared by the sync and async transports
+
+Everything here is pure data manipulation so both clients build identical
+requests and interpret responses the same way.
+"""
+
+import os
+from typing import Optional, Dict, Any
+
+from ._version import __version__
+from .errors import AgentPayError
+from .models import PaymentResult
+
+# Transport defaults live here (not in client.py) so the package can be
+# configured without importing the HTTP stack
+DEFAULT_BASE_URL = "https://api.agentpay.org"
+DEFAULT_TIMEOUT = 30
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_POOL_SIZE = 10
+
+
+def sdk_headers() -> Dict[str, str]:
+    """Default headers sent with every SDK request"""
+    return {
+        "Content-Type": "application/json",
+        "User-Agent": f"agentpay-python/{__version__}",
+        "X-SDK-Version": __version__
+    }
+
+
+def purchase_endpoint(direct_card: bool) -> str:
+    """API path for a purchase"""
+    return "/v1/purchase-direct" if direct_card else "/v1/purchase"
+
+
+def build_purchase_payload(
+    agent_token: str,
+    intent: str,
+    amount: Optional[float],
+    details: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Build the JSON body for a purchase request"""
+    # Copy so the caller's details dict is never mutated
+    params = dict(details) if details else {}
+    
+    # Add amount to params if provided
+    if amount is not None:
+        params["maxPrice"] = amount
+        params["budget"] = amount
+    
+    return {
+        "agentToken": agent_token,
+        "service": intent,
+        "params": params
+    }
+
+
+def parse_purchase_response(status_code: int, data: Dict[str, Any]) -> PaymentResult:
+    """Turn a decoded purchase response into a PaymentResult"""
+    # Handle success
+    if status_code == 200 and data.get("success"):
+        return PaymentResult(
+            success=True,
+            transaction_id=data.get("transactionId"),
+            amount=data.get("amount"),
+            service=data.get("service"),
+            message=data.get("message"),
+            details=data.get("details", {})
+        )
+    
+    # Handle approval required (direct card only)
+    if status_code == 202 and data.get("requiresApproval"):
+        return PaymentResult(
+            success=False,
+            error="approval_required",
+            message=data.get("message", "Purchase requires user approval"),
+            details={
+                "approval_id": data.get("approvalId"),
+                "action": data.get("action"),
+                "estimated_amount": data.get("estimatedAmount")
+            }
+        )
+    
+    # Handle errors
+    error_message = data.get("error", f"Request failed with status {status_code}")
+    return PaymentResult(
+        success=False,
+        error=data.get("code", "UNKNOWN_ERROR"),
+        message=error_message,
+        details=data.get("details", {})
+    )
+
+
+def resolve_token(*candidates: Optional[str]) -> str:
+    """Pick the first available agent token, falling back to AGENTPAY_TOKEN"""
+    for candidate in candidates:
+        if candidate:
+            return candidate
+    
+    env_token = os.getenv("AGENTPAY_TOKEN")
+    if env_token:
+        return env_token
+    
+    raise AgentPayError(
+        "No agent token provided. Call agentpay.configure(token='...') or set AGENTPAY_TOKEN env var",
+        code="MISSING_TOKEN"
+    )
@@ -0,0 +1,487 @@
+"""
+AgentPay SDK - asyncio support
+
+Requires the async extra:
+    pip install agentpay[async]
+
+Usage:
+    from agentpay import aio
+    
+    result = await aio.pay("food-delivery", 25.00, {"restaurant": "Pizza Palace"})
+    
+    # Thousands of purchases multiplexed on one event loop
+    results = await asyncio.gather(*(aio.buy_gift_card("amazon", 10.0) for _ in range(1000)))
+    
+    await aio.close()   # before the loop ends: closes this loop's shared client
+"""
+
+import asyncio
+import time
+import warnings
+import weakref
+from typing import Optional, Dict, Any, Mapping, Union, TYPE_CHECKING
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - depends on installed extras
+    raise ImportError(
+        "agentpay.aio requires aiohttp. Install it with: pip install agentpay[async]"
+    )
+
+from . import _config
+from ._protocol import (
+    sdk_headers,
+    purchase_endpoint,
+    build_purchase_payload,
+    parse_purchase_response,
+    resolve_token,
+)
+from ._protocol import DEFAULT_BASE_URL, DEFAULT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT
+from .breaker import CircuitBreaker, endpoint_key
+from .deadline import Deadline
+from . import codec, metrics
+from .errors import AgentPayError
+from .models import PaymentResult
+from .retry import RetryPolicy, DEFAULT_RETRY, NO_RETRY, new_idempotency_key, parse_retry_after
+from .singleflight import AsyncSingleFlight, flight_key
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .policy import Policy
+    from .ratelimit import RateLimiter
+
+__all__ = [
+    "AsyncClient", "AsyncResponse", "get_client", "close", "pay",
+    "buy_food", "book_flight", "buy_gift_card", "send_sms",
+]
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 100
+
+
+class AsyncResponse:
+    """Fully read HTTP response returned by AsyncClient.request()"""
+    
+    __slots__ = ("status_code", "headers", "content")
+    
+    def __init__(self, status_code: int, headers: Mapping[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+    
+    def json(self) -> Any:
+        """Decode the body as JSON (raises ValueError on invalid JSON)"""
+        return codec.get().loads(self.content)
+    
+    def raise_for_status(self) -> None:
+        """Raise AgentPayError(code="HTTP_ERROR") for 4xx/5xx responses"""
+        if self.status_code >= 400:
+            raise AgentPayError(
+                f"AgentPay API returned HTTP {self.status_code}",
+                code="HTTP_ERROR",
+                details={"status": self.status_code}
+            )
+
+
+class AsyncClient:
+    """
+    asyncio AgentPay API client backed by one shared aiohttp connector
+    
+    The aiohttp session is created lazily inside the running event loop and
+    reused for every call, so keep-alive connections are pooled across all
+    concurrent purchases. Close the client before its loop ends, with
+    "async with" or close(); a client dropped with its session still open
+    only gets a ResourceWarning.
+    
+    Args:
+        token: Agent token (falls back to AGENTPAY_TOKEN env var)
+        base_url: API base URL (defaults to production)
+        timeout: Total request timeout in seconds
+        connect_timeout: Connection timeout in seconds (None or 0 for no limit)
+        limit: Maximum simultaneous connections across all hosts
+        limit_per_host: Maximum simultaneous connections to one host
+        headers: Extra headers sent with every request
+        retry: Retry policy for transient failures (None disables retries)
+        breaker: CircuitBreaker to use; True creates a private one, False/None disables
+        policy: Pre-flight Policy; purchases its rules refuse are denied without a request
+        single_flight: AsyncSingleFlight sharing one request between concurrent
+            purchases with the same purchase_key or idempotency_key (unnamed
+            purchases are never merged); True creates a private one, False/None disables
+        rate_limiter: RateLimiter pacing every request attempt (None disables)
+    
+    Example:
+        async with aio.AsyncClient(token="agent_abc123", limit_per_host=50) as client:
+            result = await client.pay("gift-card", 50.00, {"brand": "amazon"})
+    """
+    
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        *,
+        connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+        limit: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        headers: Optional[Dict[str, str]] = None,
+        retry: Optional[RetryPolicy] = DEFAULT_RETRY,
+        breaker: Union[CircuitBreaker, bool, None] = True,
+        policy: Optional["Policy"] = None,
+        single_flight: Union[AsyncSingleFlight, bool, None] = True,
+        rate_limiter: Optional["RateLimiter"] = None
+    ):
+        self.token = token
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        self.connect_timeout = connect_timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.retry = retry or NO_RETRY
+        self.breaker = CircuitBreaker() if breaker is True else (breaker or None)
+        self.policy = policy
+        self.single_flight = AsyncSingleFlight() if single_flight is True else (single_flight or None)
+        self.rate_limiter = rate_limiter
+        self.headers = sdk_headers()
+        if headers:
+            self.headers.update(headers)
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._finalizer: Optional[weakref.finalize] = None
+    
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the aiohttp session, creating it in the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions can't cross event loops; start a fresh pool in this one
+            if self._session is not None and self._loop is not loop:
+                self._discard_session()
+            self._loop = loop
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._finalizer = weakref.finalize(self, _warn_unclosed, self._session)
+        return self._session
+    
+    def _forget_session(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        self._session = self._loop = self._finalizer = None
+    
+    def _discard_session(self) -> None:
+        """Let go of a session bound to another event loop, closing it there if it still runs"""
+        session, loop = self._session, self._loop
+        self._forget_session()
+        if session is None or session.closed:
+            return
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            # Its loop is gone, and its connections with it; nothing left to close them
+            _warn_unclosed(session)
+    
+    async def close(self) -> None:
+        """Close the session and all pooled connections"""
+        session = self._session
+        self._forget_session()
+        if session is not None and not session.closed:
+            await session.close()
+    
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Optional[Any] = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+        deadline: Union[Deadline, float, None] = None
+    ) -> AsyncResponse:
+        """
+        Send a request through the pooled session, retrying transient failures
+        
+        Retry rules match Client.request(): GETs always, other methods only
+        with an idempotency_key.
+        
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/v1/authorize")
+            json: JSON-serialisable body (encoded with the active codec)
+            params: Query string parameters
+            headers: Extra headers for this request only
+            timeout: Per-attempt timeout (defaults to the client timeout)
+            idempotency_key: Sent as Idempotency-Key on every attempt
+            deadline: Total budget in seconds (or a Deadline) across all attempts
+        
+        Raises:
+            AgentPayError: On network failure (code NETWORK_ERROR), when the
+                deadline runs out (code DEADLINE_EXCEEDED), or immediately
+                while the endpoint's circuit is open (code CIRCUIT_OPEN)
+        """
+        deadline = Deadline.coerce(deadline)
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update(headers)
+        if idempotency_key:
+            request_headers["Idempotency-Key"] = idempotency_key
+        
+        body = codec.get().dumps(json) if json is not None else None
+        retry = self.retry if (method.upper() == "GET" or idempotency_key) else NO_RETRY
+        url = f"{self.base_url}{path}"
+        breaker = self.breaker
+        limiter = self.rate_limiter
+        endpoint = endpoint_key(method, path)
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            deadline.check()
+            if breaker is not None:
+                breaker.before_call(endpoint)
+            if limiter is not None:
+                await limiter.aacquire(deadline)
+            # Raises instead of sending with a zero timeout once the budget is spent
+            client_timeout = aiohttp.ClientTimeout(
+                total=_attempt_timeout(deadline, timeout or self.timeout),
+                sock_connect=_attempt_timeout(deadline, self.connect_timeout)
+            )
+            error = None
+            retry_after = None
+            if metrics.enabled:
+                sent = time.perf_counter()
+            try:
+                async with self._get_session().request(
+                    method,
+                    url,
+                    data=body,
+                    params=params,
+                    headers=request_headers,
+                    timeout=client_timeout
+                ) as raw:
+                    content = await raw.read()
+                    response = AsyncResponse(raw.status, raw.headers, content)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                response = None
+                if breaker is not None:
+                    breaker.record_failure(endpoint)
+                error = str(e) or type(e).__name__
+                if metrics.enabled:
+                    metrics.observe_request(endpoint, "error", time.perf_counter() - sent)
+            else:
+                if metrics.enabled:
+                    metrics.observe_request(endpoint, str(response.status_code), time.perf_counter() - sent)
+                if limiter is not None:
+                    await limiter.aobserve(response.status_code, response.headers)
+                if breaker is not None:
+                    if response.status_code >= 500:
+                        breaker.record_failure(endpoint)
+                    else:
+                        breaker.record_success(endpoint)
+                if response.status_code not in retry.retry_statuses:
+                    return response
+                retry_after = parse_retry_after(response.headers)
+            
+            delay = retry.next_delay(attempt, deadline, retry_after)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        
+        if response is not None:
+            return response
+        if deadline.expired():
+            exceeded = deadline.exceeded(error)
+            exceeded.details["attempts"] = attempt
+            raise exceeded
+        raise AgentPayError(
+            f"Network error connecting to AgentPay API: {error}",
+            code="NETWORK_ERROR",
+            details={"original_error": error, "attempts": attempt}
+        )
+    
+    async def pay(
+        self,
+        intent: str,
+        amount: Optional[float] = None,
+        details: Optional[Dict[str, Any]] = None,
+        *,
+        token: Optional[str] = None,
+        direct_card: bool = True,
+        idempotency_key: Optional[str] = None,
+        deadline: Union[Deadline, float, None] = None,
+        purchase_key: Optional[str] = None
+    ) -> PaymentResult:
+        """
+        Make a payment with AgentPay
+        
+        Same semantics as agentpay.pay(), using this client's settings.
+        
+        Raises:
+            AgentPayError: If payment fails or configuration is invalid
+        """
+        started = time.perf_counter() if metrics.enabled else None
+        try:
+            agent_token = resolve_token(token, self.token)
+            
+            # Purchases the policy would certainly refuse never leave the process
+            denial = self.policy.evaluate(amount, category=intent) if self.policy is not None else None
+            if denial is not None:
+                result = denial.as_result()
+            elif self.single_flight is None or not (purchase_key or idempotency_key):
+                # Unnamed purchases are always distinct, however alike they look
+                result = await self._purchase(agent_token, intent, amount, details, direct_card, idempotency_key, deadline)
+            else:
+                # Calls naming the same purchase share the request already in flight
+                key = flight_key("purchase", agent_token, intent, amount, purchase_key or idempotency_key, details)
+                result = await self.single_flight.do(
+                    key, self._purchase, agent_token, intent, amount, details, direct_card, idempotency_key, deadline
+                )
+        except AgentPayError as e:
+            if started is not None:
+                metrics.observe_error(e.code)
+                metrics.observe_pay(intent, e.code or "UNKNOWN_ERROR", time.perf_counter() - started)
+            raise
+        
+        if started is not None:
+            metrics.observe_pay(intent, metrics.pay_outcome(result), time.perf_counter() - started)
+        return result
+    
+    async def _purchase(
+        self,
+        agent_token: str,
+        intent: str,
+        amount: Optional[float],
+        details: Optional[Dict[str, Any]],
+        direct_card: bool,
+        idempotency_key: Optional[str],
+        deadline: Union[Deadline, float, None]
+    ) -> PaymentResult:
+        """Send the purchase request and parse the response"""
+        payload = build_purchase_payload(agent_token, intent, amount, details)
+        
+        response = await self.request(
+            "POST",
+            purchase_endpoint(direct_card),
+            json=payload,
+            idempotency_key=idempotency_key or new_idempotency_key(),
+            deadline=deadline
+        )
+        
+        # Parse response
+        try:
+            data = codec.get().loads_purchase(response.content)
+        except ValueError:
+            raise AgentPayError(
+                f"Invalid JSON response from AgentPay API (status {response.status_code})",
+                code="INVALID_RESPONSE"
+            )
+        
+        return parse_purchase_response(response.status_code, data)
+
+
+def _attempt_timeout(deadline: Deadline, seconds: Optional[float]) -> Optional[float]:
+    """
+    One attempt's timeout for aiohttp.ClientTimeout, capped by the deadline
+    
+    aiohttp reads 0 as "no timeout", so an unset limit (None or 0) is passed
+    as None and only the deadline's remaining time, if any, bounds it.
+    """
+    if seconds:
+        return deadline.timeout(seconds)
+    if deadline.remaining() is None:
+        return None
+    return deadline.timeout(float("inf"))
+
+
+def _warn_unclosed(session: aiohttp.ClientSession) -> None:
+    if not session.closed:
+        warnings.warn(
+            "Unclosed AsyncClient session; use 'async with AsyncClient()' or "
+            "'await client.close()' ('await aio.close()' for the shared client)",
+            ResourceWarning,
+            stacklevel=2
+        )
+
+
+# aiohttp sessions are bound to an event loop, so keep one shared client per
+# loop; close() closes the running loop's client
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_client() -> AsyncClient:
+    """
+    Return the shared async client for the running event loop
+    
+    The client follows agentpay.configure() for base URL, timeout, retry, policy and rate limiter.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncClient()
+        _clients[loop] = client
+    client.base_url = _config["base_url"]
+    client.timeout = _config["timeout"]
+    client.retry = _config["retry"] or DEFAULT_RETRY
+    client.policy = _config["policy"]
+    client.rate_limiter = _config["rate_limiter"]
+    return client
+
+async def close() -> None:
+    """Close the shared async client for the running event loop (call before the loop ends)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+async def pay(
+    intent: str,
+    amount: Optional[float] = None,
+    details: Optional[Dict[str, Any]] = None,
+    *,
+    token: Optional[str] = None,
+    direct_card: bool = True,
+    idempotency_key: Optional[str] = None,
+    deadline: Union[Deadline, float, None] = None,
+    purchase_key: Optional[str] = None
+) -> PaymentResult:
+    """
+    Make a payment with AgentPay without blocking the event loop
+    
+    Async counterpart of agentpay.pay(); see its docstring for arguments.
+    
+    Raises:
+        AgentPayError: If payment fails or configuration is invalid
+    """
+    return await get_client().pay(
+        intent,
+        amount,
+        details,
+        token=token or _config["token"],
+        direct_card=direct_card,
+        idempotency_key=idempotency_key,
+        deadline=deadline,
+        purchase_key=purchase_key
+    )
+
+# Convenience functions for common use cases
+async def buy_food(restaurant: str, budget: float = 30.0, **kwargs) -> PaymentResult:
+    """Order food delivery"""
+    return await pay("food-delivery", budget, {"restaurant": restaurant, **kwargs})
+
+async def book_flight(from_city: str, to_city: str, budget: float = 500.0, **kwargs) -> PaymentResult:
+    """Book a flight"""
+    return await pay("flight", budget, {"from": from_city, "to": to_city, **kwargs})
+
+async def buy_gift_card(brand: str, amount: float) -> PaymentResult:
+    """Buy a gift card"""
+    return await pay("gift-card", amount, {"brand": brand})
+
+async def send_sms(phone: str, message: str) -> PaymentResult:
+    """Send an SMS message"""
+    return await pay("sms", None, {"to": phone, "message": message})
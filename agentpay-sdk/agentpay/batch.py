@@ -0,0 +1,143 @@
+"""
+Bulk purchases with bounded concurrency
+
+Usage:
+    purchases = [
+        ("gift-card", 50.00, {"brand": "amazon"}),
+        {"intent": "sms", "details": {"to": "+1234567890", "message": "Hi"}},
+    ]
+    
+    # Results in input order
+    for item in agentpay.pay_many(purchases, concurrency=8):
+        print(item.index, item.result if item.ok else item.error)
+    
+    # Results as soon as each purchase finishes
+    for item in agentpay.pay_many(purchases, concurrency=8, ordered=False):
+        ...
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple, Union, Mapping, TYPE_CHECKING
+
+from .models import PaymentResult
+
+if TYPE_CHECKING:
+    from .client import Client
+
+__all__ = ["BatchItem", "pay_many"]
+
+# (intent,), (intent, amount) or (intent, amount, details) -- or a dict of pay() kwargs
+PurchaseRequest = Union[Tuple[Any, ...], Mapping[str, Any]]
+
+DEFAULT_CONCURRENCY = 8
+
+
+@dataclass
+class BatchItem:
+    """Outcome of one purchase in a pay_many() batch"""
+    index: int
+    request: PurchaseRequest
+    result: Optional[PaymentResult] = None
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        """True if the purchase went through"""
+        return self.error is None and self.result is not None and self.result.success
+
+
+def _call_args(request: PurchaseRequest) -> Tuple[tuple, Dict[str, Any]]:
+    """Split a purchase request into pay() positional and keyword arguments"""
+    if isinstance(request, Mapping):
+        kwargs = dict(request)
+        intent = kwargs.pop("intent")
+        return (intent, kwargs.pop("amount", None), kwargs.pop("details", None)), kwargs
+    return tuple(request), {}
+
+
+def pay_many(
+    requests: Iterable[PurchaseRequest],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    *,
+    ordered: bool = True,
+    client: Optional["Client"] = None
+) -> Iterator[BatchItem]:
+    """
+    Run many purchases concurrently and stream their outcomes
+    
+    The input is consumed lazily, so it can be a generator of any length;
+    only a small window of purchases is in memory at once. A failing item
+    is reported on its BatchItem and never aborts the rest of the batch.
+    
+    Args:
+        requests: Purchase tuples (intent, amount, details) or dicts of pay() kwargs
+        concurrency: Maximum purchases in flight at once
+        ordered: Yield in input order (True) or as each purchase completes (False)
+        client: Client to use (defaults to the shared client)
+    
+    Returns:
+        Iterator of BatchItem, one per request
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    
+    if client is not None:
+        pay = client.pay
+    else:
+        from . import pay
+    
+    def run(index: int, request: PurchaseRequest) -> BatchItem:
+        try:
+            args, kwargs = _call_args(request)
+            return BatchItem(index, request, result=pay(*args, **kwargs))
+        except Exception as e:
+            return BatchItem(index, request, error=e)
+    
+    if ordered:
+        return _ordered(run, requests, concurrency)
+    return _as_completed(run, requests, concurrency)
+
+
+def _ordered(run, requests: Iterable[PurchaseRequest], concurrency: int) -> Iterator[BatchItem]:
+    # A window of 2x concurrency keeps workers busy behind a slow head item
+    window = concurrency * 2
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="agentpay-batch")
+    pending: "deque[Future]" = deque()
+    try:
+        for index, request in enumerate(requests):
+            pending.append(executor.submit(run, index, request))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _as_completed(run, requests: Iterable[PurchaseRequest], concurrency: int) -> Iterator[BatchItem]:
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="agentpay-batch")
+    source = enumerate(requests)
+    pending = set()
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    index, request = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(run, index, request))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,174 @@
+"""
+Client-side circuit breaker for the AgentPay API
+
+Each endpoint tracks its failure rate over a rolling window. Once the rate
+crosses the threshold the circuit opens and calls fail immediately with
+AgentPayError(code="CIRCUIT_OPEN") instead of waiting on a dead endpoint.
+After reset_timeout a few probe calls are let through (half-open); a
+successful probe closes the circuit, a failed one reopens it.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+from .errors import AgentPayError
+
+__all__ = ["CircuitBreaker", "CLOSED", "OPEN", "HALF_OPEN", "endpoint_key"]
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Path segments carrying ids (auth_123, txn_abc9...) collapse into one endpoint;
+# version segments like /v1 are kept
+_ID_SEGMENT = re.compile(r"/(?!v\d+(?:/|$))[^/]*\d[^/]*")
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """Stable breaker key for a request, e.g. 'POST /v1/authorize/{id}/confirm'"""
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+class _Circuit:
+    """State and rolling counters for one endpoint"""
+    
+    __slots__ = ("state", "opened_at", "probes", "buckets")
+    
+    def __init__(self):
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        # deque of [bucket_start, successes, failures]
+        self.buckets = deque()
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker (thread-safe)
+    
+    Args:
+        failure_rate: Failure fraction that opens the circuit (0-1)
+        min_calls: Calls needed in the window before the rate is trusted
+        window: Rolling window length in seconds
+        reset_timeout: Seconds an open circuit waits before probing
+        half_open_calls: Probe calls allowed while half-open
+        clock: Monotonic time source
+    
+    Example:
+        client = agentpay.Client(breaker=CircuitBreaker(failure_rate=0.3, reset_timeout=5))
+    """
+    
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window: float = 30.0,
+        reset_timeout: float = 15.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self._bucket_width = window / 10
+        self._clock = clock
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+    
+    def _circuit(self, endpoint: str) -> _Circuit:
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = _Circuit()
+        return circuit
+    
+    def state(self, endpoint: str) -> str:
+        """Current state of an endpoint's circuit"""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                return CLOSED
+            if circuit.state == OPEN and self._clock() - circuit.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return circuit.state
+    
+    def before_call(self, endpoint: str) -> None:
+        """
+        Admit a call or fail fast
+        
+        Raises:
+            AgentPayError: code CIRCUIT_OPEN while the endpoint is open
+        """
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit.state == CLOSED:
+                return
+            
+            now = self._clock()
+            if now - circuit.opened_at >= self.reset_timeout:
+                # Start a probe round (also recovers probes that never reported back)
+                circuit.state = HALF_OPEN
+                circuit.opened_at = now
+                circuit.probes = 0
+            
+            if circuit.state == HALF_OPEN and circuit.probes < self.half_open_calls:
+                circuit.probes += 1
+                return
+            
+            retry_in = max(0.0, self.reset_timeout - (now - circuit.opened_at))
+        
+        raise AgentPayError(
+            f"AgentPay API circuit open for {endpoint}; failing fast",
+            code="CIRCUIT_OPEN",
+            details={"endpoint": endpoint, "retry_in": round(retry_in, 3)}
+        )
+    
+    def record_success(self, endpoint: str) -> None:
+        """Record a healthy response"""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit.state != CLOSED:
+                # A successful probe closes the circuit with a clean window
+                circuit.state = CLOSED
+                circuit.buckets.clear()
+            self._count(circuit, success=True)
+    
+    def record_failure(self, endpoint: str) -> None:
+        """Record a network error, timeout or 5xx response"""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            now = self._clock()
+            if circuit.state != CLOSED:
+                circuit.state = OPEN
+                circuit.opened_at = now
+                return
+            
+            self._count(circuit, success=False)
+            calls = failures = 0
+            for _, ok, failed in circuit.buckets:
+                calls += ok + failed
+                failures += failed
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                circuit.state = OPEN
+                circuit.opened_at = now
+    
+    def reset(self) -> None:
+        """Close every circuit and forget all history"""
+        with self._lock:
+            self._circuits.clear()
+    
+    def _count(self, circuit: _Circuit, success: bool) -> None:
+        now = self._clock()
+        buckets = circuit.buckets
+        while buckets and now - buckets[0][0] >= self.window:
+            buckets.popleft()
+        if not buckets or now - buckets[-1][0] >= self._bucket_width:
+            buckets.append([now, 0, 0])
+        if success:
+            buckets[-1][1] += 1
+        else:
+            buckets[-1][2] += 1
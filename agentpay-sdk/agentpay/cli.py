@@ -0,0 +1,84 @@
+"""
+Command-line interface
+
+Usage:
+    agentpay profile -n 100 --intent gift-card --amount 10
+    agentpay profile -n 200 --local --latency 0.02    # against a FakeServer
+    python -m agentpay profile ...
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from .client import Client
+from .errors import AgentPayError
+from .profile import Profiler
+
+
+def _profile(args: argparse.Namespace) -> int:
+    """Run N purchases through a profiled client and print phase percentiles"""
+    server = None
+    base_url = args.base_url
+    token = args.token
+    
+    if args.local:
+        from .testing import FakeServer, lognormal
+        
+        server = FakeServer(latency=lognormal(args.latency) if args.latency > 0 else 0.0, seed=0).start()
+        base_url = server.url
+        token = token or "ak_profile"
+    
+    details = json.loads(args.details) if args.details else None
+    profiler = Profiler(keep=args.count * 4)
+    failures = 0
+    
+    try:
+        with Client(token=token, base_url=base_url, profiler=profiler) as client:
+            for _ in range(args.count):
+                try:
+                    result = client.pay(args.intent, args.amount, details)
+                except AgentPayError as e:
+                    failures += 1
+                    if e.code == "MISSING_TOKEN":
+                        print(f"Error: {e.message}", file=sys.stderr)
+                        return 2
+                else:
+                    if not result.success:
+                        failures += 1
+    finally:
+        if server is not None:
+            server.stop()
+    
+    if args.json:
+        print(json.dumps(profiler.summary(), indent=2))
+    else:
+        print(f"Profiled {args.count} x pay({args.intent!r}) against {base_url or 'the default API'}\n")
+        print(profiler.report())
+        if failures:
+            print(f"{failures} purchases did not succeed")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="agentpay", description="AgentPay SDK tools")
+    commands = parser.add_subparsers(dest="command")
+    
+    profile = commands.add_parser("profile", help="measure per-phase request latency")
+    profile.add_argument("-n", "--count", type=int, default=100, help="number of purchases (default 100)")
+    profile.add_argument("--intent", default="gift-card")
+    profile.add_argument("--amount", type=float, default=10.0)
+    profile.add_argument("--details", help="purchase details as JSON")
+    profile.add_argument("--token", help="agent token (defaults to AGENTPAY_TOKEN)")
+    profile.add_argument("--base-url", help="API base URL")
+    profile.add_argument("--local", action="store_true", help="profile against an in-process FakeServer")
+    profile.add_argument("--latency", type=float, default=0.0, help="FakeServer median latency in seconds")
+    profile.add_argument("--json", action="store_true", help="print the summary as JSON (seconds)")
+    profile.set_defaults(handler=_profile)
+    
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    return args.handler(args)
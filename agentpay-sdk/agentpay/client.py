@@ -0,0 +1,446 @@
+"""
+Pooled, thread-safe HTTP client for the AgentPay API
+
+A Client keeps its connections alive between calls, so repeated purchases
+reuse the same TCP/TLS connection instead of paying a new handshake each time.
+
+Usage:
+    client = agentpay.Client(token="agent_abc123", pool_size=20)
+    result = client.pay("gift-card", 50.00, {"brand": "amazon"})
+"""
+
+import threading
+import time
+import weakref
+from typing import Optional, Dict, Any, Iterator, Union, Callable, TYPE_CHECKING
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ._protocol import (
+    DEFAULT_BASE_URL,
+    DEFAULT_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    sdk_headers,
+    purchase_endpoint,
+    build_purchase_payload,
+    parse_purchase_response,
+    resolve_token,
+)
+from .breaker import CircuitBreaker, endpoint_key
+from .deadline import Deadline
+from . import codec, metrics
+from .errors import AgentPayError
+from .models import PaymentResult
+from .profile import Profiler, ProfilingAdapter, begin as begin_profile, finish as finish_profile
+from .retry import RetryPolicy, DEFAULT_RETRY, NO_RETRY, new_idempotency_key, parse_retry_after
+from .singleflight import SingleFlight, flight_key
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .history import Transaction
+    from .limitscache import LimitsCache, SpendingLimits
+    from .policy import Denial, Policy
+    from .ratelimit import RateLimiter
+
+
+class Client:
+    """
+    AgentPay API client with a persistent connection pool
+    
+    One connection pool is shared by every thread using the client. Each
+    thread gets its own lightweight requests.Session mounted on that pool,
+    so the client is safe to share across worker threads.
+    
+    Args:
+        token: Agent token (falls back to AGENTPAY_TOKEN env var)
+        base_url: API base URL (defaults to production)
+        timeout: Request (read) timeout in seconds
+        connect_timeout: Connection timeout in seconds
+        pool_size: Maximum number of keep-alive connections kept per host
+        headers: Extra headers sent with every request
+        retry: Retry policy for transient failures (None disables retries)
+        breaker: CircuitBreaker to use; True creates a private one, False/None disables
+        profiler: Profiler (or callback taking a RequestProfile) recording a
+            phase breakdown of every request; None disables profiling
+        limits_ttl: Seconds limits() answers from its cache
+        policy: Pre-flight Policy; purchases it (or fresh cached limits)
+            certainly refuse are denied without a request
+        single_flight: SingleFlight sharing one request between concurrent
+            purchases with the same purchase_key or idempotency_key (unnamed
+            purchases are never merged); True creates a private one, False/None disables
+        rate_limiter: RateLimiter pacing every request attempt, shared with
+            other processes using the same limiter key (None disables)
+    
+    Example:
+        with agentpay.Client(token="agent_abc123") as client:
+            result = client.pay("food-delivery", 25.00, {"restaurant": "Pizza Palace"})
+    """
+    
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        *,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        headers: Optional[Dict[str, str]] = None,
+        retry: Optional[RetryPolicy] = DEFAULT_RETRY,
+        breaker: Union[CircuitBreaker, bool, None] = True,
+        profiler: Union[Profiler, Callable[..., None], None] = None,
+        limits_ttl: float = 30.0,
+        policy: Optional["Policy"] = None,
+        single_flight: Union[SingleFlight, bool, None] = True,
+        rate_limiter: Optional["RateLimiter"] = None
+    ):
+        self.token = token
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self.retry = retry or NO_RETRY
+        self.breaker = CircuitBreaker() if breaker is True else (breaker or None)
+        self.headers = sdk_headers()
+        if headers:
+            self.headers.update(headers)
+        
+        if profiler is not None and not isinstance(profiler, Profiler):
+            profiler = Profiler(callback=profiler)
+        self.profiler = profiler
+        
+        adapter_class = ProfilingAdapter if profiler is not None else HTTPAdapter
+        self._adapter = adapter_class(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._local = threading.local()
+        # Weak, so a worker thread's session goes away with the thread
+        self._sessions = weakref.WeakSet()  # type: weakref.WeakSet
+        self._lock = threading.Lock()
+        self._closed = False
+        self.limits_ttl = limits_ttl
+        self._limits_caches = {}  # type: Dict[str, LimitsCache]
+        self.policy = policy
+        self.single_flight = SingleFlight() if single_flight is True else (single_flight or None)
+        self.rate_limiter = rate_limiter
+    
+    def __enter__(self) -> "Client":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _session(self) -> requests.Session:
+        """Return this thread's session, creating it on first use"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            if self._closed:
+                raise AgentPayError("Client has been closed", code="CLIENT_CLOSED")
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            with self._lock:
+                self._sessions.add(session)
+            self._local.session = session
+        return session
+    
+    def close(self) -> None:
+        """Close all pooled connections"""
+        with self._lock:
+            self._closed = True
+            sessions, self._sessions = list(self._sessions), weakref.WeakSet()
+        for session in sessions:
+            # Sessions share the adapter, so only drop their own state here
+            session.adapters.clear()
+            session.close()
+        self._adapter.close()
+    
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Optional[Any] = None,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+        deadline: Union[Deadline, float, None] = None
+    ) -> requests.Response:
+        """
+        Send a request through the pooled session, retrying transient failures
+        
+        GET requests are always retried. Other methods are only retried when
+        an idempotency_key is given, so a purchase can never be applied twice.
+        
+        Args:
+            method: HTTP method
+            path: API path (e.g. "/v1/authorize")
+            json: JSON-serialisable body (encoded with the active codec)
+            params: Query string parameters
+            headers: Extra headers for this request only
+            timeout: Per-attempt timeout (defaults to the client timeout)
+            idempotency_key: Sent as Idempotency-Key on every attempt
+            deadline: Total budget in seconds (or a Deadline) across all attempts
+        
+        Raises:
+            AgentPayError: On network failure (code NETWORK_ERROR), when the
+                deadline runs out (code DEADLINE_EXCEEDED), or immediately
+                while the endpoint's circuit is open (code CIRCUIT_OPEN)
+        """
+        deadline = Deadline.coerce(deadline)
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update(headers)
+        if idempotency_key:
+            request_headers["Idempotency-Key"] = idempotency_key
+        
+        body = codec.get().dumps(json) if json is not None else None
+        retry = self.retry if (method.upper() == "GET" or idempotency_key) else NO_RETRY
+        url = f"{self.base_url}{path}"
+        breaker = self.breaker
+        limiter = self.rate_limiter
+        profiler = self.profiler
+        endpoint = endpoint_key(method, path)
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            deadline.check()
+            if breaker is not None:
+                breaker.before_call(endpoint)
+            if limiter is not None:
+                limiter.acquire(deadline)
+            # Raises instead of sending with a zero timeout once the budget is spent
+            timeouts = deadline.timeouts(self.connect_timeout, timeout or self.timeout)
+            error = None
+            retry_after = None
+            if profiler is not None:
+                phases = begin_profile()
+                started = time.perf_counter()
+            if metrics.enabled:
+                sent = time.perf_counter()
+            try:
+                response = self._session().request(
+                    method,
+                    url,
+                    data=body,
+                    params=params,
+                    headers=request_headers,
+                    timeout=timeouts
+                )
+            except requests.RequestException as e:
+                response = None
+                if breaker is not None:
+                    breaker.record_failure(endpoint)
+                error = e
+                if metrics.enabled:
+                    metrics.observe_request(endpoint, "error", time.perf_counter() - sent)
+                if profiler is not None:
+                    profiler.record(finish_profile(phases, method, endpoint, attempt, started, error=e))
+            else:
+                if metrics.enabled:
+                    metrics.observe_request(endpoint, str(response.status_code), time.perf_counter() - sent)
+                if limiter is not None:
+                    limiter.observe(response.status_code, response.headers)
+                if profiler is not None:
+                    profiler.record(finish_profile(phases, method, endpoint, attempt, started, response))
+                if breaker is not None:
+                    if response.status_code >= 500:
+                        breaker.record_failure(endpoint)
+                    else:
+                        breaker.record_success(endpoint)
+                if response.status_code not in retry.retry_statuses:
+                    return response
+                retry_after = parse_retry_after(response.headers)
+            
+            delay = retry.next_delay(attempt, deadline, retry_after)
+            if delay is None:
+                break
+            time.sleep(delay)
+        
+        if response is not None:
+            return response
+        if deadline.expired():
+            exceeded = deadline.exceeded(error)
+            exceeded.details["attempts"] = attempt
+            raise exceeded
+        raise AgentPayError(
+            f"Network error connecting to AgentPay API: {str(error)}",
+            code="NETWORK_ERROR",
+            details={"original_error": str(error), "attempts": attempt}
+        )
+    
+    def pay(
+        self,
+        intent: str,
+        amount: Optional[float] = None,
+        details: Optional[Dict[str, Any]] = None,
+        *,
+        token: Optional[str] = None,
+        direct_card: bool = True,
+        idempotency_key: Optional[str] = None,
+        deadline: Union[Deadline, float, None] = None,
+        purchase_key: Optional[str] = None
+    ) -> PaymentResult:
+        """
+        Make a payment with AgentPay
+        
+        Same semantics as agentpay.pay(), using this client's settings.
+        
+        Raises:
+            AgentPayError: If payment fails or configuration is invalid
+        """
+        started = time.perf_counter() if metrics.enabled else None
+        try:
+            agent_token = resolve_token(token, self.token)
+            
+            # Purchases the policy would certainly refuse never leave the process
+            denial = self.preflight(amount, category=intent, token=agent_token)
+            if denial is not None:
+                result = denial.as_result()
+            elif self.single_flight is None or not (purchase_key or idempotency_key):
+                # Unnamed purchases are always distinct, however alike they look
+                result = self._purchase(agent_token, intent, amount, details, direct_card, idempotency_key, deadline)
+            else:
+                # Calls naming the same purchase share the request already in flight
+                key = flight_key("purchase", agent_token, intent, amount, purchase_key or idempotency_key, details)
+                result = self.single_flight.do(
+                    key, self._purchase, agent_token, intent, amount, details, direct_card, idempotency_key, deadline
+                )
+        except AgentPayError as e:
+            if started is not None:
+                metrics.observe_error(e.code)
+                metrics.observe_pay(intent, e.code or "UNKNOWN_ERROR", time.perf_counter() - started)
+            raise
+        
+        if started is not None:
+            metrics.observe_pay(intent, metrics.pay_outcome(result), time.perf_counter() - started)
+        return result
+    
+    def _purchase(
+        self,
+        agent_token: str,
+        intent: str,
+        amount: Optional[float],
+        details: Optional[Dict[str, Any]],
+        direct_card: bool,
+        idempotency_key: Optional[str],
+        deadline: Union[Deadline, float, None]
+    ) -> PaymentResult:
+        """Send the purchase request, parse the response and update the cached limits"""
+        payload = build_purchase_payload(agent_token, intent, amount, details)
+        
+        response = self.request(
+            "POST",
+            purchase_endpoint(direct_card),
+            json=payload,
+            idempotency_key=idempotency_key or new_idempotency_key(),
+            deadline=deadline
+        )
+        
+        # Parse response
+        try:
+            data = codec.get().loads_purchase(response.content)
+        except ValueError:
+            raise AgentPayError(
+                f"Invalid JSON response from AgentPay API (status {response.status_code})",
+                code="INVALID_RESPONSE"
+            )
+        
+        result = parse_purchase_response(response.status_code, data)
+        
+        limits_cache = self._limits_caches.get(agent_token)
+        if limits_cache is not None:
+            if result.success:
+                limits_cache.record_spend(result.amount or amount or 0.0)
+            else:
+                limits_cache.invalidate()
+        return result
+    
+    def preflight(
+        self,
+        amount: Optional[float],
+        *,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+        token: Optional[str] = None,
+        per_transaction: bool = True,
+        daily: bool = True
+    ) -> Optional["Denial"]:
+        """
+        Check a purchase against the client policy without any request
+        
+        Server limits take part only if limits() has cached them within
+        limits_ttl, so this never adds a round trip. per_transaction and
+        daily select the amount checks as in Policy.evaluate(): opening a
+        spending envelope skips the per-transaction limit, each purchase
+        drawn from one skips the daily budget.
+        
+        Returns:
+            A Denial if the purchase would certainly be refused, None otherwise
+            (always None when the client has no policy)
+        """
+        policy = self.policy
+        if policy is None:
+            return None
+        
+        cache = self._limits_caches.get(resolve_token(token, self.token))
+        limits = cache.peek() if cache is not None else None
+        if limits is not None and limits.age >= cache.ttl:
+            limits = None
+        return policy.evaluate(
+            amount, category=category, merchant=merchant, limits=limits,
+            per_transaction=per_transaction, daily=daily
+        )
+    
+    def transactions(self, **filters: Any) -> Iterator["Transaction"]:
+        """
+        Lazily iterate the transaction history, prefetching the next page
+        
+        Accepts the keyword filters of agentpay.history.iter_transactions()
+        (since, until, merchant, category, status, agent_id, where,
+        page_size, prefetch, token).
+        """
+        from .history import iter_transactions
+        
+        return iter_transactions(self, **filters)
+    
+    def limits_cache(self, token: Optional[str] = None) -> "LimitsCache":
+        """
+        The limits cache for a token (the client token by default)
+        
+        Integrations confirming purchases outside pay() report them here
+        with record_spend() or invalidate().
+        """
+        from .limitscache import LimitsCache
+        
+        agent_token = resolve_token(token, self.token)
+        cache = self._limits_caches.get(agent_token)
+        if cache is None:
+            with self._lock:
+                cache = self._limits_caches.setdefault(
+                    agent_token, LimitsCache(self, ttl=self.limits_ttl, token=agent_token)
+                )
+        return cache
+    
+    def limits(
+        self,
+        *,
+        max_age: Optional[float] = None,
+        refresh: bool = False,
+        token: Optional[str] = None
+    ) -> "SpendingLimits":
+        """
+        Current spending limits and usage, served from a TTL cache
+        
+        Concurrent callers share one request; successful pay() calls are
+        subtracted from the cached remaining budget and denials drop it.
+        
+        Args:
+            max_age: Freshness required for this read (defaults to limits_ttl)
+            refresh: Bypass the cache
+            token: Override the client token
+        
+        Raises:
+            AgentPayError: If the limits can't be fetched
+        """
+        return self.limits_cache(token).get(max_age=max_age, refresh=refresh)
@@ -0,0 +1,175 @@
+"""
+Pluggable JSON codec used by the transports
+
+The fastest available backend is picked on first use: msgspec, then orjson,
+then the standard library. msgspec comes first because it alone decodes
+purchase responses lazily: a PaymentResult keeps its "details" object as
+raw JSON until the attribute is first read, which wins when details are
+large and rarely read.
+
+Set AGENTPAY_JSON=msgspec|orjson|json to force a backend, or call use().
+
+Usage:
+    from agentpay import codec
+    
+    codec.get().name          # "msgspec", "orjson" or "json"
+    codec.use("json")         # force the standard library
+    codec.use(codec.Codec("custom", dumps=my_dumps, loads=my_loads))
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+from .models import RawJSON
+
+__all__ = ["Codec", "get", "use", "available"]
+
+PREFERENCE = ("msgspec", "orjson", "json")
+
+
+class Codec:
+    """
+    A JSON backend
+    
+    Args:
+        name: Backend name (for diagnostics)
+        dumps: Object -> UTF-8 bytes
+        loads: bytes/str -> object, raising ValueError on invalid JSON
+        loads_purchase: Like loads but may return "details" as RawJSON for
+            PaymentResult to decode later; defaults to loads
+    """
+    
+    __slots__ = ("name", "dumps", "loads", "loads_purchase")
+    
+    def __init__(
+        self,
+        name: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[Union[bytes, str]], Any],
+        loads_purchase: Optional[Callable[[Union[bytes, str]], Any]] = None
+    ):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+        self.loads_purchase = loads_purchase or loads
+    
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r})"
+
+
+def _stdlib() -> Codec:
+    encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+    
+    def dumps(obj: Any) -> bytes:
+        return encoder.encode(obj).encode("utf-8")
+    
+    return Codec("json", dumps, json.loads)
+
+
+def _orjson() -> Codec:
+    import orjson
+    
+    return Codec("orjson", orjson.dumps, orjson.loads)
+
+
+def _msgspec() -> Codec:
+    import msgspec
+    
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+    
+    class PurchaseResponse(msgspec.Struct):
+        # The fields parse_purchase_response() reads; anything else in the
+        # response is skipped without being decoded
+        success: Any = msgspec.UNSET
+        transactionId: Any = msgspec.UNSET
+        amount: Any = msgspec.UNSET
+        service: Any = msgspec.UNSET
+        message: Any = msgspec.UNSET
+        details: Union[msgspec.Raw, msgspec.UnsetType] = msgspec.UNSET
+        error: Any = msgspec.UNSET
+        code: Any = msgspec.UNSET
+        requiresApproval: Any = msgspec.UNSET
+        approvalId: Any = msgspec.UNSET
+        action: Any = msgspec.UNSET
+        estimatedAmount: Any = msgspec.UNSET
+    
+    purchase_decoder = msgspec.json.Decoder(PurchaseResponse)
+    asdict = msgspec.structs.asdict
+    unset = msgspec.UNSET
+    
+    def loads_purchase(data: Union[bytes, str]) -> Dict[str, Any]:
+        try:
+            response = purchase_decoder.decode(data)
+        except msgspec.ValidationError:
+            # Not an object (or an odd shape): fall back to a plain decode
+            return decoder.decode(data)
+        values = {k: v for k, v in asdict(response).items() if v is not unset}
+        details = values.get("details")
+        if details is not None:
+            values["details"] = RawJSON(details)
+        return values
+    
+    return Codec("msgspec", encoder.encode, decoder.decode, loads_purchase)
+
+
+_BACKENDS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+_codec = None  # type: Optional[Codec]
+_lock = threading.Lock()
+
+
+def available() -> Dict[str, bool]:
+    """Which backends can be imported in this environment"""
+    import importlib.util
+    
+    return {name: name == "json" or importlib.util.find_spec(name) is not None for name in PREFERENCE}
+
+
+def _select() -> Codec:
+    forced = os.getenv("AGENTPAY_JSON")
+    names = (forced,) if forced else PREFERENCE
+    for name in names:
+        factory = _BACKENDS.get(name)
+        if factory is None:
+            raise ValueError(f"Unknown AGENTPAY_JSON backend {name!r} (choose from {', '.join(PREFERENCE)})")
+        try:
+            return factory()
+        except ImportError:
+            if forced:
+                raise
+    return _stdlib()
+
+
+def get() -> Codec:
+    """Return the active codec, choosing one on first call"""
+    codec = _codec
+    if codec is None:
+        with _lock:
+            if _codec is None:
+                use(_select())
+            codec = _codec
+    return codec
+
+
+def use(codec: Union[str, Codec]) -> Codec:
+    """
+    Switch the codec used by every client
+    
+    Args:
+        codec: Backend name ("msgspec", "orjson", "json") or a Codec
+    
+    Raises:
+        ImportError: If the named backend isn't installed
+    """
+    global _codec
+    
+    if isinstance(codec, str):
+        factory = _BACKENDS.get(codec)
+        if factory is None:
+            raise ValueError(f"Unknown JSON backend {codec!r} (choose from {', '.join(PREFERENCE)})")
+        codec = factory()
+    _codec = codec
+    return codec
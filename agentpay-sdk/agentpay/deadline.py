@@ -0,0 +1,128 @@
+"""
+Deadline budgets for AgentPay calls
+
+A Deadline is an absolute point in time shared by every attempt of a call
+(and by every phase of a multi-step purchase flow), so retries, backoff and
+merchant steps can never run past the caller's latency target.
+
+Usage:
+    deadline = Deadline(10.0)
+    
+    deadline.enter("authorize")
+    auth = client.request("POST", "/v1/authorize", json=payload, deadline=deadline)
+    
+    deadline.enter("merchant")
+    deadline.sleep(processing_time)
+    
+    deadline.enter("confirm")
+    ...
+"""
+
+import time
+from typing import Optional, Union, Callable, Tuple
+
+from .errors import AgentPayError
+
+__all__ = ["Deadline"]
+
+
+class Deadline:
+    """
+    Absolute time budget for one logical operation
+    
+    Args:
+        seconds: Budget in seconds from now (None means unbounded)
+        clock: Monotonic time source
+    
+    Example:
+        deadline = Deadline(2.0)
+        client.pay("gift-card", 10.00, {"brand": "amazon"}, deadline=deadline)
+    """
+    
+    __slots__ = ("budget", "expires_at", "phase", "_clock")
+    
+    def __init__(self, seconds: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.budget = seconds
+        self.expires_at = None if seconds is None else clock() + seconds
+        self.phase: Optional[str] = None
+    
+    @classmethod
+    def coerce(cls, value: Union["Deadline", float, None]) -> "Deadline":
+        """Accept a Deadline, a number of seconds, or None"""
+        if isinstance(value, Deadline):
+            return value
+        return cls(value)
+    
+    @property
+    def bounded(self) -> bool:
+        return self.expires_at is not None
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None if unbounded"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self._clock())
+    
+    def expired(self) -> bool:
+        return self.expires_at is not None and self._clock() >= self.expires_at
+    
+    def timeout(self, default: float) -> float:
+        """
+        Per-attempt timeout: the default, capped by the time left
+        
+        Raises:
+            AgentPayError: DEADLINE_EXCEEDED if no time is left (a zero
+                timeout would be rejected or mean "no timeout" downstream)
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if remaining <= 0:
+            raise self.exceeded()
+        return min(default, remaining)
+    
+    def timeouts(self, connect: float, read: float) -> Tuple[float, float]:
+        """(connect, read) timeouts, each capped by the time left; raises like timeout()"""
+        return self.timeout(connect), self.timeout(read)
+    
+    def enter(self, phase: str) -> "Deadline":
+        """Mark the start of a named phase, failing if the budget is already spent"""
+        self.phase = phase
+        self.check()
+        return self
+    
+    def exceeded(self, cause: Optional[object] = None) -> AgentPayError:
+        """Build the DEADLINE_EXCEEDED error for the current phase"""
+        where = f" during the {self.phase} phase" if self.phase else ""
+        message = f"Deadline of {self.budget}s exceeded{where}"
+        if cause is not None:
+            message = f"{message}: {cause}"
+        details = {"phase": self.phase, "budget": self.budget}
+        if cause is not None:
+            details["original_error"] = str(cause)
+        return AgentPayError(message, code="DEADLINE_EXCEEDED", details=details)
+    
+    def check(self) -> None:
+        """Raise AgentPayError(code="DEADLINE_EXCEEDED") once the budget is spent"""
+        if self.expired():
+            raise self.exceeded()
+    
+    def sleep(self, seconds: float) -> None:
+        """Sleep for seconds, or raise DEADLINE_EXCEEDED if that would overrun"""
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            time.sleep(remaining)
+            raise self.exceeded()
+        time.sleep(seconds)
+    
+    async def asleep(self, seconds: float) -> None:
+        """Async version of sleep()"""
+        # Imported here so sync-only users never load asyncio
+        import asyncio
+        
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            await asyncio.sleep(remaining)
+            raise self.exceeded()
+        await asyncio.sleep(seconds)
@@ -0,0 +1,217 @@
+"""
+Scoped-token spending envelopes
+
+An envelope is one /v1/authorize call for a budget at a merchant, valid for
+a short TTL. Later purchases at that merchant draw the budget down from a
+local ledger and confirm against the envelope's authorization directly,
+skipping the per-purchase authorize round trip.
+
+Usage:
+    envelopes = EnvelopeManager(budget=100.00, ttl=300)
+    
+    reservation = envelopes.reserve("doordash.com", "food", 12.50)
+    if reservation is None:
+        auth = request_authorization("doordash.com", envelopes.budget, ...)
+        reservation = envelopes.open("doordash.com", "food", auth).reserve(12.50)
+    ...
+    reservation.cover(amount_charged)  # extra fees held from the envelope, or AgentPayError
+    reservation.commit(amount_charged) # or reservation.release() on failure
+"""
+
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple, Callable
+
+from .errors import AgentPayError
+
+__all__ = ["SpendingEnvelope", "Reservation", "EnvelopeManager"]
+
+DEFAULT_ENVELOPE_TTL = 300.0
+# Stop drawing from an envelope this many seconds before it expires
+DEFAULT_RENEW_MARGIN = 5.0
+# Tolerance for float rounding when comparing amounts to holds
+_EPSILON = 1e-9
+
+
+class Reservation:
+    """Funds held against an envelope for one in-progress purchase"""
+    
+    __slots__ = ("envelope", "amount", "_settled")
+    
+    def __init__(self, envelope: "SpendingEnvelope", amount: float):
+        self.envelope = envelope
+        self.amount = amount
+        self._settled = False
+    
+    @property
+    def authorization_id(self) -> str:
+        return self.envelope.authorization_id
+    
+    @property
+    def scoped_token(self) -> Optional[str]:
+        return self.envelope.scoped_token
+    
+    def cover(self, final_amount: float) -> None:
+        """
+        Grow the hold to final_amount (e.g. a charge that added taxes or fees)
+        
+        The difference is drawn from the envelope like a new reservation.
+        
+        Raises:
+            AgentPayError: AMOUNT_EXCEEDS_RESERVATION if the envelope can't cover it
+                (the hold is left as it was)
+        """
+        extra = final_amount - self.amount
+        if extra <= _EPSILON:
+            return
+        if self._settled or not self.envelope._hold(extra):
+            raise self._exceeded(final_amount)
+        self.amount = final_amount
+    
+    def commit(self, final_amount: Optional[float] = None) -> None:
+        """
+        Record the purchase as spent (defaults to the reserved amount)
+        
+        Raises:
+            AgentPayError: AMOUNT_EXCEEDS_RESERVATION if final_amount is more than
+                was held; the reservation stays open so it can still be released
+        """
+        if final_amount is not None and final_amount > self.amount + _EPSILON:
+            raise self._exceeded(final_amount)
+        if not self._settled:
+            self._settled = True
+            self.envelope._settle(self.amount, self.amount if final_amount is None else final_amount)
+    
+    def release(self) -> None:
+        """Return the held funds to the envelope (purchase did not happen)"""
+        if not self._settled:
+            self._settled = True
+            self.envelope._settle(self.amount, 0.0)
+    
+    def _exceeded(self, final_amount: float) -> AgentPayError:
+        return AgentPayError(
+            f"Charge of ${final_amount:.2f} exceeds the ${self.amount:.2f} held against the spending envelope",
+            code="AMOUNT_EXCEEDS_RESERVATION",
+            details={"final_amount": final_amount, "reserved_amount": self.amount,
+                     "authorization_id": self.authorization_id}
+        )
+
+
+class SpendingEnvelope:
+    """
+    A scoped authorization for a budget with a local spend ledger
+    
+    Args:
+        authorization_id: Authorization returned by /v1/authorize
+        scoped_token: Scoped token returned by /v1/authorize
+        budget: Total amount authorized
+        ttl: Seconds the envelope may be drawn from
+        clock: Monotonic time source
+    """
+    
+    def __init__(
+        self,
+        authorization_id: str,
+        scoped_token: Optional[str],
+        budget: float,
+        ttl: float = DEFAULT_ENVELOPE_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.authorization_id = authorization_id
+        self.scoped_token = scoped_token
+        self.budget = budget
+        self.expires_at = clock() + ttl
+        self.spent = 0.0
+        self.held = 0.0
+        self._clock = clock
+        self._lock = threading.Lock()
+    
+    @property
+    def remaining(self) -> float:
+        """Budget not yet spent or held"""
+        return self.budget - self.spent - self.held
+    
+    def expired(self, margin: float = 0.0) -> bool:
+        """True once the envelope is (or is within margin of being) expired"""
+        return self._clock() + margin >= self.expires_at
+    
+    def reserve(self, amount: float, margin: float = 0.0) -> Optional[Reservation]:
+        """Hold amount for a purchase, or return None if the envelope can't cover it"""
+        with self._lock:
+            if self.expired(margin) or amount > self.remaining:
+                return None
+            self.held += amount
+            return Reservation(self, amount)
+    
+    def _hold(self, amount: float) -> bool:
+        """Add to the held funds if the envelope is live and can cover it"""
+        with self._lock:
+            if self.expired() or amount > self.remaining + _EPSILON:
+                return False
+            self.held += amount
+            return True
+    
+    def _settle(self, held: float, spent: float) -> None:
+        with self._lock:
+            self.held -= held
+            self.spent += spent
+
+
+class EnvelopeManager:
+    """
+    Keeps one live spending envelope per (merchant, category)
+    
+    Args:
+        budget: Amount to authorize for each new envelope
+        ttl: Seconds each envelope stays usable
+        renew_margin: Stop using an envelope this close to expiry
+        clock: Monotonic time source
+    """
+    
+    def __init__(
+        self,
+        budget: float,
+        ttl: float = DEFAULT_ENVELOPE_TTL,
+        renew_margin: float = DEFAULT_RENEW_MARGIN,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.budget = budget
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        self._clock = clock
+        self._envelopes: Dict[Tuple[str, str], SpendingEnvelope] = {}
+        self._lock = threading.Lock()
+    
+    def covers(self, amount: float) -> bool:
+        """True if a purchase of this size can ever be served from an envelope"""
+        return 0 < amount <= self.budget
+    
+    def authorization_metadata(self) -> Dict[str, Any]:
+        """Metadata asking /v1/authorize for a scoped envelope authorization"""
+        return {"envelope": {"budget": self.budget, "ttlSeconds": self.ttl}}
+    
+    def reserve(self, merchant: str, category: str, amount: float) -> Optional[Reservation]:
+        """Draw from the live envelope for this merchant, if one can cover amount"""
+        with self._lock:
+            envelope = self._envelopes.get((merchant, category))
+        if envelope is None:
+            return None
+        return envelope.reserve(amount, self.renew_margin)
+    
+    def open(self, merchant: str, category: str, auth_response: Dict[str, Any]) -> SpendingEnvelope:
+        """Register the envelope granted by an authorize response"""
+        envelope = SpendingEnvelope(
+            auth_response["authorizationId"],
+            auth_response.get("scopedToken"),
+            self.budget,
+            self.ttl,
+            clock=self._clock
+        )
+        with self._lock:
+            self._envelopes[(merchant, category)] = envelope
+        return envelope
+    
+    def discard(self, merchant: str, category: str) -> None:
+        """Forget the envelope for a merchant (e.g. after the server rejects it)"""
+        with self._lock:
+            self._envelopes.pop((merchant, category), None)
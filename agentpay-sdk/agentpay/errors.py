@@ -0,0 +1,14 @@
+"""
+AgentPay SDK exceptions
+"""
+
+from typing import Optional, Dict
+
+
+class AgentPayError(Exception):
+    """Base exception for AgentPay SDK errors"""
+    def __init__(self, message: str, code: Optional[str] = None, details: Optional[Dict] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details or {}
@@ -0,0 +1,259 @@
+"""
+Non-blocking structured event log
+
+Purchase flows report what they are doing (authorization requested and
+granted, merchant step done, confirmed, with timings) as structured events
+instead of printing. emit() only appends to an in-memory queue; a background
+thread hands events to the sinks in batches, so the purchase path never
+waits on a terminal, a file or a lock held by another writer. When the queue
+is full the oldest events are dropped (and counted) rather than blocking.
+
+A sink is any callable taking a list of Events. JSONLinesSink, RingBufferSink
+and ConsoleSink cover the common cases.
+
+Usage:
+    from agentpay.events import EventLog, JSONLinesSink, RingBufferSink
+    
+    recent = RingBufferSink(1000)
+    log = EventLog([JSONLinesSink("purchases.jsonl"), recent])
+    tool = AgentPayTool(agent_token="...", events=log)
+    ...
+    log.flush()
+    recent.events(kind="purchase.confirmed")
+    
+    # Or add sinks to the shared log every tool uses by default
+    agentpay.events.default_log.add_sink(JSONLinesSink(sys.stdout))
+"""
+
+import atexit
+import io
+import itertools
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, IO, Iterable, List, Optional, Union
+
+from . import codec
+
+__all__ = ["Event", "EventLog", "JSONLinesSink", "RingBufferSink", "ConsoleSink", "default_log"]
+
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+Sink = Callable[[List["Event"]], None]
+
+
+class Event:
+    """One structured event"""
+    
+    __slots__ = ("seq", "kind", "time", "fields")
+    
+    def __init__(self, seq: int, kind: str, time: float, fields: Dict[str, Any]):
+        self.seq = seq
+        self.kind = kind
+        self.time = time  # Unix seconds
+        self.fields = fields
+    
+    def __repr__(self) -> str:
+        return f"Event({self.kind!r}, {self.fields!r})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict: event, ts and the event's fields"""
+        return {"event": self.kind, "ts": self.time, **self.fields}
+
+
+class EventLog:
+    """
+    Queue-backed event log with pluggable sinks (thread-safe)
+    
+    Args:
+        sinks: Callables receiving batches of Events
+        max_queue: Events held before the oldest are dropped
+        flush_interval: Seconds the writer waits for a batch to fill
+    
+    Attributes:
+        dropped: Events discarded because the queue was full
+        errors: Sink calls that raised (the events are lost for that sink only)
+    """
+    
+    def __init__(
+        self,
+        sinks: Iterable[Sink] = (),
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.sinks = list(sinks)  # type: List[Sink]
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.errors = 0
+        self._queue = deque(maxlen=max_queue)  # type: deque
+        self._seq = itertools.count(1)
+        self._emitted = 0
+        self._written = 0
+        self._written_cond = threading.Condition()
+        self._wake = threading.Event()
+        self._queue_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None  # type: Optional[threading.Thread]
+        self._closed = False
+    
+    def add_sink(self, sink: Sink) -> None:
+        """Start sending events to sink"""
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+    
+    def remove_sink(self, sink: Sink) -> None:
+        """Stop sending events to sink"""
+        with self._lock:
+            self.sinks = [existing for existing in self.sinks if existing is not sink]
+    
+    def emit(self, kind: str, **fields: Any) -> None:
+        """
+        Record an event without blocking
+        
+        A no-op while the log has no sinks.
+        """
+        if not self.sinks or self._closed:
+            return
+        if self._thread is None:
+            self._start()
+        event = Event(0, kind, time.time(), fields)
+        # Held only to number and enqueue, so the queue stays in sequence order
+        with self._queue_lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+            event.seq = self._emitted = next(self._seq)
+            # A full deque discards its oldest entry
+            self._queue.append(event)
+    
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="agentpay-events", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+    
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+            if self._closed and not self._queue:
+                return
+    
+    def _drain(self) -> None:
+        queue = self._queue
+        while queue:
+            batch = []
+            while queue and len(batch) < 1000:
+                batch.append(queue.popleft())
+            for sink in self.sinks:
+                try:
+                    sink(batch)
+                except Exception:
+                    self.errors += 1
+            with self._written_cond:
+                self._written = batch[-1].seq
+                self._written_cond.notify_all()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every event emitted so far reached the sinks; True if in time"""
+        target = self._emitted
+        if self._thread is None or self._written >= target:
+            return True
+        self._wake.set()
+        with self._written_cond:
+            return self._written_cond.wait_for(lambda: self._written >= target, timeout)
+    
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Deliver queued events, then stop the writer thread"""
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._wake.set()
+            thread.join(timeout)
+
+
+class JSONLinesSink:
+    """
+    Writes each event as one JSON object per line
+    
+    Args:
+        target: File path (opened for append) or an open text/binary stream
+    """
+    
+    def __init__(self, target: Union[str, IO]):
+        if isinstance(target, str):
+            self._stream = open(target, "ab")
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+        self._text = isinstance(self._stream, io.TextIOBase)
+    
+    def __call__(self, events: List[Event]) -> None:
+        dumps = codec.get().dumps
+        data = b"".join(dumps(event.to_dict()) + b"\n" for event in events)
+        self._stream.write(data.decode("utf-8") if self._text else data)
+        self._stream.flush()
+    
+    def close(self) -> None:
+        """Close the file if this sink opened it"""
+        if self._owned:
+            self._stream.close()
+
+
+class RingBufferSink:
+    """
+    Keeps the most recent events in memory
+    
+    Args:
+        capacity: Events kept; older ones are discarded
+    """
+    
+    def __init__(self, capacity: int = 1000):
+        self._events = deque(maxlen=capacity)  # type: deque
+    
+    def __call__(self, events: List[Event]) -> None:
+        self._events.extend(events)
+    
+    def __len__(self) -> int:
+        return len(self._events)
+    
+    def events(self, kind: Optional[str] = None) -> List[Event]:
+        """Snapshot of the buffered events, oldest first, optionally of one kind"""
+        snapshot = list(self._events)
+        if kind is None:
+            return snapshot
+        return [event for event in snapshot if event.kind == kind]
+    
+    def clear(self) -> None:
+        self._events.clear()
+
+
+class ConsoleSink:
+    """
+    Human-readable one-line rendering of each event (stderr by default)
+    
+    Args:
+        stream: Text stream to write to
+    """
+    
+    def __init__(self, stream: Optional[IO[str]] = None):
+        self._stream = stream
+    
+    def __call__(self, events: List[Event]) -> None:
+        stream = self._stream or sys.stderr
+        lines = []
+        for event in events:
+            details = " ".join(f"{key}={value}" for key, value in event.fields.items())
+            lines.append(f"{event.kind} {details}\n")
+        stream.write("".join(lines))
+        stream.flush()
+
+
+# Shared log the SDK integrations use unless given their own; it has no
+# sinks (and emit() is a no-op) until one is added
+default_log = EventLog()
@@ -0,0 +1,245 @@
+"""
+Parallel purchase executor with a shared budget
+
+A PurchaseExecutor runs purchases on a thread or process pool and hands
+back a Future for each one. Several agents (or tools) can share one
+executor: its pool size is then a crew-wide cap on purchases in flight, and
+its budget is a crew-wide cap on spend. A purchase's amount is held against
+the budget when it is submitted and settled when it finishes, so the
+executor never starts more than the budget allows, even when dozens of
+purchases are queued at once.
+
+Budget accounting stays in the submitting process, so it also holds with a
+process pool; only the purchase function and its request need to pickle.
+Process-pool workers are numbered 0, 1, ... as they start; worker_index()
+tells an initializer which one it is running in (e.g. to seed a simulator).
+
+Usage:
+    executor = PurchaseExecutor(purchase_fn, max_concurrency=8, budget=200.00)
+    
+    futures = [executor.submit(request) for request in requests]
+    for future in as_completed(futures):
+        print(future.result())
+    
+    executor.remaining       # budget not yet spent or held
+    executor.shutdown()
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Set, Union
+
+from .errors import AgentPayError
+
+__all__ = ["PurchaseExecutor", "worker_index"]
+
+DEFAULT_CONCURRENCY = 8
+
+# Tolerance for float rounding when comparing amounts to the budget
+_EPSILON = 1e-9
+
+# Number of this process-pool worker; None outside one
+_worker_index = None  # type: Optional[int]
+
+
+def worker_index() -> Optional[int]:
+    """Number of the PurchaseExecutor process-pool worker this runs in, or None"""
+    return _worker_index
+
+
+def _start_worker(counter: Any, initializer: Optional[Callable[..., None]], initargs: tuple) -> None:
+    """Process-pool initializer: take the next worker number, then run the caller's initializer"""
+    global _worker_index
+    with counter.get_lock():
+        _worker_index = counter.value
+        counter.value += 1
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _request_amount(request: Mapping[str, Any]) -> float:
+    return float(request.get("amount") or 0.0)
+
+
+def _charged_amount(result: Any, held: float) -> float:
+    """Amount a finished purchase spent: PaymentResults report it, anything else spent what it held"""
+    success = getattr(result, "success", None)
+    if success is None:
+        return held
+    if not success:
+        return 0.0
+    amount = getattr(result, "amount", None)
+    return held if amount is None else float(amount)
+
+
+def _settled_amount(charged: Future, held: float) -> float:
+    """Amount a deferred charge resolved to; one that failed keeps what it held"""
+    if charged.cancelled() or charged.exception() is not None:
+        return held
+    return float(charged.result())
+
+
+class PurchaseExecutor:
+    """
+    Pool of purchase workers with a concurrency cap and an optional budget
+    
+    Args:
+        purchase: Function running one purchase; called with the submitted request
+        max_concurrency: Purchases in flight at once (the pool size)
+        budget: Total amount all submitted purchases may spend (None is unlimited)
+        processes: Run purchases in a process pool instead of threads
+        amount: Amount a request will spend (defaults to request["amount"])
+        charged: Amount a finished purchase actually spent, given its result and
+            the amount held; return 0 for failures so their hold is released. A
+            Future of the amount defers settling (e.g. until a background
+            confirmation lands); the hold stays in place until it resolves
+        initializer: Called once in each worker (e.g. to build a client per
+            process); in a process pool worker_index() is already set
+        initargs: Arguments for initializer
+    """
+    
+    def __init__(
+        self,
+        purchase: Callable[[Any], Any],
+        *,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        budget: Optional[float] = None,
+        processes: bool = False,
+        amount: Callable[[Any], float] = _request_amount,
+        charged: Callable[[Any, float], Union[float, Future]] = _charged_amount,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = ()
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.purchase = purchase
+        self.max_concurrency = max_concurrency
+        self.budget = budget
+        self.processes = processes
+        self._amount = amount
+        self._charged = charged
+        if processes:
+            context = multiprocessing.get_context()
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_concurrency, mp_context=context, initializer=_start_worker,
+                initargs=(context.Value("i", 0), initializer, initargs)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=max_concurrency, thread_name_prefix="agentpay-purchase",
+                initializer=initializer, initargs=initargs
+            )
+        self.spent = 0.0
+        self.held = 0.0
+        self._pending = set()  # type: Set[Future]
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def __enter__(self) -> "PurchaseExecutor":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+    
+    @property
+    def remaining(self) -> Optional[float]:
+        """Budget not yet spent or held (None when unlimited)"""
+        if self.budget is None:
+            return None
+        with self._lock:
+            return self.budget - self.spent - self.held
+    
+    def pending(self) -> int:
+        """Purchases queued or in flight"""
+        with self._lock:
+            return len(self._pending)
+    
+    def submit(self, request: Any) -> Future:
+        """
+        Queue one purchase and return a Future for its result
+        
+        A purchase the remaining budget can't cover is not started; its
+        Future fails with AgentPayError(code="BUDGET_EXCEEDED").
+        
+        Raises:
+            RuntimeError: If the executor has been shut down
+        """
+        amount = self._amount(request)
+        outer = Future()  # type: Future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PurchaseExecutor is shut down")
+            if self.budget is not None and amount > self.budget - self.spent - self.held + _EPSILON:
+                remaining = self.budget - self.spent - self.held
+                outer.set_exception(AgentPayError(
+                    f"Amount ${amount:.2f} exceeds the remaining shared budget of ${remaining:.2f}",
+                    code="BUDGET_EXCEEDED",
+                    details={"requested_amount": amount, "remaining_budget": remaining}
+                ))
+                return outer
+            self.held += amount
+            self._pending.add(outer)
+        
+        try:
+            inner = self._pool.submit(self.purchase, request)
+        except BaseException:
+            # The pool refused it (e.g. shut down underneath us): nothing will settle the hold
+            with self._lock:
+                self.held -= amount
+                self._pending.discard(outer)
+            raise
+        # Cancelling the returned Future cancels the purchase if it hasn't started
+        outer.add_done_callback(lambda done: inner.cancel() if done.cancelled() else None)
+        inner.add_done_callback(lambda done: self._settle(outer, done, amount))
+        return outer
+    
+    def _settle(self, outer: Future, inner: Future, held: float) -> None:
+        # Runs before the caller's Future resolves, so the budget is already
+        # up to date when result() returns
+        error = None if inner.cancelled() else inner.exception()
+        charged = 0.0  # type: Union[float, Future]
+        if not inner.cancelled() and error is None:
+            try:
+                charged = self._charged(inner.result(), held)
+            except Exception:
+                charged = held
+        with self._lock:
+            self._pending.discard(outer)
+        if isinstance(charged, Future):
+            charged.add_done_callback(lambda done: self._account(held, _settled_amount(done, held)))
+        else:
+            self._account(held, charged)
+        
+        if not outer.set_running_or_notify_cancel():
+            return
+        if inner.cancelled():
+            outer.set_exception(AgentPayError("Purchase was cancelled", code="CANCELLED"))
+        elif error is not None:
+            outer.set_exception(error)
+        else:
+            outer.set_result(inner.result())
+    
+    def _account(self, held: float, charged: float) -> None:
+        """Turn a purchase's hold into what it actually spent"""
+        with self._lock:
+            self.held -= held
+            self.spent += charged
+    
+    def map(self, requests: Iterable[Any]) -> Iterator[Any]:
+        """
+        Run many purchases in parallel, yielding results in input order
+        
+        A failed purchase yields its exception instead of raising, so one
+        failure never hides the results after it.
+        """
+        futures = [self.submit(request) for request in requests]
+        for future in futures:
+            error = future.exception()
+            yield error if error is not None else future.result()
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting purchases; with wait, block until queued ones finish"""
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=wait)
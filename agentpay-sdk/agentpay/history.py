@@ -0,0 +1,230 @@
+"""
+Streaming transaction history
+
+Pages through GET /transactions lazily. While the caller works through one
+page, the next is already being fetched on a background thread, so a long
+audit runs at network speed and never holds more than two pages in memory.
+
+Usage:
+    for txn in agentpay.transactions(since="2025-01-01", category="food"):
+        print(txn.id, txn.amount, txn.merchant)
+    
+    # Stop early at any point; the prefetch thread is released
+    recent = itertools.islice(client.transactions(status="completed"), 20)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple, Union, TYPE_CHECKING
+
+from . import codec
+from ._protocol import resolve_token
+from .errors import AgentPayError
+
+if TYPE_CHECKING:
+    from .client import Client
+
+__all__ = ["Transaction", "iter_transactions"]
+
+TRANSACTIONS_ENDPOINT = "/api/v1/transactions"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# datetime/date, ISO 8601 string, or Unix seconds
+TimeBound = Union[datetime, date, str, int, float]
+
+
+@dataclass
+class Transaction:
+    """One entry of the account's transaction history"""
+    id: str
+    amount: float
+    description: Optional[str] = None
+    status: Optional[str] = None
+    agent_id: Optional[str] = None
+    created: Optional[int] = None  # Unix seconds
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> "Transaction":
+        """Build from a /transactions list entry"""
+        return cls(
+            id=data.get("id"),
+            amount=data.get("amount"),
+            description=data.get("description"),
+            status=data.get("status"),
+            agent_id=data.get("agentId"),
+            created=data.get("created"),
+            metadata=data.get("metadata") or {}
+        )
+    
+    @property
+    def merchant(self) -> Optional[str]:
+        """Merchant (or service) the money went to, if recorded"""
+        return self.metadata.get("merchant") or self.metadata.get("service")
+    
+    @property
+    def category(self) -> Optional[str]:
+        """Spending category, if recorded"""
+        return self.metadata.get("category")
+    
+    @property
+    def created_at(self) -> Optional[datetime]:
+        """Creation time as an aware UTC datetime"""
+        if self.created is None:
+            return None
+        return datetime.fromtimestamp(self.created, tz=timezone.utc)
+
+
+def _to_datetime(value: TimeBound) -> datetime:
+    """Normalise a time bound to an aware datetime (naive values are UTC)"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"Invalid ISO 8601 time: {value!r}") from None
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _matches(value: Optional[str], wanted: Optional[str]) -> bool:
+    return wanted is None or (value is not None and value.lower() == wanted)
+
+
+def parse_transaction_page(status_code: int, data: Any) -> Tuple[List[Transaction], bool]:
+    """Turn a decoded /transactions response into (transactions, has_more)"""
+    if status_code != 200 or not isinstance(data, dict):
+        error = data if isinstance(data, dict) else {}
+        raise AgentPayError(
+            error.get("error") or f"Listing transactions failed with status {status_code}",
+            code=error.get("code", "UNKNOWN_ERROR"),
+            details={"status": status_code}
+        )
+    entries = data.get("data") or []
+    return [Transaction.from_api(entry) for entry in entries], bool(data.get("has_more"))
+
+
+def iter_transactions(
+    client: "Client",
+    *,
+    since: Optional[TimeBound] = None,
+    until: Optional[TimeBound] = None,
+    merchant: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    where: Optional[Callable[[Transaction], bool]] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    prefetch: bool = True,
+    token: Optional[str] = None
+) -> Iterator[Transaction]:
+    """
+    Lazily yield every transaction matching the filters, newest first
+    
+    Date range, status and agent are filtered by the server; merchant,
+    category and where are applied client-side to each page. Entries that
+    shift onto the next page because new transactions arrived mid-walk are
+    yielded only once.
+    
+    Args:
+        client: Client used for the requests
+        since: Earliest creation time (inclusive)
+        until: Latest creation time (inclusive)
+        merchant: Only transactions for this merchant/service (case-insensitive)
+        category: Only transactions in this category (case-insensitive)
+        status: Only transactions with this status (e.g. "completed")
+        agent_id: Only transactions made by this agent
+        where: Extra predicate a transaction must satisfy
+        page_size: Transactions requested per page (1-1000)
+        prefetch: Fetch the next page while the current one is consumed
+        token: Override the client token
+    
+    Raises:
+        AgentPayError: If a page request fails; transactions already yielded stay valid
+        ValueError: On an invalid page_size or time bound
+    """
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    
+    headers = {"Authorization": f"Bearer {resolve_token(token, client.token)}"}
+    start = _to_datetime(since) if since is not None else None
+    end = _to_datetime(until) if until is not None else None
+    query = {"limit": page_size}  # type: Dict[str, Any]
+    if start is not None:
+        query["from"] = start.isoformat()
+    if end is not None:
+        query["to"] = end.isoformat()
+    if status:
+        query["status"] = status
+    if agent_id:
+        query["agentId"] = agent_id
+    
+    low = start.timestamp() if start is not None else None
+    high = end.timestamp() if end is not None else None
+    merchant = merchant.lower() if merchant else None
+    category = category.lower() if category else None
+    
+    def fetch(offset: int) -> Tuple[List[Transaction], bool]:
+        response = client.request("GET", TRANSACTIONS_ENDPOINT, params=dict(query, offset=offset), headers=headers)
+        try:
+            data = codec.get().loads(response.content)
+        except ValueError:
+            raise AgentPayError(
+                f"Invalid JSON response from AgentPay API (status {response.status_code})",
+                code="INVALID_RESPONSE"
+            )
+        return parse_transaction_page(response.status_code, data)
+    
+    def wanted(txn: Transaction) -> bool:
+        if txn.created is not None:
+            # Servers that ignore from/to still get the range applied
+            if low is not None and txn.created < low:
+                return False
+            if high is not None and txn.created > high:
+                return False
+        return (
+            _matches(txn.merchant, merchant)
+            and _matches(txn.category, category)
+            and (where is None or where(txn))
+        )
+    
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agentpay-history") if prefetch else None
+    pending = None
+    offset = 0
+    previous = frozenset()  # type: frozenset
+    try:
+        page, has_more = fetch(offset)
+        while True:
+            offset += len(page)
+            more = has_more and bool(page)
+            if more and executor is not None:
+                pending = executor.submit(fetch, offset)
+            
+            seen = set()
+            for txn in page:
+                seen.add(txn.id)
+                if txn.id not in previous and wanted(txn):
+                    yield txn
+            previous = frozenset(seen)
+            
+            if not more:
+                return
+            if pending is not None:
+                page, has_more = pending.result()
+                pending = None
+            else:
+                page, has_more = fetch(offset)
+    finally:
+        if pending is not None:
+            pending.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
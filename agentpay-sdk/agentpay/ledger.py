@@ -0,0 +1,386 @@
+"""
+Local SQLite transaction ledger
+
+Keeps a copy of the account's transaction history in a SQLite file, indexed
+by time, merchant, category and agent. sync() only fetches transactions
+newer than the last one it saw, and spending queries are answered from the
+local file without touching the network.
+
+Usage:
+    from agentpay.ledger import Ledger
+    
+    ledger = Ledger(client=agentpay.get_client())
+    ledger.sync()                                   # incremental
+    ledger.spent(since="today", merchant="doordash.com")
+    ledger.query(category="travel", limit=20)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from typing import Optional, Dict, Any, List, Tuple, Union, TYPE_CHECKING
+
+from .history import Transaction, TimeBound, _to_datetime
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .client import Client
+
+__all__ = ["Ledger", "period_start", "PERIODS"]
+
+# Named periods accepted wherever a since bound is (UTC calendar day for "today")
+PERIODS = ("today", "7d", "30d", "all")
+
+SYNC_PAGE_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    created INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    merchant TEXT,
+    category TEXT,
+    agent_id TEXT,
+    status TEXT,
+    description TEXT,
+    metadata TEXT,
+    pending INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS transactions_created ON transactions (created);
+CREATE INDEX IF NOT EXISTS transactions_merchant ON transactions (merchant, created);
+CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category, created);
+CREATE INDEX IF NOT EXISTS transactions_agent ON transactions (agent_id, created);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+_UPSERT = (
+    "INSERT OR REPLACE INTO transactions "
+    "(id, created, amount, merchant, category, agent_id, status, description, metadata, pending) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_COLUMNS = "id, created, amount, agent_id, status, description, metadata"
+
+
+def period_start(period: str, now: Optional[float] = None) -> Optional[datetime]:
+    """
+    Start of a named period ("today", "7d", "30d", "all")
+    
+    Returns:
+        An aware UTC datetime, or None for "all"
+    """
+    current = datetime.fromtimestamp(time.time() if now is None else now, tz=timezone.utc)
+    if period == "today":
+        return current.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "7d":
+        return current - timedelta(days=7)
+    if period == "30d":
+        return current - timedelta(days=30)
+    if period == "all":
+        return None
+    raise ValueError(f"Unknown period {period!r} (choose from {', '.join(PERIODS)})")
+
+
+def _epoch(bound: Union[TimeBound, None]) -> Optional[float]:
+    if bound is None:
+        return None
+    if isinstance(bound, str) and bound in PERIODS:
+        start = period_start(bound)
+        return start.timestamp() if start is not None else None
+    return _to_datetime(bound).timestamp()
+
+
+def _default_path(client: Optional["Client"]) -> str:
+    """One file per account, so tokens never share a ledger"""
+    env_path = os.getenv("AGENTPAY_LEDGER")
+    if env_path:
+        return env_path
+    if client is not None:
+        account = f"{client.base_url}|{client.token}"
+    else:
+        from . import _config
+        
+        account = f"{_config['base_url']}|{_config['token']}"
+    name = f"ledger-{sha256(account.encode('utf-8')).hexdigest()[:16]}.sqlite3"
+    return os.path.join(os.path.expanduser("~"), ".agentpay", name)
+
+
+class Ledger:
+    """
+    SQLite-backed local copy of the transaction history
+    
+    Safe to share across threads. Purchases the SDK integrations confirm can
+    be recorded straight away with record_purchase(); those rows are marked
+    pending and replaced by the server's copy once a sync fetches it. A
+    pending row the server still hasn't listed once a sync has fetched past
+    its creation time is dropped.
+    
+    Args:
+        path: SQLite file (":memory:" for a throwaway ledger); defaults to
+            AGENTPAY_LEDGER or ~/.agentpay/ledger-<account>.sqlite3
+        client: Client used by sync() (defaults to the shared client)
+    """
+    
+    def __init__(self, path: Optional[str] = None, client: Optional["Client"] = None):
+        self.client = client
+        self.path = path or _default_path(client)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ":memory:":
+            # Readers in other processes never block the syncing writer
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+    
+    def __enter__(self) -> "Ledger":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._db.close()
+    
+    def _state(self, key: str) -> Any:
+        row = self._db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_state(self, key: str, value: Any) -> None:
+        self._db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+    
+    @property
+    def cursor(self) -> Optional[int]:
+        """Creation time of the newest transaction fetched from the server"""
+        with self._lock:
+            return self._state("cursor")
+    
+    @property
+    def last_synced(self) -> Optional[float]:
+        """Unix time of the last successful sync, or None if never synced"""
+        with self._lock:
+            return self._state("last_synced")
+    
+    def sync(self, *, full: bool = False, max_age: Optional[float] = None) -> int:
+        """
+        Fetch transactions created since the last sync
+        
+        The walk restarts from the newest creation time already stored
+        (inclusive), so a transaction sharing that second is never missed;
+        rows already present are simply overwritten.
+        
+        Args:
+            full: Refetch the whole history (picks up status changes such as refunds)
+            max_age: Skip the sync if the last one finished less than this many seconds ago
+        
+        Returns:
+            Number of transactions written
+        
+        Raises:
+            AgentPayError: If a page request fails (rows from earlier pages are kept)
+        """
+        if max_age is not None:
+            last = self.last_synced
+            if last is not None and time.time() - last < max_age:
+                return 0
+        
+        since = None if full else self.cursor
+        if self.client is not None:
+            walk = self.client.transactions(since=since, page_size=SYNC_PAGE_SIZE)
+        else:
+            from . import transactions
+            
+            walk = transactions(since=since, page_size=SYNC_PAGE_SIZE)
+        
+        newest = since
+        written = 0
+        batch = []  # type: List[Transaction]
+        
+        for txn in walk:
+            batch.append(txn)
+            if txn.created is not None and (newest is None or txn.created > newest):
+                newest = txn.created
+            if len(batch) >= SYNC_PAGE_SIZE:
+                written += self._write(batch)
+                batch = []
+        written += self._write(batch)
+        
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                if newest is not None:
+                    self._set_state("cursor", newest)
+                    # Unlisted local rows from before the newest server row never landed. The next
+                    # walk starts at that second, so rows from it or later wait for another sync
+                    self._db.execute("DELETE FROM transactions WHERE pending = 1 AND created < ?", (newest,))
+                self._set_state("last_synced", time.time())
+        return written
+    
+    def _write(self, transactions: List[Transaction], pending: bool = False) -> int:
+        if not transactions:
+            return 0
+        rows = [
+            (
+                txn.id,
+                int(txn.created if txn.created is not None else time.time()),
+                float(txn.amount or 0.0),
+                (txn.merchant or "").lower() or None,
+                (txn.category or "").lower() or None,
+                txn.agent_id,
+                txn.status,
+                txn.description,
+                json.dumps(txn.metadata, separators=(",", ":")) if txn.metadata else None,
+                int(pending)
+            )
+            for txn in transactions
+        ]
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany(_UPSERT, rows)
+        return len(rows)
+    
+    def record(self, transaction: Transaction) -> None:
+        """Store a transaction as if it had been synced"""
+        self._write([transaction])
+    
+    def record_purchase(
+        self,
+        transaction_id: str,
+        amount: float,
+        merchant: Optional[str] = None,
+        category: Optional[str] = None,
+        *,
+        description: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        created: Optional[float] = None
+    ) -> None:
+        """
+        Record a purchase the caller just confirmed, ahead of the next sync
+        
+        The row counts toward spending queries immediately and is replaced
+        by the server's copy once a sync has fetched past it.
+        """
+        metadata = {}  # type: Dict[str, Any]
+        if merchant:
+            metadata["merchant"] = merchant
+        if category:
+            metadata["category"] = category
+        transaction = Transaction(
+            id=transaction_id,
+            amount=amount,
+            description=description,
+            status="completed",
+            agent_id=agent_id,
+            created=int(created if created is not None else time.time()),
+            metadata=metadata
+        )
+        self._write([transaction], pending=True)
+    
+    def _where(
+        self,
+        since: Union[TimeBound, None],
+        until: Union[TimeBound, None],
+        merchant: Optional[str],
+        category: Optional[str],
+        agent_id: Optional[str],
+        status: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        clauses = []
+        params = []  # type: List[Any]
+        low = _epoch(since)
+        high = _epoch(until)
+        if merchant:
+            clauses.append("merchant = ?")
+            params.append(merchant.lower())
+        if category:
+            clauses.append("category = ?")
+            params.append(category.lower())
+        if agent_id:
+            clauses.append("agent_id = ?")
+            params.append(agent_id)
+        if low is not None:
+            clauses.append("created >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append("created <= ?")
+            params.append(high)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def totals(
+        self,
+        *,
+        since: Union[TimeBound, None] = None,
+        until: Union[TimeBound, None] = None,
+        merchant: Optional[str] = None,
+        category: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        status: Optional[str] = "completed"
+    ) -> Tuple[float, int]:
+        """
+        Total amount and number of matching transactions
+        
+        Args:
+            since: Earliest creation time (datetime, date, ISO string, Unix
+                seconds, or one of PERIODS such as "today")
+            until: Latest creation time (inclusive)
+            merchant: Merchant/service (case-insensitive)
+            category: Category (case-insensitive)
+            agent_id: Agent that made the purchase
+            status: Transaction status (None matches any)
+        """
+        where, params = self._where(since, until, merchant, category, agent_id, status)
+        with self._lock:
+            total, count = self._db.execute(
+                f"SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM transactions{where}", params
+            ).fetchone()
+        return round(total, 2), count
+    
+    def spent(self, **filters: Any) -> float:
+        """Total amount of matching completed transactions (filters as in totals())"""
+        return self.totals(**filters)[0]
+    
+    def query(
+        self,
+        *,
+        since: Union[TimeBound, None] = None,
+        until: Union[TimeBound, None] = None,
+        merchant: Optional[str] = None,
+        category: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Transaction]:
+        """Matching transactions, newest first (filters as in totals())"""
+        where, params = self._where(since, until, merchant, category, agent_id, status)
+        sql = f"SELECT {_COLUMNS} FROM transactions{where} ORDER BY created DESC, rowid DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            Transaction(
+                id=row[0],
+                amount=row[2],
+                description=row[5],
+                status=row[4],
+                agent_id=row[3],
+                created=row[1],
+                metadata=json.loads(row[6]) if row[6] else {}
+            )
+            for row in rows
+        ]
@@ -0,0 +1,200 @@
+"""
+Cached spending limits
+
+GET /limits is cheap to serve but agents ask for their budget constantly.
+LimitsCache keeps the last answer for a TTL, lets concurrent readers share a
+single request, and keeps the cached remaining budget honest between fetches:
+confirmed spend is subtracted locally, and a denial drops the cache so the
+next read sees the server's view.
+
+Usage:
+    limits = agentpay.limits()                  # cached for 30s by default
+    print(limits.remaining_daily, limits.per_transaction)
+    
+    client = agentpay.Client(token="agent_abc123")
+    client.limits(max_age=5)                    # stricter freshness for this read
+    client.limits_cache().record_spend(12.50)   # after a confirm outside pay()
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
+from . import codec
+from ._protocol import resolve_token
+from .errors import AgentPayError
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .client import Client
+
+__all__ = ["SpendingLimits", "LimitsCache"]
+
+LIMITS_ENDPOINT = "/api/v1/limits"
+DEFAULT_TTL = 30.0
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+@dataclass(frozen=True)
+class SpendingLimits:
+    """Spending limits and usage as last reported by the server"""
+    daily_limit: Optional[float]
+    per_transaction: Optional[float]
+    daily_spent: float = 0.0
+    monthly_spent: Optional[float] = None
+    remaining_daily: Optional[float] = None
+    fetched_at: float = 0.0  # time.monotonic() of the fetch
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+    
+    @classmethod
+    def from_api(cls, data: Dict[str, Any], fetched_at: Optional[float] = None) -> "SpendingLimits":
+        """Build from a /limits response"""
+        limits = data.get("limits") or {}
+        usage = data.get("usage") or {}
+        remaining = data.get("remaining") or {}
+        daily_limit = _number(limits.get("daily"))
+        daily_spent = _number(usage.get("daily_spent")) or 0.0
+        remaining_daily = _number(remaining.get("daily"))
+        if remaining_daily is None and daily_limit is not None:
+            remaining_daily = max(0.0, daily_limit - daily_spent)
+        return cls(
+            daily_limit=daily_limit,
+            per_transaction=_number(limits.get("per_transaction")),
+            daily_spent=daily_spent,
+            monthly_spent=_number(usage.get("monthly_spent")),
+            remaining_daily=remaining_daily,
+            fetched_at=time.monotonic() if fetched_at is None else fetched_at,
+            raw=data
+        )
+    
+    @property
+    def age(self) -> float:
+        """Seconds since the server reported these figures"""
+        return time.monotonic() - self.fetched_at
+    
+    @property
+    def daily_percentage(self) -> Optional[float]:
+        """Share of the daily limit already spent (0-100)"""
+        if not self.daily_limit:
+            return None
+        return round(self.daily_spent / self.daily_limit * 100, 1)
+    
+    def allows(self, amount: float) -> bool:
+        """True if amount fits both the per-transaction and remaining daily limits"""
+        if self.per_transaction is not None and amount > self.per_transaction:
+            return False
+        return self.remaining_daily is None or amount <= self.remaining_daily
+    
+    def after_spend(self, amount: float) -> "SpendingLimits":
+        """Copy with amount added to today's spend"""
+        remaining = self.remaining_daily
+        return replace(
+            self,
+            daily_spent=round(self.daily_spent + amount, 2),
+            monthly_spent=round(self.monthly_spent + amount, 2) if self.monthly_spent is not None else None,
+            remaining_daily=round(max(0.0, remaining - amount), 2) if remaining is not None else None
+        )
+
+
+class LimitsCache:
+    """
+    TTL cache in front of GET /limits for one client and token
+    
+    Concurrent reads of a stale cache share one request (single flight).
+    Spend recorded while a request is in flight makes that response
+    unreliable, so it is handed to the waiting readers but not cached.
+    
+    Args:
+        client: Client used for the request
+        ttl: Seconds a fetched answer is served from the cache
+        token: Agent token (defaults to the client token)
+    """
+    
+    def __init__(self, client: "Client", ttl: float = DEFAULT_TTL, token: Optional[str] = None):
+        self.client = client
+        self.ttl = ttl
+        self.token = token
+        self._lock = threading.Lock()
+        self._limits = None  # type: Optional[SpendingLimits]
+        self._inflight = None  # type: Optional[Future]
+        self._generation = 0
+    
+    def peek(self) -> Optional[SpendingLimits]:
+        """Cached limits regardless of age, without any request"""
+        return self._limits
+    
+    def get(self, *, max_age: Optional[float] = None, refresh: bool = False) -> SpendingLimits:
+        """
+        Return the cached limits, fetching them if older than max_age
+        
+        Args:
+            max_age: Freshness required for this read (defaults to the TTL)
+            refresh: Always fetch (still shared with concurrent readers)
+        
+        Raises:
+            AgentPayError: If the request fails (waiting readers get the same error)
+        """
+        ttl = self.ttl if max_age is None else max_age
+        with self._lock:
+            limits = self._limits
+            if not refresh and limits is not None and time.monotonic() - limits.fetched_at < ttl:
+                return limits
+            future = self._inflight
+            leader = future is None
+            if leader:
+                future = self._inflight = Future()
+                generation = self._generation
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            limits = self._fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight = None
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            if self._generation == generation:
+                self._limits = limits
+            self._inflight = None
+        future.set_result(limits)
+        return limits
+    
+    def _fetch(self) -> SpendingLimits:
+        token = resolve_token(self.token, self.client.token)
+        response = self.client.request("GET", LIMITS_ENDPOINT, headers={"Authorization": f"Bearer {token}"})
+        try:
+            data = codec.get().loads(response.content)
+        except ValueError:
+            raise AgentPayError(
+                f"Invalid JSON response from AgentPay API (status {response.status_code})",
+                code="INVALID_RESPONSE"
+            )
+        if response.status_code != 200 or not isinstance(data, dict):
+            error = data if isinstance(data, dict) else {}
+            raise AgentPayError(
+                error.get("error") or f"Fetching limits failed with status {response.status_code}",
+                code=error.get("code", "UNKNOWN_ERROR"),
+                details={"status": response.status_code}
+            )
+        return SpendingLimits.from_api(data)
+    
+    def record_spend(self, amount: float) -> None:
+        """Subtract confirmed spend from the cached remaining budget"""
+        with self._lock:
+            self._generation += 1
+            if self._limits is not None:
+                self._limits = self._limits.after_spend(amount)
+    
+    def invalidate(self) -> None:
+        """Drop the cached limits (e.g. after a denial) so the next read refetches"""
+        with self._lock:
+            self._generation += 1
+            self._limits = None
@@ -0,0 +1,434 @@
+"""
+Merchant execution backends
+
+The middle step of an authorize → merchant → confirm purchase (checking
+out at the merchant) is pluggable: a MerchantExecutor completes the order
+and reports what was charged. Production backends drive a merchant API or a
+browser; SimulatedMerchant stands in for them with per-merchant latency and
+failure profiles.
+
+A SimulatedMerchant on a VirtualClock never sleeps: each purchase's latency
+is sampled, checked against the purchase deadline and added to the clock,
+so thousands of simulated purchases finish in milliseconds while summary()
+still reports the latency distribution they would have had. With a seed the
+outcomes are reproducible.
+
+Only the merchant step is virtual. Deadlines, retry backoff and rate
+limiting keep reading the real monotonic clock: simulated latency never
+uses up the budget left for the confirm step, and backoff and rate-limit
+waits still sleep for real.
+
+Usage:
+    from agentpay.merchant import SimulatedMerchant, MerchantProfile, VirtualClock
+    
+    merchant = SimulatedMerchant(
+        {"doordash.com": MerchantProfile(latency=(1.5, 3.0), failure_rate=0.02)},
+        seed=7, clock=VirtualClock()
+    )
+    tool = AgentPayTool(agent_token="...", merchant=merchant)
+    ...
+    merchant.summary()["doordash.com"]["p99"]
+"""
+
+import abc
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .deadline import Deadline
+
+__all__ = [
+    "MerchantExecutor",
+    "MerchantProfile",
+    "SimulatedMerchant",
+    "VirtualClock",
+    "DEFAULT_PROFILES",
+    "order_completed",
+    "order_failed",
+]
+
+Latency = Union[float, Tuple[float, float], Callable[[random.Random], float]]
+
+
+def order_completed(
+    merchant: str,
+    order_id: str,
+    amount_charged: float,
+    authorization_id: str,
+    items: Sequence[str],
+    *,
+    scoped_token: Optional[str] = None,
+    timestamp: Optional[float] = None
+) -> Dict[str, Any]:
+    """Result of a completed merchant order, in the shape the purchase flows confirm"""
+    return {
+        "success": True,
+        "order_id": order_id,
+        "merchant": merchant,
+        "amount_charged": amount_charged,
+        "transaction_details": {
+            "orderId": order_id,
+            "merchant": merchant,
+            "items": list(items),
+            "timestamp": time.time() if timestamp is None else timestamp,
+            "authorization_id": authorization_id,
+            "scoped_token_used": bool(scoped_token),
+            "final_amount": amount_charged
+        }
+    }
+
+
+def order_failed(error: str) -> Dict[str, Any]:
+    """Result of a merchant order that did not go through"""
+    return {"success": False, "error": error}
+
+
+class MerchantExecutor(abc.ABC):
+    """
+    Completes an authorized purchase at the merchant
+    
+    Subclasses implement execute(); aexecute() runs it on the event loop's
+    default thread pool unless overridden with a native coroutine.
+    """
+    
+    @abc.abstractmethod
+    def execute(
+        self,
+        merchant: str,
+        amount: float,
+        authorization_id: str,
+        intent: str,
+        *,
+        scoped_token: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """
+        Place the order
+        
+        Args:
+            merchant: Merchant domain
+            amount: Authorized amount
+            authorization_id: AgentPay authorization the order is paid with
+            intent: What is being bought
+            scoped_token: Scoped payment token, when the authorization issued one
+            deadline: Purchase deadline the order must finish within
+        
+        Returns:
+            order_completed(...) or order_failed(...)
+        
+        Raises:
+            AgentPayError: DEADLINE_EXCEEDED if the order can't finish in time
+        """
+    
+    async def aexecute(
+        self,
+        merchant: str,
+        amount: float,
+        authorization_id: str,
+        intent: str,
+        *,
+        scoped_token: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """Async version of execute()"""
+        import asyncio
+        
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.execute(
+                merchant, amount, authorization_id, intent, scoped_token=scoped_token, deadline=deadline
+            )
+        )
+
+
+class MerchantProfile:
+    """
+    How a simulated merchant behaves
+    
+    Args:
+        latency: Order processing time in seconds: a constant, a (low, high)
+            uniform range, or a function of a random.Random (e.g.
+            agentpay.testing.lognormal(1.5))
+        failure_rate: Fraction of orders that fail (0-1)
+        errors: Failure messages to choose from; "{merchant}" is filled in
+        surcharge: (low, high) dollars of taxes and fees added to the amount;
+            the charge never drops below the authorized amount
+    """
+    
+    __slots__ = ("latency", "failure_rate", "errors", "surcharge")
+    
+    def __init__(
+        self,
+        latency: Latency = 0.0,
+        failure_rate: float = 0.0,
+        errors: Sequence[str] = ("Merchant {merchant} is temporarily unavailable",),
+        surcharge: Optional[Tuple[float, float]] = None
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.errors = tuple(errors)
+        self.surcharge = surcharge
+    
+    def __repr__(self) -> str:
+        return f"MerchantProfile(latency={self.latency!r}, failure_rate={self.failure_rate})"
+    
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+    
+    def __setstate__(self, state) -> None:
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+
+_CHECKOUT_ERRORS = (
+    "Merchant {merchant} is temporarily unavailable",
+    "Payment method declined by merchant",
+    "Item out of stock",
+    "Delivery not available to your area",
+)
+
+# Behaviour of the demo merchants the integrations simulate by default
+DEFAULT_PROFILES = {
+    "doordash.com": MerchantProfile(2.0, 0.02, _CHECKOUT_ERRORS, (-0.50, 2.00)),
+    "amazon.com": MerchantProfile(1.5, 0.01, _CHECKOUT_ERRORS, (-0.50, 2.00)),
+    "uber.com": MerchantProfile(1.0, 0.03, _CHECKOUT_ERRORS, (-0.50, 2.00)),
+    "default": MerchantProfile(1.5, 0.02, _CHECKOUT_ERRORS, (-0.50, 2.00)),
+}  # type: Dict[str, MerchantProfile]
+
+
+class VirtualClock:
+    """
+    Clock that only moves when told to (thread-safe)
+    
+    SimulatedMerchant checks its latency against the purchase Deadline and
+    advances this clock instead of sleeping. Nothing else reads it: Deadline,
+    RetryPolicy and RateLimiter time themselves with time.monotonic().
+    
+    Args:
+        start: Initial reading in Unix seconds (defaults to the current time,
+            so simulated timestamps look like real ones)
+    """
+    
+    def __init__(self, start: Optional[float] = None):
+        self.start = time.time() if start is None else start
+        self._now = self.start
+        self._lock = threading.Lock()
+    
+    def __repr__(self) -> str:
+        return f"VirtualClock(elapsed={self.elapsed:.3f})"
+    
+    def __getstate__(self):
+        return {"start": self.start, "now": self._now}
+    
+    def __setstate__(self, state) -> None:
+        self.__init__(state["start"])
+        self._now = state["now"]
+    
+    def now(self) -> float:
+        return self._now
+    
+    @property
+    def elapsed(self) -> float:
+        """Virtual seconds since start"""
+        return self._now - self.start
+    
+    def advance(self, seconds: float) -> float:
+        """Move the clock forward; returns the new reading"""
+        with self._lock:
+            self._now += max(0.0, seconds)
+            return self._now
+
+
+class SimulatedMerchant(MerchantExecutor):
+    """
+    Simulated checkout with per-merchant latency and failure profiles
+    
+    Args:
+        profiles: MerchantProfile per merchant domain; "default" covers the rest
+        seed: Seed for latency, failure and pricing draws (None is unseeded)
+        clock: VirtualClock to advance instead of sleeping; None waits in real time
+        order_prefix: Order id prefix (defaults to the merchant's name)
+    
+    With a VirtualClock every purchase advances the one shared clock, so it
+    reads as if purchases ran back to back; per-purchase latencies in
+    summary() are exact however many ran concurrently.
+    """
+    
+    def __init__(
+        self,
+        profiles: Optional[Mapping[str, MerchantProfile]] = None,
+        *,
+        seed: Optional[int] = None,
+        clock: Optional[VirtualClock] = None,
+        order_prefix: Optional[str] = None
+    ):
+        self.profiles = dict(DEFAULT_PROFILES if profiles is None else profiles)
+        self.profiles.setdefault("default", MerchantProfile())
+        self.seed = seed
+        self.clock = clock
+        self.order_prefix = order_prefix
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._samples = {}  # type: Dict[str, List[Tuple[float, bool]]]
+    
+    def __repr__(self) -> str:
+        return f"SimulatedMerchant(merchants={sorted(self.profiles)!r}, seed={self.seed!r})"
+    
+    def __getstate__(self):
+        # Pickles as its settings, so each worker process simulates independently
+        return {"profiles": self.profiles, "seed": self.seed, "clock": self.clock, "order_prefix": self.order_prefix}
+    
+    def __setstate__(self, state) -> None:
+        self.__init__(state["profiles"], seed=state["seed"], clock=state["clock"], order_prefix=state["order_prefix"])
+    
+    def for_worker(self, index: int) -> "SimulatedMerchant":
+        """
+        Copy of this merchant for one pool worker
+        
+        A forked or unpickled copy replays the same random sequence as every
+        other worker. The copy's seed is derived from this seed and index, so
+        workers draw different but reproducible outcomes (an unseeded
+        merchant stays unseeded). Recorded statistics are not copied.
+        
+        Args:
+            index: Worker number (agentpay.executor.worker_index() in a process pool)
+        """
+        seed = None if self.seed is None else _worker_seed(self.seed, index)
+        return SimulatedMerchant(self.profiles, seed=seed, clock=self.clock, order_prefix=self.order_prefix)
+    
+    def profile(self, merchant: str) -> MerchantProfile:
+        return self.profiles.get(merchant.lower(), self.profiles["default"])
+    
+    def _plan(self, merchant: str, amount: float) -> Tuple[float, Optional[str], float, int]:
+        """Draw (latency, error or None, amount charged, order number) for one order"""
+        profile = self.profile(merchant)
+        latency = profile.latency
+        with self._lock:
+            rng = self._rng
+            if callable(latency):
+                delay = max(0.0, latency(rng))
+            elif isinstance(latency, tuple):
+                delay = rng.uniform(*latency)
+            else:
+                delay = float(latency or 0.0)
+            error = None
+            if profile.failure_rate and rng.random() < profile.failure_rate:
+                error = rng.choice(profile.errors).format(merchant=merchant)
+            charged = amount
+            if profile.surcharge is not None:
+                # Taxes and fees; never less than authorized
+                charged = max(amount, amount + round(rng.uniform(*profile.surcharge), 2))
+            number = rng.randint(1000, 9999)
+        return delay, error, charged, number
+    
+    def _record(self, merchant: str, delay: float, success: bool) -> None:
+        with self._lock:
+            self._samples.setdefault(merchant.lower(), []).append((delay, success))
+    
+    def _wait_virtual(self, merchant: str, delay: float, deadline: Optional[Deadline]) -> None:
+        remaining = deadline.remaining() if deadline is not None else None
+        if remaining is not None and delay >= remaining:
+            # Would have timed out: spend what was left of the budget, then fail
+            self.clock.advance(remaining)
+            self._record(merchant, remaining, False)
+            raise deadline.exceeded()
+        self.clock.advance(delay)
+    
+    def _outcome(
+        self,
+        merchant: str,
+        authorization_id: str,
+        intent: str,
+        scoped_token: Optional[str],
+        delay: float,
+        error: Optional[str],
+        charged: float,
+        number: int
+    ) -> Dict[str, Any]:
+        self._record(merchant, delay, error is None)
+        if error is not None:
+            return order_failed(error)
+        
+        timestamp = self.clock.now() if self.clock is not None else time.time()
+        prefix = self.order_prefix or merchant.split(".")[0].upper()
+        order_id = f"{prefix}_{int(timestamp)}_{number}"
+        return order_completed(
+            merchant, order_id, charged, authorization_id, [intent],
+            scoped_token=scoped_token, timestamp=timestamp
+        )
+    
+    def execute(
+        self,
+        merchant: str,
+        amount: float,
+        authorization_id: str,
+        intent: str,
+        *,
+        scoped_token: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        delay, error, charged, number = self._plan(merchant, amount)
+        if self.clock is not None:
+            self._wait_virtual(merchant, delay, deadline)
+        else:
+            # Processing time, bounded by the purchase deadline
+            Deadline.coerce(deadline).sleep(delay)
+        return self._outcome(merchant, authorization_id, intent, scoped_token, delay, error, charged, number)
+    
+    async def aexecute(
+        self,
+        merchant: str,
+        amount: float,
+        authorization_id: str,
+        intent: str,
+        *,
+        scoped_token: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        delay, error, charged, number = self._plan(merchant, amount)
+        if self.clock is not None:
+            self._wait_virtual(merchant, delay, deadline)
+        else:
+            await Deadline.coerce(deadline).asleep(delay)
+        return self._outcome(merchant, authorization_id, intent, scoped_token, delay, error, charged, number)
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Latency and failure statistics per merchant
+        
+        Returns:
+            {merchant: {"count", "failures", "p50", "p90", "p99", "max", "mean"}}
+            with latencies in seconds (timed-out orders count at the time they used)
+        """
+        with self._lock:
+            samples = {merchant: list(values) for merchant, values in self._samples.items()}
+        
+        summary = {}
+        for merchant, values in samples.items():
+            ordered = sorted(delay for delay, _ in values)
+            summary[merchant] = {
+                "count": len(values),
+                "failures": sum(1 for _, success in values if not success),
+                "p50": _percentile(ordered, 0.50),
+                "p90": _percentile(ordered, 0.90),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1],
+                "mean": sum(ordered) / len(ordered)
+            }
+        return summary
+    
+    def reset(self) -> None:
+        """Forget recorded statistics and restart the random sequence"""
+        with self._lock:
+            self._samples.clear()
+            self._rng = random.Random(self.seed)
+
+
+def _worker_seed(seed: int, index: int) -> int:
+    # String seeds hash with SHA-512, so nearby seeds and indexes don't collide
+    return random.Random(f"{seed}/{index}").getrandbits(64)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
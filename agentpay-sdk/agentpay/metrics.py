@@ -0,0 +1,391 @@
+"""
+In-process metrics: counters and latency histograms per intent, endpoint and outcome
+
+Metrics are off by default and cost one attribute check per call while off.
+Once enabled, the sync and async clients record:
+
+    agentpay_pay_total{intent, outcome}             counter
+    agentpay_pay_seconds{intent, outcome}           histogram
+    agentpay_request_seconds{endpoint, status}      histogram
+    agentpay_errors_total{code}                     counter
+
+outcome is "success", "approval_required" or the error code (MISSING_TOKEN,
+NETWORK_ERROR, INVALID_RESPONSE, or whatever code the server returned). The
+framework tools' authorize and confirm calls appear under their endpoints
+("POST /v1/authorize", "POST /v1/authorize/{id}/confirm").
+
+Counters and histograms are sharded per thread, so recording never takes a
+lock; shards are only summed when read.
+
+Usage:
+    from agentpay import metrics
+    
+    metrics.enable()
+    ...
+    print(metrics.registry.expose())              # Prometheus text format
+    metrics.registry.write("/var/lib/node_exporter/textfile/agentpay.prom")
+    metrics.start_http_server(9464)               # or let Prometheus scrape
+    metrics.registry.get("agentpay_pay_seconds").quantile(0.99, intent="gift-card")
+"""
+
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+__all__ = [
+    "Counter", "Histogram", "Registry", "registry",
+    "enable", "disable", "enabled", "start_http_server",
+]
+
+# Histogram resolution: SUB_BUCKETS per power of two from MIN_VALUE upwards
+# (about 4% relative error, 1us to ~70min)
+MIN_VALUE = 1e-6
+SUB_BUCKETS = 16
+OCTAVES = 32
+BUCKET_COUNT = SUB_BUCKETS * OCTAVES
+
+# Bucket bounds published in the Prometheus exposition
+EXPORT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.4, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+_get_ident = threading.get_ident
+
+
+def _bucket_index(value: float) -> int:
+    if value < MIN_VALUE:
+        return 0
+    mantissa, exponent = math.frexp(value / MIN_VALUE)
+    index = (exponent - 1) * SUB_BUCKETS + int((mantissa * 2 - 1) * SUB_BUCKETS)
+    return min(index, BUCKET_COUNT - 1)
+
+
+def _bucket_upper(index: int) -> float:
+    octave, step = divmod(index, SUB_BUCKETS)
+    return MIN_VALUE * (2 ** octave) * (1 + (step + 1) / SUB_BUCKETS)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    rendered = ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs)
+    return "{" + rendered + "}" if rendered else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """Shared label handling for Counter and Histogram"""
+    
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}  # type: Dict[Tuple[str, ...], object]
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"{self.name} requires label {e.args[0]!r}")
+    
+    def _child(self, key: Tuple[str, ...]):
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Drop every label combination"""
+        with self._lock:
+            self._children = {}
+    
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _CounterShards:
+    """One counter value split into per-thread cells"""
+    
+    __slots__ = ("cells",)
+    
+    def __init__(self):
+        self.cells = {}  # type: Dict[int, List[float]]
+    
+    def inc(self, amount: float) -> None:
+        ident = _get_ident()
+        cell = self.cells.get(ident)
+        if cell is None:
+            # Only this thread ever writes its cell, so no lock is needed
+            cell = self.cells[ident] = [0.0]
+        cell[0] += amount
+    
+    def value(self) -> float:
+        return sum(cell[0] for cell in list(self.cells.values()))
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. purchases by intent and outcome"""
+    
+    kind = "counter"
+    
+    def _new_child(self):
+        return _CounterShards()
+    
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add amount to the series identified by labels"""
+        self._child(self._key(labels)).inc(amount)
+    
+    def value(self, **labels: str) -> float:
+        """Current total for one series (0 if never incremented)"""
+        child = self._children.get(self._key(labels))
+        return child.value() if child is not None else 0.0
+    
+    def expose(self) -> List[str]:
+        lines = self._header()
+        for key, child in sorted(self._children.items()):
+            labels = _format_labels(zip(self.labelnames, key))
+            lines.append(f"{self.name}{labels} {_format_value(child.value())}")
+        return lines
+
+
+class _HistogramShards:
+    """Log-linear (HDR-style) bucket counts split into per-thread cells"""
+    
+    __slots__ = ("cells",)
+    
+    def __init__(self):
+        self.cells = {}  # type: Dict[int, list]
+    
+    def observe(self, value: float) -> None:
+        ident = _get_ident()
+        cell = self.cells.get(ident)
+        if cell is None:
+            # [bucket counts, sum, count]; written by this thread only
+            cell = self.cells[ident] = [[0] * BUCKET_COUNT, 0.0, 0]
+        cell[0][_bucket_index(value)] += 1
+        cell[1] += value
+        cell[2] += 1
+    
+    def merged(self) -> Tuple[List[int], float, int]:
+        counts = [0] * BUCKET_COUNT
+        total = 0.0
+        observations = 0
+        for buckets, value_sum, count in list(self.cells.values()):
+            for index, bucket_count in enumerate(buckets):
+                if bucket_count:
+                    counts[index] += bucket_count
+            total += value_sum
+            observations += count
+        return counts, total, observations
+
+
+class Histogram(_Metric):
+    """Latency distribution with ~4% relative precision, e.g. pay() seconds"""
+    
+    kind = "histogram"
+    
+    def _new_child(self):
+        return _HistogramShards()
+    
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation (seconds) for the series identified by labels"""
+        self._child(self._key(labels)).observe(value)
+    
+    def count(self, **labels: str) -> int:
+        """Number of observations in one series"""
+        child = self._children.get(self._key(labels))
+        return child.merged()[2] if child is not None else 0
+    
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """
+        Estimate a quantile (0-1) of one series
+        
+        Returns:
+            Upper bound of the bucket holding the quantile, or None if the
+            series has no observations
+        """
+        child = self._children.get(self._key(labels))
+        if child is None:
+            return None
+        counts, _, observations = child.merged()
+        if not observations:
+            return None
+        
+        rank = max(1, math.ceil(q * observations))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return _bucket_upper(index)
+        return _bucket_upper(BUCKET_COUNT - 1)
+    
+    def expose(self) -> List[str]:
+        lines = self._header()
+        for key, child in sorted(self._children.items()):
+            counts, value_sum, observations = child.merged()
+            pairs = list(zip(self.labelnames, key))
+            
+            cumulative = 0
+            index = 0
+            for bound in EXPORT_BUCKETS:
+                while index < BUCKET_COUNT and _bucket_upper(index) <= bound:
+                    cumulative += counts[index]
+                    index += 1
+                labels = _format_labels(pairs + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            
+            labels = _format_labels(pairs + [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {observations}")
+            labels = _format_labels(pairs)
+            lines.append(f"{self.name}_sum{labels} {_format_value(value_sum)}")
+            lines.append(f"{self.name}_count{labels} {observations}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics with a Prometheus text exposition"""
+    
+    def __init__(self):
+        self._metrics = {}  # type: Dict[str, _Metric]
+        self._lock = threading.Lock()
+    
+    def _register(self, cls, name: str, documentation: str, labelnames: Tuple[str, ...]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        """Get or create a Counter"""
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Histogram:
+        """Get or create a Histogram"""
+        return self._register(Histogram, name, documentation, labelnames)
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        """Look up a registered metric by name"""
+        return self._metrics.get(name)
+    
+    def reset(self) -> None:
+        """Clear every series, keeping the metric definitions"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+    
+    def expose(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].expose())
+        return "\n".join(lines) + "\n"
+    
+    def write(self, path: str) -> None:
+        """Atomically write the exposition to path (node_exporter textfile style)"""
+        import tempfile
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".agentpay-metrics-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.expose())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+# Default registry used by the SDK's own instrumentation
+registry = Registry()
+
+# Checked on every call by the clients; a plain global keeps the disabled
+# path to a single attribute read
+enabled = False
+
+_pay_total = registry.counter("agentpay_pay_total", "Purchases by intent and outcome", ("intent", "outcome"))
+_pay_seconds = registry.histogram("agentpay_pay_seconds", "pay() latency in seconds", ("intent", "outcome"))
+_request_seconds = registry.histogram(
+    "agentpay_request_seconds", "HTTP request latency per attempt in seconds", ("endpoint", "status")
+)
+_errors_total = registry.counter("agentpay_errors_total", "Errors raised by the SDK by code", ("code",))
+
+
+def enable() -> None:
+    """Start recording the SDK's metrics"""
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    """Stop recording (existing values are kept)"""
+    global enabled
+    enabled = False
+
+
+def observe_pay(intent: str, outcome: str, seconds: float) -> None:
+    """Record one finished pay() call"""
+    _pay_total.inc(intent=intent, outcome=outcome)
+    _pay_seconds.observe(seconds, intent=intent, outcome=outcome)
+
+
+def observe_request(endpoint: str, status: str, seconds: float) -> None:
+    """Record one HTTP attempt ("error" status for network failures)"""
+    _request_seconds.observe(seconds, endpoint=endpoint, status=status)
+
+
+def observe_error(code: Optional[str]) -> None:
+    """Record an AgentPayError raised to the caller"""
+    _errors_total.inc(code=code or "UNKNOWN_ERROR")
+
+
+def pay_outcome(result) -> str:
+    """Outcome label for a PaymentResult"""
+    if result.success:
+        return "success"
+    return result.error or "UNKNOWN_ERROR"
+
+
+def start_http_server(port: int, host: str = "0.0.0.0", target: Optional[Registry] = None):
+    """
+    Serve the exposition at http://host:port/metrics from a daemon thread
+    
+    Returns:
+        The running ThreadingHTTPServer (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    source = target or registry
+    
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+        
+        def do_GET(self):
+            body = source.expose().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="agentpay-metrics", daemon=True).start()
+    return server
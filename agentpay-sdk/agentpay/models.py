@@ -0,0 +1,79 @@
+"""
+AgentPay SDK result types
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+# slots=True (Python 3.10+) drops the per-instance __dict__: batch pipelines
+# hold tens of thousands of results, and this roughly halves their size
+_SLOTS = sys.version_info >= (3, 10)
+
+
+class RawJSON(bytes):
+    """Undecoded JSON text, left for PaymentResult to decode on demand"""
+    
+    __slots__ = ()
+
+
+@dataclass(**({"slots": True} if _SLOTS else {}))
+class PaymentResult:
+    """
+    Result of a payment operation
+    
+    details may arrive as raw JSON from the codec and is only decoded the
+    first time it is read (asdict(), replace() and == read it too).
+    """
+    success: bool
+    transaction_id: Optional[str] = None
+    amount: Optional[float] = None
+    service: Optional[str] = None
+    message: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    
+    @property
+    def failed(self) -> bool:
+        """Check if payment failed"""
+        return not self.success
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of every field (decodes details; a shallow asdict())"""
+        return {
+            "success": self.success,
+            "transaction_id": self.transaction_id,
+            "amount": self.amount,
+            "service": self.service,
+            "message": self.message,
+            "details": self.details,
+            "error": self.error
+        }
+
+
+def _lazy_details(cls: type) -> None:
+    """Route reads of cls.details through a decode-once property, keeping the field's storage"""
+    if _SLOTS:
+        slot = cls.__dict__["details"]
+        load, store = slot.__get__, slot.__set__
+    else:
+        def load(result: PaymentResult) -> Any:
+            return result.__dict__.get("details")
+        
+        def store(result: PaymentResult, value: Any) -> None:
+            result.__dict__["details"] = value
+    
+    def details(result: PaymentResult) -> Optional[Dict[str, Any]]:
+        """Service-specific details (decoded on first access)"""
+        value = load(result)
+        if value.__class__ is RawJSON:
+            from .codec import get
+            
+            value = get().loads(value)
+            store(result, value)
+        return value
+    
+    cls.details = property(details, store)
+
+
+_lazy_details(PaymentResult)
@@ -0,0 +1,148 @@
+"""
+Pipelined execution of multi-stage purchase flows
+
+Each stage (e.g. authorize → merchant → confirm) runs on its own worker
+thread, connected to the next by a small bounded queue. While purchase N is
+being confirmed, N+1 is at the merchant and N+2 is being authorized, so a
+batch finishes at the pace of the slowest stage rather than the sum of all
+stages. Every purchase still passes through its stages in order, and
+results come out in input order.
+
+Usage:
+    pipeline = PurchasePipeline([
+        ("authorize", authorize_stage),
+        ("merchant", merchant_stage),
+        ("confirm", confirm_stage),
+    ])
+    for item in pipeline.run(purchases):
+        print(item.index, item.error or item.state)
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+__all__ = ["PipelineItem", "StageFailure", "PurchasePipeline"]
+
+DEFAULT_BUFFER = 4
+
+_DONE = object()
+
+
+class StageFailure(Exception):
+    """Raised by a stage to stop an item with an expected, user-facing failure"""
+
+
+class PipelineItem:
+    """One purchase moving through the pipeline"""
+    
+    __slots__ = ("index", "request", "state", "error", "failed_stage")
+    
+    def __init__(self, index: int, request: Any):
+        self.index = index
+        self.request = request
+        self.state: Dict[str, Any] = {}
+        self.error: Optional[BaseException] = None
+        self.failed_stage: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _SourceError:
+    """Carries an exception raised by the input iterable to the consumer"""
+    
+    __slots__ = ("error",)
+    
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+Stage = Tuple[str, Callable[[PipelineItem], None]]
+
+
+class PurchasePipeline:
+    """
+    Run items through ordered stages, one worker thread per stage
+    
+    A stage is a (name, fn) pair; fn(item) reads item.request / item.state and
+    records its output in item.state. Raising StageFailure (or any other
+    exception) records item.error and skips the remaining stages for that
+    item only.
+    
+    Args:
+        stages: Ordered (name, fn) pairs
+        buffer: Items queued between consecutive stages
+    """
+    
+    def __init__(self, stages: Sequence[Stage], buffer: int = DEFAULT_BUFFER):
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.buffer = buffer
+    
+    def run(self, requests: Iterable[Any]) -> Iterator[PipelineItem]:
+        """Feed requests through the pipeline and yield finished items in order"""
+        queues = [queue.Queue(self.buffer) for _ in range(len(self.stages) + 1)]
+        stop = threading.Event()
+        
+        threads = [threading.Thread(
+            target=self._feed, args=(requests, queues[0], stop),
+            name="agentpay-pipeline-feed", daemon=True
+        )]
+        for position, (name, fn) in enumerate(self.stages):
+            threads.append(threading.Thread(
+                target=self._work, args=(name, fn, queues[position], queues[position + 1], stop),
+                name=f"agentpay-pipeline-{name}", daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+        
+        output = queues[-1]
+        try:
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _SourceError):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+    
+    @staticmethod
+    def _put(target: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        # Poll so workers exit promptly when the consumer stops early
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _feed(self, requests: Iterable[Any], target: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for index, request in enumerate(requests):
+                if not self._put(target, PipelineItem(index, request), stop):
+                    return
+        except Exception as e:
+            self._put(target, _SourceError(e), stop)
+        self._put(target, _DONE, stop)
+    
+    def _work(self, name: str, fn: Callable[[PipelineItem], None],
+              source: queue.Queue, target: queue.Queue, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if isinstance(item, PipelineItem) and item.error is None:
+                try:
+                    fn(item)
+                except Exception as e:
+                    item.error = e
+                    item.failed_stage = name
+            if not self._put(target, item, stop) or item is _DONE:
+                return
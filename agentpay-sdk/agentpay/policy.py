@@ -0,0 +1,179 @@
+"""
+Client-side pre-flight spending policy
+
+Purchases that are certain to be refused (over the per-transaction limit,
+past the remaining daily budget, in a blocked category) are denied locally
+before any request is sent, with the same denial shape the server returns.
+The server stays the authority: pre-flight only ever denies, and it only
+uses limits that are already cached, so it never adds a round trip.
+
+Usage:
+    policy = Policy(per_transaction=50.00, blocked_categories={"gambling"})
+    client = agentpay.Client(token="agent_abc123", policy=policy)
+    
+    client.limits()                      # cache server limits for pre-flight too
+    result = client.pay("gambling", 10.00)
+    result.error                         # "CATEGORY_BLOCKED", no request sent
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Iterable, FrozenSet
+
+from .limitscache import SpendingLimits
+from .models import PaymentResult
+
+__all__ = ["Policy", "Denial"]
+
+# Tolerance for float rounding when comparing amounts to limits
+_EPSILON = 1e-9
+
+
+def _normalise(values: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    return frozenset(value.strip().lower() for value in values)
+
+
+@dataclass(frozen=True)
+class Denial:
+    """A purchase refused before it left the process"""
+    code: str
+    reason: str
+    details: Dict[str, Any] = field(default_factory=dict)
+    
+    def as_authorization(self) -> Dict[str, Any]:
+        """Denial in the /v1/authorize response shape"""
+        return {"authorized": False, "reason": self.reason, "code": self.code, "preflight": True}
+    
+    def as_result(self) -> PaymentResult:
+        """Denial as the PaymentResult pay() returns for a refused purchase"""
+        return PaymentResult(
+            success=False,
+            error=self.code,
+            message=self.reason,
+            details=dict(self.details, preflight=True)
+        )
+
+
+@dataclass(frozen=True)
+class Policy:
+    """
+    Local spending rules checked before a purchase is sent
+    
+    Every rule is optional; an empty Policy still enforces the server limits
+    whenever fresh ones are cached. Category and merchant names are matched
+    case-insensitively.
+    
+    Args:
+        per_transaction: Maximum amount of a single purchase
+        daily_limit: Maximum total spend per day (needs cached limits or a spent_today figure)
+        blocked_categories: Categories (or pay() intents) that are always refused
+        allowed_categories: If set, only these categories are allowed
+        blocked_merchants: Merchants that are always refused
+    """
+    per_transaction: Optional[float] = None
+    daily_limit: Optional[float] = None
+    blocked_categories: FrozenSet[str] = frozenset()
+    allowed_categories: Optional[FrozenSet[str]] = None
+    blocked_merchants: FrozenSet[str] = frozenset()
+    
+    def __post_init__(self):
+        # Frozen, so normalise through object.__setattr__
+        object.__setattr__(self, "blocked_categories", _normalise(self.blocked_categories))
+        object.__setattr__(self, "allowed_categories", _normalise(self.allowed_categories))
+        object.__setattr__(self, "blocked_merchants", _normalise(self.blocked_merchants))
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Policy":
+        """
+        Build from a policy definition (e.g. loaded from JSON or YAML)
+        
+        Accepts snake_case or camelCase keys: per_transaction/perTransaction,
+        daily_limit/dailyLimit, blocked_categories/blockedCategories,
+        allowed_categories/allowedCategories, blocked_merchants/blockedMerchants.
+        """
+        def pick(snake: str, camel: str) -> Any:
+            return data[snake] if snake in data else data.get(camel)
+        
+        return cls(
+            per_transaction=pick("per_transaction", "perTransaction"),
+            daily_limit=pick("daily_limit", "dailyLimit"),
+            blocked_categories=pick("blocked_categories", "blockedCategories") or frozenset(),
+            allowed_categories=pick("allowed_categories", "allowedCategories"),
+            blocked_merchants=pick("blocked_merchants", "blockedMerchants") or frozenset()
+        )
+    
+    def evaluate(
+        self,
+        amount: Optional[float],
+        *,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+        limits: Optional[SpendingLimits] = None,
+        spent_today: Optional[float] = None,
+        per_transaction: bool = True,
+        daily: bool = True
+    ) -> Optional[Denial]:
+        """
+        Check a purchase against the rules and any cached server limits
+        
+        Args:
+            amount: Purchase amount (None skips the amount checks)
+            category: Purchase category (pay() passes its intent)
+            merchant: Merchant domain
+            limits: Fresh server limits, if cached
+            spent_today: Today's spend, when no limits are available
+            per_transaction: Apply the per-transaction limits; turn off when
+                amount is a budget several purchases draw from (an envelope)
+            daily: Apply the daily budget; turn off for purchases drawn from
+                a budget whose authorization already counted against it
+        
+        Returns:
+            A Denial if the purchase would certainly be refused, else None
+        """
+        if category is not None:
+            wanted = category.strip().lower()
+            if wanted in self.blocked_categories:
+                return Denial("CATEGORY_BLOCKED", f"Category '{category}' is blocked by spending policy",
+                              {"category": category})
+            if self.allowed_categories is not None and wanted not in self.allowed_categories:
+                return Denial("CATEGORY_BLOCKED", f"Category '{category}' is not allowed by spending policy",
+                              {"category": category})
+        
+        if merchant is not None and merchant.strip().lower() in self.blocked_merchants:
+            return Denial("MERCHANT_BLOCKED", f"Merchant {merchant} is blocked by spending policy",
+                          {"merchant": merchant})
+        
+        if amount is None:
+            return None
+        
+        server_limit = limits.per_transaction if limits is not None else None
+        limit = min((value for value in (self.per_transaction, server_limit) if value is not None), default=None)
+        if per_transaction and limit is not None and amount > limit + _EPSILON:
+            return Denial(
+                "TRANSACTION_LIMIT_EXCEEDED",
+                f"Amount ${amount:.2f} exceeds per-transaction limit of ${limit:.2f}",
+                {"requested_amount": amount, "transaction_limit": limit}
+            )
+        
+        if not daily:
+            return None
+        
+        budgets = []
+        if limits is not None:
+            spent_today = limits.daily_spent
+            if limits.remaining_daily is not None:
+                budgets.append(limits.remaining_daily)
+        if self.daily_limit is not None and spent_today is not None:
+            budgets.append(max(0.0, self.daily_limit - spent_today))
+        remaining = min(budgets, default=None)
+        if remaining is not None and amount > remaining + _EPSILON:
+            return Denial(
+                "DAILY_LIMIT_EXCEEDED",
+                f"Amount ${amount:.2f} exceeds the remaining daily budget of ${remaining:.2f}",
+                {"requested_amount": amount, "remaining_daily": remaining}
+            )
+        
+        return None
@@ -0,0 +1,296 @@
+"""
+Per-request latency breakdown for the sync transport
+
+With profiling on, every HTTP exchange the Client makes is split into
+phases (DNS, TCP connect, TLS, time to first byte, body download, JSON
+parse) and compared with the server's own reported processing time. This
+shows whether a slow purchase was spent on the network, in the API, or in
+JSON handling.
+
+Usage:
+    profiler = agentpay.Profiler()
+    client = agentpay.Client(token="agent_abc123", profiler=profiler)
+    client.pay("gift-card", 10.00)
+    print(profiler.report())
+    
+    # Or stream records somewhere else
+    client = agentpay.Client(profiler=lambda record: log.info(record.as_dict()))
+    
+    # From a shell: N calls, percentiles per phase
+    #   agentpay profile -n 100 --local
+"""
+
+import re
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import codec
+
+__all__ = ["RequestProfile", "Profiler", "PHASES"]
+
+PHASES = ("dns", "connect", "tls", "ttfb", "download", "parse", "server", "total")
+
+_SERVER_TIMING_DUR = re.compile(r"dur=([0-9.]+)")
+_MILLISECONDS = re.compile(r"^\s*([0-9.]+)\s*(ms)?\s*$")
+
+# Phase timings of the exchange in flight on this thread
+_active = threading.local()
+
+
+@dataclass
+class RequestProfile:
+    """
+    Timing breakdown of one HTTP exchange (seconds)
+    
+    dns/connect/tls are zero when a pooled keep-alive connection was reused.
+    server is the API's self-reported processing time when it sends one
+    (Server-Timing, X-Response-Time, or a "latency" field in milliseconds).
+    """
+    
+    method: str
+    endpoint: str
+    status: Optional[int]
+    attempt: int
+    dns: float = 0.0
+    connect: float = 0.0
+    tls: float = 0.0
+    ttfb: float = 0.0
+    download: float = 0.0
+    parse: float = 0.0
+    server: Optional[float] = None
+    total: float = 0.0
+    reused: bool = True
+    error: Optional[str] = None
+    
+    @property
+    def network(self) -> float:
+        """Time not accounted for by the server or JSON parsing"""
+        return max(0.0, self.total - self.parse - (self.server or 0.0))
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Plain dict, e.g. for structured logging"""
+        return asdict(self)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Profiler:
+    """
+    Collects RequestProfile records and summarises them per phase
+    
+    Args:
+        callback: Called with every record as it is produced
+        keep: Most recent records retained for summary() (0 keeps none)
+    """
+    
+    def __init__(self, callback: Optional[Callable[[RequestProfile], None]] = None, keep: int = 10000):
+        self.callback = callback
+        self.records = deque(maxlen=keep)  # type: Deque[RequestProfile]
+        self._lock = threading.Lock()
+    
+    def record(self, profile: RequestProfile) -> None:
+        """Store a record and pass it to the callback"""
+        if self.records.maxlen:
+            with self._lock:
+                self.records.append(profile)
+        if self.callback is not None:
+            self.callback(profile)
+    
+    def clear(self) -> None:
+        """Forget collected records"""
+        with self._lock:
+            self.records.clear()
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles per phase over the retained records
+        
+        Returns:
+            {phase: {"p50", "p90", "p99", "max", "mean"}} in seconds. The
+            server phase only counts records that reported a server time.
+        """
+        with self._lock:
+            records = list(self.records)
+        
+        summary = {}
+        for phase in PHASES:
+            values = [getattr(r, phase) for r in records if getattr(r, phase) is not None]
+            if not values:
+                continue
+            ordered = sorted(values)
+            summary[phase] = {
+                "p50": _percentile(ordered, 0.50),
+                "p90": _percentile(ordered, 0.90),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1],
+                "mean": sum(ordered) / len(ordered)
+            }
+        return summary
+    
+    def report(self) -> str:
+        """Human-readable percentile table in milliseconds"""
+        with self._lock:
+            records = list(self.records)
+        if not records:
+            return "No requests profiled."
+        
+        lines = [f"{'phase':<10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)"]
+        for phase, stats in self.summary().items():
+            lines.append(
+                f"{phase:<10}" + "".join(f"{stats[k] * 1000:>10.2f}" for k in ("p50", "p90", "p99", "max"))
+            )
+        
+        reused = sum(1 for r in records if r.reused)
+        errors = sum(1 for r in records if r.error or (r.status or 0) >= 400)
+        lines.append("")
+        lines.append(
+            f"{len(records)} requests, {reused / len(records):.0%} on reused connections, {errors} errors"
+        )
+        return "\n".join(lines)
+
+
+def server_time(headers: Mapping[str, str], data: Any) -> Optional[float]:
+    """Server-reported processing time in seconds, if the response has one"""
+    timing = headers.get("Server-Timing")
+    if timing:
+        durations = [float(d) for d in _SERVER_TIMING_DUR.findall(timing)]
+        if durations:
+            return sum(durations) / 1000
+    
+    response_time = headers.get("X-Response-Time")
+    if response_time:
+        match = _MILLISECONDS.match(response_time)
+        if match:
+            return float(match.group(1)) / 1000
+    
+    if isinstance(data, dict) and isinstance(data.get("latency"), (int, float)):
+        return data["latency"] / 1000
+    return None
+
+
+def begin() -> Dict[str, float]:
+    """Start collecting connection phases for the exchange on this thread"""
+    phases = {}  # type: Dict[str, float]
+    _active.phases = phases
+    return phases
+
+
+def finish(
+    phases: Dict[str, float],
+    method: str,
+    endpoint: str,
+    attempt: int,
+    started: float,
+    response: Any = None,
+    error: Optional[BaseException] = None
+) -> RequestProfile:
+    """Turn the collected phases and a finished requests.Response into a record"""
+    _active.phases = None
+    received = time.perf_counter() - started
+    dns = phases.get("dns", 0.0)
+    connect = phases.get("connect", 0.0)
+    tls = phases.get("tls", 0.0)
+    
+    profile = RequestProfile(
+        method=method,
+        endpoint=endpoint,
+        status=response.status_code if response is not None else None,
+        attempt=attempt,
+        dns=dns,
+        connect=connect,
+        tls=tls,
+        reused="connect" not in phases,
+        error=str(error) if error is not None else None
+    )
+    
+    if response is not None:
+        # requests' elapsed covers send -> headers parsed; the rest is the body
+        headers_at = response.elapsed.total_seconds()
+        profile.ttfb = max(0.0, headers_at - dns - connect - tls)
+        profile.download = max(0.0, received - headers_at)
+        
+        # Decode once here so the parse phase and any "latency" field are
+        # known; costs one extra decode per request, only while profiling
+        data = None
+        if response.content:
+            parse_started = time.perf_counter()
+            try:
+                data = codec.get().loads(response.content)
+            except ValueError:
+                pass
+            profile.parse = time.perf_counter() - parse_started
+        profile.server = server_time(response.headers, data)
+    
+    profile.total = time.perf_counter() - started
+    return profile
+
+
+class _ProfiledHTTPConnection(HTTPConnection):
+    """urllib3 connection that reports DNS and TCP connect time"""
+    
+    def _new_conn(self):
+        phases = getattr(_active, "phases", None)
+        if phases is None:
+            return super()._new_conn()
+        
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            # Let urllib3 raise its usual resolution error
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        phases["dns"] = resolved - started
+        
+        # Connect to the address just resolved so DNS isn't timed twice
+        self._dns_host = addresses[0][4][0]
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        phases["connect"] = time.perf_counter() - resolved
+        return sock
+
+
+class _ProfiledHTTPSConnection(_ProfiledHTTPConnection, HTTPSConnection):
+    """HTTPS variant; TLS is whatever connect() spends beyond the TCP socket"""
+    
+    def connect(self):
+        phases = getattr(_active, "phases", None)
+        started = time.perf_counter()
+        super().connect()
+        if phases is not None:
+            phases["tls"] = max(
+                0.0, time.perf_counter() - started - phases.get("dns", 0.0) - phases.get("connect", 0.0)
+            )
+
+
+class _ProfiledHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _ProfiledHTTPConnection
+
+
+class _ProfiledHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _ProfiledHTTPSConnection
+
+
+class ProfilingAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report their phase timings"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _ProfiledHTTPConnectionPool,
+            "https": _ProfiledHTTPSConnectionPool,
+        }
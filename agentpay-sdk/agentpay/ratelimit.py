@@ -0,0 +1,259 @@
+"""
+Client-side rate limiting shared across processes
+
+Worker processes that share one agent token also share one server-side rate
+limit. Left alone, they burst together, all get 429s and back off without
+coordination. A RateLimiter paces every request through a token bucket
+whose state lives in a small lock file, so all processes on the host (and
+all threads in each) draw from the same budget. Server Retry-After and
+RateLimit-Remaining/Reset headers push the shared bucket back, so one
+process hitting the limit slows down every process.
+
+The bucket is run as a GCRA: the file holds the theoretical arrival time
+of the next request (and when it was written, to survive clock steps).
+Callers reserve a slot under the file lock and sleep outside it, so waiting
+callers are released one interval apart instead of stampeding.
+
+Usage:
+    limiter = agentpay.RateLimiter(rate=5, burst=10, key="agent_abc123")
+    client = agentpay.Client(token="agent_abc123", rate_limiter=limiter)
+    
+    # Every process constructing the same limiter shares the budget
+    agentpay.configure(token="agent_abc123", rate_limiter=limiter)
+"""
+
+import os
+import struct
+import tempfile
+import threading
+import time
+from hashlib import sha256
+from typing import Callable, Mapping, Optional, TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+from .retry import parse_retry_after
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .deadline import Deadline
+
+__all__ = ["RateLimiter", "parse_rate_limit_reset"]
+
+# Longest server back-off honoured
+MAX_BLOCK = 300.0
+
+# (theoretical arrival time, wall-clock time of the write)
+_STATE = struct.Struct("<dd")
+
+
+def parse_rate_limit_reset(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds until the server's rate-limit window resets, if it is exhausted
+    
+    Reads RateLimit-Remaining/RateLimit-Reset (or the X-RateLimit- forms).
+    Reset values larger than a year are taken as a Unix timestamp.
+    """
+    remaining = headers.get("RateLimit-Remaining") or headers.get("X-RateLimit-Remaining")
+    reset = headers.get("RateLimit-Reset") or headers.get("X-RateLimit-Reset")
+    if remaining is None or reset is None:
+        return None
+    try:
+        if float(remaining) > 0:
+            return None
+        seconds = float(reset)
+    except ValueError:
+        return None
+    if seconds > 365 * 24 * 3600:
+        seconds -= time.time() if now is None else now
+    return max(0.0, seconds)
+
+
+def _default_path(key: str) -> str:
+    name = f"agentpay-ratelimit-{sha256(key.encode('utf-8')).hexdigest()[:16]}"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+class RateLimiter:
+    """
+    Token-bucket request pacer shared by every process on the host
+    
+    Limiters built with the same key (or path) share one budget. Safe to use
+    from any number of threads and event loops, and across fork().
+    
+    Args:
+        rate: Sustained requests per second
+        burst: Requests allowed back to back after an idle period
+        key: Budget name; use the agent token so each token gets its own budget
+        path: State file (defaults to a file in the temp directory named after key)
+        clock: Wall-clock time source (must agree across processes)
+    """
+    
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        *,
+        key: str = "default",
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self.path = path or _default_path(key)
+        self._clock = clock
+        self._interval = 1.0 / rate
+        self._tolerance = (self.burst - 1) * self._interval
+        self._lock = threading.Lock()
+        self._fd = None  # type: Optional[int]
+        self._pid = None  # type: Optional[int]
+    
+    def __repr__(self) -> str:
+        return f"RateLimiter(rate={self.rate}, burst={self.burst}, path={self.path!r})"
+    
+    def __getstate__(self):
+        # Pickles as its settings, so a copy sent to a worker process shares the same file
+        return {"rate": self.rate, "burst": self.burst, "path": self.path, "clock": self._clock}
+    
+    def __setstate__(self, state) -> None:
+        self.__init__(state["rate"], state["burst"], path=state["path"], clock=state["clock"])
+    
+    def close(self) -> None:
+        """Close the state file (it is reopened on next use)"""
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+    
+    def _file(self) -> int:
+        # A descriptor inherited across fork() shares its lock with the parent,
+        # so each process opens its own
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+    
+    def _update(self, change: Callable[[float, float], Optional[float]]) -> None:
+        """Apply change(tat, now) to the shared state under the thread and file locks"""
+        with self._lock:
+            fd = self._file()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:  # pragma: no cover - Windows
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, _STATE.size)
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                data = os.read(fd, _STATE.size)
+                tat, written = _STATE.unpack(data) if len(data) == _STATE.size else (0.0, 0.0)
+                
+                now = self._clock()
+                if now < written:
+                    # The wall clock stepped back: keep the schedule relative to now
+                    tat -= written - now
+                updated = change(tat, now)
+                if updated is not None:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, _STATE.pack(updated, now))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:  # pragma: no cover - Windows
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, _STATE.size)
+    
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve the next request slot without sleeping
+        
+        Args:
+            max_wait: Give up (reserving nothing) if the slot is further away than this
+        
+        Returns:
+            Seconds to wait before sending, or None if that exceeds max_wait
+        """
+        wait = None  # type: Optional[float]
+        
+        def take(tat: float, now: float) -> Optional[float]:
+            nonlocal wait
+            tat = max(tat, now)
+            delay = max(0.0, tat - self._tolerance - now)
+            if max_wait is not None and delay > max_wait:
+                return None
+            wait = delay
+            return tat + self._interval
+        
+        self._update(take)
+        return wait
+    
+    def acquire(self, deadline: Optional["Deadline"] = None) -> float:
+        """
+        Wait for a request slot
+        
+        Returns:
+            Seconds waited
+        
+        Raises:
+            AgentPayError: DEADLINE_EXCEEDED if the slot is past the deadline
+                (the slot is not consumed)
+        """
+        wait = self.reserve(deadline.remaining() if deadline is not None else None)
+        if wait is None:
+            raise deadline.exceeded("client-side rate limit")
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def aacquire(self, deadline: Optional["Deadline"] = None) -> float:
+        """Async version of acquire(); the file lock is taken off the event loop"""
+        import asyncio
+        
+        # reserve() blocks on flock while another process holds the file
+        max_wait = deadline.remaining() if deadline is not None else None
+        wait = await asyncio.get_running_loop().run_in_executor(None, self.reserve, max_wait)
+        if wait is None:
+            raise deadline.exceeded("client-side rate limit")
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+    
+    def block(self, seconds: float) -> None:
+        """
+        Hold every process's next request back for seconds
+        
+        After the pause requests resume one interval apart rather than as a burst.
+        """
+        seconds = min(max(0.0, seconds), MAX_BLOCK)
+        
+        def push(tat: float, now: float) -> Optional[float]:
+            target = now + seconds + self._tolerance
+            return target if target > tat else None
+        
+        self._update(push)
+    
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Feed a response's rate-limit signals back into the shared bucket"""
+        pause = self._pause(status_code, headers)
+        if pause is not None:
+            self.block(pause)
+    
+    async def aobserve(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Async version of observe(); only a response that pauses the bucket touches the file, off the loop"""
+        import asyncio
+        
+        pause = self._pause(status_code, headers)
+        if pause is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.block, pause)
+    
+    def _pause(self, status_code: int, headers: Mapping[str, str]) -> Optional[float]:
+        """Seconds a response asks every client to hold back, if any"""
+        pause = parse_retry_after(headers) if status_code in (429, 503) else None
+        reset = parse_rate_limit_reset(headers, self._clock())
+        if reset is not None:
+            pause = max(pause or 0.0, reset)
+        return pause
@@ -0,0 +1,86 @@
+"""
+Retry policy for AgentPay API calls
+
+Transient failures (connection resets, timeouts, 429/502/503/504) are
+retried with exponential backoff and full jitter. Every attempt of one
+logical call carries the same Idempotency-Key, so a retried purchase can
+never be charged twice.
+"""
+
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional, FrozenSet, Mapping
+
+from .deadline import Deadline
+
+__all__ = ["RetryPolicy", "DEFAULT_RETRY", "NO_RETRY", "new_idempotency_key", "parse_retry_after"]
+
+RETRYABLE_STATUSES = frozenset({408, 429, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How transient failures are retried
+    
+    Args:
+        max_attempts: Total attempts including the first one
+        backoff_base: Delay scale in seconds for the first retry
+        backoff_max: Upper bound on any single backoff delay
+        retry_statuses: HTTP statuses that are safe to retry
+    
+    Example:
+        client = agentpay.Client(retry=RetryPolicy(max_attempts=5, backoff_base=0.05))
+    """
+    max_attempts: int = 3
+    backoff_base: float = 0.1
+    backoff_max: float = 2.0
+    retry_statuses: FrozenSet[int] = field(default=RETRYABLE_STATUSES)
+    
+    def should_retry(self, attempt: int) -> bool:
+        """True if another attempt is allowed after `attempt` (1-based) failed"""
+        return attempt < self.max_attempts
+    
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before the next attempt, using full jitter"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    def next_delay(
+        self,
+        attempt: int,
+        deadline: Deadline,
+        retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        """Backoff before the next attempt, or None if retrying isn't allowed or wouldn't fit the deadline"""
+        if not self.should_retry(attempt):
+            return None
+        delay = self.backoff(attempt, retry_after)
+        remaining = deadline.remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+
+DEFAULT_RETRY = RetryPolicy()
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def new_idempotency_key() -> str:
+    """Fresh key identifying one logical purchase across all its attempts"""
+    return uuid.uuid4().hex
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form only)"""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
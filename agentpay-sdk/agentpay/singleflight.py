@@ -0,0 +1,162 @@
+"""
+Single-flight deduplication of concurrent purchases
+
+When several agents settle on the same purchase at the same moment, or a
+framework retries a tool call that is still running, every copy would send
+its own request and put its own hold on the budget. A SingleFlight lets the
+first caller for a key make the call while callers with the same key that
+arrive before it finishes wait and share its result (or its exception).
+Nothing is cached: once the call completes, the next caller with the same
+key starts a fresh request.
+
+Only purchases the caller names (with a purchase_key or idempotency_key)
+are ever shared. Two unnamed purchases are two purchases, however alike
+they look.
+
+Usage:
+    client = agentpay.Client(token="agent_abc123")
+    
+    # Both threads get the same PaymentResult from one request
+    client.pay("gift-card", 50.00, {"brand": "amazon"}, purchase_key="order-17")
+    
+    # Without a key every call is its own purchase
+    client.pay("gift-card", 50.00, {"brand": "amazon"})
+"""
+
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+__all__ = ["SingleFlight", "AsyncSingleFlight", "flight_key"]
+
+T = TypeVar("T")
+
+
+def flight_key(
+    kind: str,
+    token: str,
+    target: str,
+    amount: Optional[float],
+    key: Optional[str] = None,
+    details: Optional[Dict[str, Any]] = None
+) -> Tuple[Hashable, ...]:
+    """
+    Key under which identical purchases coalesce
+    
+    Args:
+        kind: Flow being deduplicated (e.g. "purchase", "authorize")
+        token: Agent token the purchase is made with
+        target: Merchant or intent (case-insensitive)
+        amount: Purchase amount (compared to the cent)
+        key: Caller-supplied purchase key naming the purchase
+        details: Purchase details; purchases with different details never coalesce
+    """
+    cents = round(float(amount) * 100) if amount is not None else None
+    shape = json.dumps(details, sort_keys=True, separators=(",", ":"), default=str) if details else None
+    return (kind, token, target.strip().lower(), cents, key, shape)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls across threads (thread-safe)
+    
+    Attributes:
+        shared: Calls answered by joining another caller's request
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # type: Dict[Hashable, Future]
+        self.shared = 0
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        with self._lock:
+            return len(self._calls)
+    
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run fn(*args, **kwargs), or wait for the identical call already running
+        
+        Raises:
+            Whatever fn raised, in the caller and in every caller that joined it
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as error:
+            self._finish(key)
+            future.set_exception(error)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+    
+    def _finish(self, key: Hashable) -> None:
+        # Forget the call before publishing its outcome, so a caller arriving
+        # after completion starts a new request instead of reusing this one
+        with self._lock:
+            del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces identical concurrent coroutines on one event loop
+    
+    Joining callers are shielded: cancelling one of them never cancels the
+    shared request. If the caller running the request is cancelled, the
+    joined callers are cancelled too.
+    
+    Attributes:
+        shared: Calls answered by joining another caller's request
+    """
+    
+    def __init__(self):
+        self._calls = {}  # type: Dict[Hashable, Any]
+        self.shared = 0
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        return len(self._calls)
+    
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await fn(*args, **kwargs), or the identical call already running
+        
+        Raises:
+            Whatever fn raised, in the caller and in every caller that joined it
+        """
+        import asyncio
+        
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+        
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            del self._calls[key]
+            future.cancel()
+            raise
+        except BaseException as error:
+            del self._calls[key]
+            future.set_exception(error)
+            # Mark retrieved so a request nobody joined doesn't log a warning
+            future.exception()
+            raise
+        del self._calls[key]
+        future.set_result(result)
+        return result
@@ -0,0 +1,539 @@
+"""
+In-process stand-in for the AgentPay API
+
+FakeServer speaks enough of the AgentPay HTTP API for the SDK and the
+framework integrations to run end to end without the Node server or a
+database, so client-side behaviour (pooling, retries, breakers, pipelines)
+can be tested and benchmarked reproducibly on one machine.
+
+Served routes:
+    POST /v1/purchase-direct, /v1/purchase
+    POST /v1/authorize, /v1/authorize/{id}/confirm
+    GET  /limits, /transactions (also under /v1 and /api/v1)
+
+Usage:
+    from agentpay.testing import FakeServer
+    
+    with FakeServer(latency=(0.01, 0.05), error_rate=0.02, seed=1) as server:
+        client = agentpay.Client(token="ak_test", base_url=server.url)
+        result = client.pay("gift-card", amount=25)
+    
+    # Or from a shell, for the integrations:
+    #   python -m agentpay.testing --port 3000 --latency 0.02
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+__all__ = ["FakeServer", "lognormal"]
+
+Latency = Union[float, Tuple[float, float], Callable[[random.Random], float]]
+
+_CONFIRM_PATH = re.compile(r"^/v1/authorize/([^/]+)/confirm$")
+_API_PREFIX = re.compile(r"^(?:/api)?(?:/v1)?(?=/(?:limits|transactions)$)")
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """
+    Long-tailed latency distribution, closer to real network calls than uniform
+    
+    Args:
+        median: Median latency in seconds
+        sigma: Spread of the underlying normal distribution
+    
+    Returns:
+        A latency function usable anywhere FakeServer accepts a Latency
+    """
+    import math
+    
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def _epoch(text: str) -> float:
+    """Unix seconds for an ISO 8601 query value (naive times are UTC)"""
+    moment = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class _TokenBucket:
+    """Simple token bucket; take() returns seconds until a token is available"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def take(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            
+            return (1 - self._tokens) / self.rate
+
+
+class FakeServer:
+    """
+    Threaded HTTP server emulating the AgentPay API in memory
+    
+    Latencies may be a number of seconds, a (low, high) uniform range, or a
+    function of a random.Random (see lognormal). Pass a dict keyed by route
+    name ("purchase", "authorize", "confirm", "limits", "transactions") to
+    give routes different latencies; missing routes fall back to "default".
+    
+    Args:
+        latency: Response latency per request
+        error_rate: Fraction of requests answered with error_status
+        error_status: HTTP status used for injected errors
+        approval_rate: Fraction of purchases answered 202 requiresApproval
+        approval_threshold: Purchases at or above this amount always need approval
+        rate_limit: Requests per second, or (rate, burst); excess gets 429
+        daily_limit: Daily spending limit enforced by /v1/authorize
+        transaction_limit: Per-transaction limit enforced by /v1/authorize
+        tokens: Accepted agent tokens (any non-empty token when None)
+        seed: Seed for latency, error and approval sampling
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+    """
+    
+    def __init__(
+        self,
+        latency: Union[Latency, Dict[str, Latency]] = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        approval_rate: float = 0.0,
+        approval_threshold: Optional[float] = None,
+        rate_limit: Optional[Union[float, Tuple[float, int]]] = None,
+        daily_limit: float = 1000.0,
+        transaction_limit: float = 500.0,
+        tokens: Optional[List[str]] = None,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.latency = latency if isinstance(latency, dict) else {"default": latency}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.approval_rate = approval_rate
+        self.approval_threshold = approval_threshold
+        self.daily_limit = daily_limit
+        self.transaction_limit = transaction_limit
+        self.tokens = set(tokens) if tokens is not None else None
+        self.host = host
+        self.port = port
+        
+        if rate_limit is None:
+            self._bucket = None
+        elif isinstance(rate_limit, tuple):
+            self._bucket = _TokenBucket(*rate_limit)
+        else:
+            self._bucket = _TokenBucket(rate_limit, max(1, int(rate_limit)))
+        
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None  # type: Optional[ThreadingHTTPServer]
+        self._thread = None  # type: Optional[threading.Thread]
+        self.reset()
+    
+    @property
+    def url(self) -> str:
+        """Base URL to pass as base_url / api_base"""
+        return f"http://{self.host}:{self.port}"
+    
+    def start(self) -> "FakeServer":
+        """Start serving on a background thread"""
+        if self._httpd is not None:
+            return self
+        
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="agentpay-fake-server", daemon=True
+        )
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop serving and release the port"""
+        if self._httpd is None:
+            return
+        
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+        self._httpd = None
+        self._thread = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def reset(self) -> None:
+        """Forget transactions, authorizations, spend and call counts"""
+        with self._lock:
+            self.calls = Counter()  # type: Counter
+            self.transactions = []  # type: List[Dict[str, Any]]
+            self.authorizations = {}  # type: Dict[str, Dict[str, Any]]
+            self.daily_spent = 0.0
+            self._idempotent = {}  # type: Dict[str, Tuple[int, Dict[str, Any]]]
+    
+    def add_transaction(
+        self,
+        amount: float,
+        description: str = "Seeded transaction",
+        metadata: Optional[Dict[str, Any]] = None,
+        *,
+        created: Optional[int] = None,
+        status: str = "completed",
+        agent_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Seed the transaction history (without counting toward spend)"""
+        with self._lock:
+            transaction = self._record(amount, description, metadata or {})
+            self.daily_spent -= amount
+            transaction.update(status=status, agentId=agent_id)
+            if created is not None:
+                transaction["created"] = int(created)
+        return transaction
+    
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+    
+    def _chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+    
+    def _delay(self, route: str) -> float:
+        latency = self.latency.get(route, self.latency.get("default", 0.0))
+        
+        with self._lock:
+            if callable(latency):
+                return max(0.0, latency(self._rng))
+            if isinstance(latency, tuple):
+                return self._rng.uniform(*latency)
+        return float(latency or 0.0)
+    
+    def _check_token(self, token: Optional[str]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if not token:
+            return 400, {"success": False, "error": "Agent token is required", "code": "INVALID_TOKEN"}
+        if self.tokens is not None and token not in self.tokens:
+            return 401, {"success": False, "error": "Invalid or revoked agent token", "code": "INVALID_AGENT_TOKEN"}
+        return None
+    
+    def _record(self, amount: float, description: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        transaction = {
+            "id": f"txn_{uuid.uuid4().hex[:16]}",
+            "amount": amount,
+            "description": description,
+            "status": "completed",
+            "agentId": None,
+            "created": int(time.time()),
+            "metadata": metadata
+        }
+        self.transactions.append(transaction)
+        self.daily_spent += amount
+        return transaction
+    
+    def _purchase(self, body: Dict[str, Any], direct: bool) -> Tuple[int, Dict[str, Any]]:
+        denied = self._check_token(body.get("agentToken"))
+        if denied:
+            return denied
+        
+        service = body.get("service")
+        if not service or not isinstance(service, str):
+            return 400, {"success": False, "error": "Service is required", "code": "INVALID_SERVICE"}
+        
+        params = body.get("params") or {}
+        amount = float(params.get("budget") or params.get("amount") or 25)
+        
+        needs_approval = (
+            self.approval_threshold is not None and amount >= self.approval_threshold
+        ) or self._chance(self.approval_rate)
+        
+        if needs_approval:
+            return 202, {
+                "success": False,
+                "requiresApproval": True,
+                "approvalId": f"appr_{uuid.uuid4().hex[:16]}",
+                "action": service,
+                "estimatedAmount": amount,
+                "message": f"Purchase of {service} for ${amount:.2f} requires user approval"
+            }
+        
+        with self._lock:
+            transaction = self._record(amount, f"Purchase: {service}", {"service": service, "direct": direct})
+        
+        return 200, {
+            "success": True,
+            "transactionId": transaction["id"],
+            "amount": amount,
+            "service": service,
+            "details": {"service": service, "params": params, "note": "Purchase processed successfully"},
+            "message": f"Successfully purchased {service} for ${amount}"
+        }
+    
+    def _authorize(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        denied = self._check_token(body.get("agentToken"))
+        if denied:
+            return denied
+        
+        amount = float(body.get("amount") or 0)
+        started = time.monotonic()
+        
+        with self._lock:
+            if amount > self.transaction_limit:
+                reason = f"Amount ${amount:.2f} exceeds per-transaction limit of ${self.transaction_limit:.2f}"
+            elif self.daily_spent + amount > self.daily_limit:
+                reason = f"Would exceed daily limit of ${self.daily_limit:.2f}"
+            else:
+                reason = None
+            
+            if reason:
+                return 200, {"authorized": False, "reason": reason}
+            
+            authorization_id = f"auth_{uuid.uuid4().hex[:16]}"
+            self.authorizations[authorization_id] = {
+                "amount": amount,
+                "merchant": body.get("merchant"),
+                "category": body.get("category"),
+                "intent": body.get("intent"),
+                "captured": 0.0
+            }
+        
+        return 200, {
+            "authorized": True,
+            "authorizationId": authorization_id,
+            "scopedToken": f"st_{uuid.uuid4().hex}",
+            "latency": int((time.monotonic() - started) * 1000)
+        }
+    
+    def _confirm(self, authorization_id: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            authorization = self.authorizations.get(authorization_id)
+            if authorization is None:
+                return 404, {"success": False, "error": "Authorization not found", "code": "AUTHORIZATION_NOT_FOUND"}
+            
+            amount = float(body.get("finalAmount") or authorization["amount"])
+            if authorization["captured"] + amount > authorization["amount"] + 1e-9:
+                return 400, {"success": False, "error": "Amount exceeds authorization", "code": "AMOUNT_EXCEEDS_AUTHORIZATION"}
+            
+            authorization["captured"] += amount
+            transaction = self._record(
+                amount,
+                f"Purchase at {authorization['merchant']}",
+                {"authorizationId": authorization_id, "category": authorization["category"]}
+            )
+        
+        platform_fee = round(amount * 0.029 + 0.30, 2)
+        return 200, {
+            "success": True,
+            "transactionId": transaction["id"],
+            "amount": amount,
+            "platformFee": platform_fee,
+            "totalCharged": round(amount + platform_fee, 2),
+            "paymentMethod": {"type": "visa", "last4": "4242"}
+        }
+    
+    def _limits(self) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            spent = self.daily_spent
+        
+        return 200, {
+            "limits": {"daily": self.daily_limit, "per_transaction": self.transaction_limit},
+            "usage": {"daily_spent": spent, "monthly_spent": spent, "api_calls": sum(self.calls.values())},
+            "remaining": {
+                "daily": max(0.0, self.daily_limit - spent),
+                "daily_percentage": round(spent / self.daily_limit * 100) if self.daily_limit else 0
+            }
+        }
+    
+    def _transactions(self, query: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        limit = int(query.get("limit", 50))
+        offset = int(query.get("offset", 0))
+        status = query.get("status")
+        agent_id = query.get("agentId")
+        start = _epoch(query["from"]) if query.get("from") else None
+        end = _epoch(query["to"]) if query.get("to") else None
+        
+        with self._lock:
+            transactions = [
+                t for t in reversed(self.transactions)
+                if (not status or t["status"] == status)
+                and (not agent_id or t["agentId"] == agent_id)
+                and (start is None or t["created"] >= start)
+                and (end is None or t["created"] <= end)
+            ]
+        # Newest first, like the real API
+        transactions.sort(key=lambda t: t["created"], reverse=True)
+        
+        return 200, {
+            "object": "list",
+            "data": transactions[offset:offset + limit],
+            "has_more": offset + limit < len(transactions),
+            "total_count": len(transactions)
+        }
+    
+    def _dispatch(self, method: str, path: str, query: Dict[str, str],
+                  body: Dict[str, Any], token: Optional[str]) -> Tuple[str, int, Dict[str, Any]]:
+        path = _API_PREFIX.sub("", path)
+        confirm = _CONFIRM_PATH.match(path)
+        
+        if method == "POST" and path in ("/v1/purchase-direct", "/v1/purchase"):
+            body.setdefault("agentToken", token)
+            return ("purchase",) + self._purchase(body, path.endswith("-direct"))
+        if method == "POST" and path == "/v1/authorize":
+            body.setdefault("agentToken", token)
+            return ("authorize",) + self._authorize(body)
+        if method == "POST" and confirm:
+            return ("confirm",) + self._confirm(confirm.group(1), body)
+        if method == "GET" and path == "/limits":
+            return ("limits",) + self._limits()
+        if method == "GET" and path == "/transactions":
+            return ("transactions",) + self._transactions(query)
+        
+        return "unknown", 404, {"error": f"No route for {method} {path}", "code": "NOT_FOUND"}
+    
+    def _handle(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+                body: Dict[str, Any]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Apply rate limiting, injected errors, latency and idempotent replay"""
+        if self._bucket is not None:
+            wait = self._bucket.take()
+            if wait:
+                self._count("rate_limited")
+                return 429, {"Retry-After": f"{wait:.3f}"}, {
+                    "error": "Too many requests", "code": "RATE_LIMITED"
+                }
+        
+        key = headers.get("idempotency-key")
+        replay = self._idempotent.get(key) if key else None
+        if replay is not None:
+            self._count("replayed")
+            status, data = replay
+            return status, {"Idempotent-Replayed": "true"}, data
+        
+        if self._chance(self.error_rate):
+            self._count("injected_errors")
+            time.sleep(self._delay("default"))
+            # Fail before touching any state, like a real outage would, and
+            # don't cache the failure against the idempotency key
+            return self.error_status, {}, {"error": "Injected failure", "code": "SERVICE_UNAVAILABLE"}
+        
+        auth = headers.get("authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else None
+        
+        route, status, data = self._dispatch(method, path, query, body, token)
+        self._count(route)
+        
+        delay = self._delay(route)
+        time.sleep(delay)
+        timing = {"Server-Timing": f"app;dur={delay * 1000:.3f}"}
+        
+        if key and status < 500:
+            self._idempotent[key] = (status, data)
+        
+        return status, timing, data
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without this,
+            # Nagle + delayed ACK adds ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _serve(self, method: str) -> None:
+                path, _, raw_query = self.path.partition("?")
+                query = dict(parse_qsl(raw_query))
+                length = int(self.headers.get("Content-Length") or 0)
+                
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                except ValueError:
+                    body = None
+                
+                if not isinstance(body, dict):
+                    status, extra, data = 400, {}, {"error": "Invalid JSON body", "code": "INVALID_JSON"}
+                else:
+                    headers = {k.lower(): v for k, v in self.headers.items()}
+                    status, extra, data = server._handle(method, path, query, headers, body)
+                
+                payload = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def do_GET(self):
+                self._serve("GET")
+            
+            def do_POST(self):
+                self._serve("POST")
+        
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a FakeServer in the foreground (python -m agentpay.testing)"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Local stand-in AgentPay API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.0, help="median latency in seconds (log-normal)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--approval-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    
+    server = FakeServer(
+        latency=lognormal(args.latency) if args.latency > 0 else 0.0,
+        error_rate=args.error_rate,
+        approval_rate=args.approval_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+        host=args.host,
+        port=args.port
+    ).start()
+    
+    print(f"Fake AgentPay API listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
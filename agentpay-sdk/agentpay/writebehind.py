@@ -0,0 +1,166 @@
+"""
+Write-behind confirmation queue
+
+Confirming a finished merchant purchase doesn't change what the agent does
+next, so the agent shouldn't wait for it. ConfirmationQueue accepts confirm
+calls immediately, returns a Future for each, and sends them from a
+background thread in batches (up to max_batch, or whatever arrived within
+flush_interval).
+
+Usage:
+    confirmations = ConfirmationQueue(tool._confirm_transaction)
+    future = confirmations.submit(authorization_id, amount, details)
+    ...
+    future.result()          # only if you need the answer
+    confirmations.flush()    # e.g. before shutdown
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+__all__ = ["ConfirmationQueue"]
+
+DEFAULT_MAX_BATCH = 16
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_WORKERS = 4
+
+_STOP = object()
+
+_Entry = Tuple[Future, tuple, dict]
+
+
+class ConfirmationQueue:
+    """
+    Background, batched execution of confirm calls
+    
+    Each batch is handed to confirm_batch in one call when provided (for an
+    API that accepts many confirmations at once); otherwise its confirms run
+    concurrently on a small worker pool over the caller's pooled client.
+    
+    Args:
+        confirm: Function performing one confirmation
+        max_batch: Most confirmations sent per batch
+        flush_interval: Seconds to wait for a batch to fill before sending
+        workers: Concurrent confirmations when sending individually
+        confirm_batch: Optional function taking a list of (args, kwargs) and
+            returning one result per entry
+    """
+    
+    def __init__(
+        self,
+        confirm: Callable[..., Any],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        workers: int = DEFAULT_WORKERS,
+        confirm_batch: Optional[Callable[[List[Tuple[tuple, dict]]], List[Any]]] = None
+    ):
+        self.confirm = confirm
+        self.confirm_batch = confirm_batch
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentpay-confirm")
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+    
+    def submit(self, *args, **kwargs) -> Future:
+        """Queue one confirmation and return a Future for its result"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ConfirmationQueue is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="agentpay-confirm-flusher", daemon=True
+                )
+                self._thread.start()
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        self._queue.put((future, args, kwargs))
+        return future
+    
+    def pending(self) -> int:
+        """Confirmations queued or in flight"""
+        with self._lock:
+            return len(self._pending)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every queued confirmation; True if all finished in time"""
+        with self._lock:
+            snapshot = list(self._pending)
+        _, not_done = wait(snapshot, timeout=timeout)
+        return not not_done
+    
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Send what is queued, then stop the background thread"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        finished = self.flush(timeout)
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self._executor.shutdown(wait=False)
+        return finished
+    
+    def _forget(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+    
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch: List[_Entry] = [first]
+            stopping = False
+            send_by = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = send_by - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._send(batch)
+            if stopping:
+                return
+    
+    def _send(self, batch: List[_Entry]) -> None:
+        live = [entry for entry in batch if entry[0].set_running_or_notify_cancel()]
+        if not live:
+            return
+        if self.confirm_batch is not None:
+            self._executor.submit(self._send_batch, live)
+        else:
+            for entry in live:
+                self._executor.submit(self._send_one, entry)
+    
+    def _send_one(self, entry: _Entry) -> None:
+        future, args, kwargs = entry
+        try:
+            future.set_result(self.confirm(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+    
+    def _send_batch(self, batch: List[_Entry]) -> None:
+        try:
+            results = self.confirm_batch([(args, kwargs) for _, args, kwargs in batch])
+        except Exception as e:
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+        for future, _, _ in batch[len(results):]:
+            future.set_exception(RuntimeError("confirm_batch returned too few results"))
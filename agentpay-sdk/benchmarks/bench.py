@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+AgentPay SDK benchmark suite
+
+Measures the client-side hot paths of a purchase (payload build, JSON
+encode/decode, PaymentResult construction), the CrewAI tool's argument
+parsing and response formatting, and end-to-end throughput against the
+in-process FakeServer. Results are compared with baseline.json next to this
+file; the run fails (exit 1) when a benchmark regresses beyond its tolerance.
+
+CPU timings are normalised by a fixed pure-Python calibration loop, so a
+baseline recorded on one machine is still meaningful on another.
+
+Usage:
+    python benchmarks/bench.py                 # compare with baseline.json
+    python benchmarks/bench.py --save          # record a new baseline
+    python benchmarks/bench.py --only json     # run matching benchmarks only
+    python benchmarks/bench.py --threshold 0.5 # loosen every tolerance
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import agentpay  # noqa: E402
+from agentpay import codec  # noqa: E402
+from agentpay._protocol import build_purchase_payload, parse_purchase_response  # noqa: E402
+from agentpay.testing import FakeServer  # noqa: E402
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+INTEGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(HERE)), "integrations")
+
+DEFAULT_TOLERANCE = 0.30
+THROUGHPUT_TOLERANCE = 0.40
+
+PAYLOAD_DETAILS = {"restaurant": "Pizza Palace", "items": ["Large Pizza", "Garlic Bread"], "address": "1 Main St"}
+RESPONSE_BODY = json.dumps({
+    "success": True,
+    "transactionId": "tx_clean_1700000000000_deadbeef",
+    "amount": 25.0,
+    "service": "food-delivery",
+    "details": {"service": "food-delivery", "params": PAYLOAD_DETAILS, "note": "Purchase processed successfully"},
+    "latency": 87,
+    "message": "Successfully purchased food-delivery for $25"
+}).encode("utf-8")
+
+
+class Benchmark:
+    """
+    One registered benchmark
+    
+    kind "time" reports nanoseconds per call (lower is better); kind
+    "throughput" reports calls per second (higher is better).
+    """
+    
+    def __init__(self, name: str, func: Callable, kind: str, tolerance: float):
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.tolerance = tolerance
+
+
+BENCHMARKS = []  # type: List[Benchmark]
+
+
+def bench(name: str, kind: str = "time", tolerance: Optional[float] = None):
+    """Register a benchmark; time benchmarks return the callable to time"""
+    def register(func):
+        if tolerance is None:
+            limit = THROUGHPUT_TOLERANCE if kind == "throughput" else DEFAULT_TOLERANCE
+        else:
+            limit = tolerance
+        BENCHMARKS.append(Benchmark(name, func, kind, limit))
+        return func
+    return register
+
+
+def time_per_call(func: Callable[[], object], repeat: int = 7) -> float:
+    """Best-of-repeat nanoseconds per call, auto-sizing the loop count"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def calibration() -> float:
+    """Nanoseconds for a fixed pure-Python workload (machine speed reference)"""
+    def work():
+        total = 0
+        data = {}
+        for i in range(200):
+            data[i] = str(i)
+            total += len(data[i])
+        return total
+    return time_per_call(work)
+
+
+def load_crewai_tool():
+    """Load the CrewAI integration module, or None when crewai isn't installed"""
+    path = os.path.join(INTEGRATIONS_DIR, "crewai-agentpay.py")
+    spec = importlib.util.spec_from_file_location("crewai_agentpay", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError:
+        return None
+    return module.AgentPayTool
+
+
+@bench("payload_build")
+def bench_payload_build():
+    return lambda: build_purchase_payload("ak_bench", "food-delivery", 25.0, PAYLOAD_DETAILS)
+
+
+@bench("json_encode")
+def bench_json_encode():
+    payload = build_purchase_payload("ak_bench", "food-delivery", 25.0, PAYLOAD_DETAILS)
+    return lambda: codec.get().dumps(payload)
+
+
+@bench("json_decode")
+def bench_json_decode():
+    return lambda: codec.get().loads_purchase(RESPONSE_BODY)
+
+
+@bench("parse_response")
+def bench_parse_response():
+    data = codec.get().loads_purchase(RESPONSE_BODY)
+    return lambda: parse_purchase_response(200, data)
+
+
+@bench("pay_cpu_path")
+def bench_pay_cpu_path():
+    """Everything pay() does per call except the socket round trip"""
+    def call():
+        payload = build_purchase_payload("ak_bench", "food-delivery", 25.0, PAYLOAD_DETAILS)
+        codec.get().dumps(payload)
+        return parse_purchase_response(200, codec.get().loads_purchase(RESPONSE_BODY))
+    return call
+
+
+@bench("metrics_record")
+def bench_metrics_record():
+    """Cost of recording one pay() outcome while metrics are enabled"""
+    from agentpay import metrics
+    return lambda: metrics.observe_pay("gift-card", "success", 0.012)
+
+
+@bench("crewai_parse_argument")
+def bench_crewai_parse_argument():
+    tool = load_crewai_tool()
+    if tool is None:
+        return None
+    argument = "merchant=doordash.com, amount=25.50, category=food, intent=Order lunch for the team"
+    return lambda: tool._parse_argument(None, argument)
+
+
+@bench("crewai_format_success")
+def bench_crewai_format_success():
+    tool = load_crewai_tool()
+    if tool is None:
+        return None
+    confirm = {
+        "success": True, "transactionId": "txn_bench", "amount": 25.5, "platformFee": 1.04,
+        "totalCharged": 26.54, "paymentMethod": {"type": "visa", "last4": "4242"}
+    }
+    purchase = {
+        "success": True, "order_id": "ORDER_1", "merchant": "doordash.com", "amount_charged": 25.5,
+        "transaction_details": {"orderId": "ORDER_1", "items": ["Order lunch"]}
+    }
+    return lambda: tool._format_success_response(None, confirm, purchase)
+
+
+def _throughput(concurrency: int, calls: int = 200, latency: float = 0.005) -> float:
+    with FakeServer(latency=latency, seed=0) as server:
+        client = agentpay.Client(token="ak_bench", base_url=server.url)
+        requests = [("gift-card", 25.0, {"brand": "amazon"})] * calls
+        try:
+            client.pay("gift-card", amount=25.0)  # warm the connection pool
+            started = time.perf_counter()
+            if concurrency == 1:
+                for intent, amount, details in requests:
+                    client.pay(intent, amount, details)
+            else:
+                list(agentpay.pay_many(requests, concurrency=concurrency, client=client))
+            return calls / (time.perf_counter() - started)
+        finally:
+            client.close()
+
+
+@bench("pay_sequential", kind="throughput")
+def bench_pay_sequential():
+    return _throughput(concurrency=1)
+
+
+@bench("pay_concurrent", kind="throughput")
+def bench_pay_concurrent():
+    return _throughput(concurrency=16)
+
+
+def run(only: Optional[str], rounds: int = 3) -> Dict[str, Dict[str, float]]:
+    """Run the selected benchmarks, returning {name: {value, kind}}"""
+    selected = [b for b in BENCHMARKS if not only or only in b.name]
+    timers = {}  # type: Dict[str, Callable[[], object]]
+    
+    for benchmark in selected:
+        if benchmark.kind == "time":
+            func = benchmark.func()
+            if func is None:
+                print(f"  {benchmark.name:<24} skipped (dependency not installed)")
+                continue
+            timers[benchmark.name] = func
+    
+    # Several interleaved rounds, keeping each benchmark's best: background
+    # load comes in bursts longer than one timeit repeat, and the calibration
+    # loop has to see the same conditions as the benchmarks it normalises
+    best = {}  # type: Dict[str, float]
+    for _ in range(rounds):
+        best["_calibration"] = min(best.get("_calibration", float("inf")), calibration())
+        for name, func in timers.items():
+            best[name] = min(best.get(name, float("inf")), time_per_call(func))
+    
+    results = {"_calibration": {"value": best["_calibration"], "kind": "time"}}
+    
+    for benchmark in selected:
+        if benchmark.kind == "time":
+            if benchmark.name not in best:
+                continue
+            value = best[benchmark.name]
+            print(f"  {benchmark.name:<24} {value:>12.0f} ns/call")
+        else:
+            value = benchmark.func()
+            print(f"  {benchmark.name:<24} {value:>12.1f} calls/s")
+        
+        results[benchmark.name] = {"value": value, "kind": benchmark.kind}
+    
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: Optional[float]) -> List[str]:
+    """Return a description of every benchmark that regressed"""
+    # Scale CPU baselines to this machine's speed
+    scale = results["_calibration"]["value"] / baseline["_calibration"]["value"]
+    tolerances = {b.name: b.tolerance for b in BENCHMARKS}
+    regressions = []
+    
+    for name, result in results.items():
+        if name.startswith("_") or name not in baseline:
+            continue
+        
+        tolerance = threshold if threshold is not None else tolerances[name]
+        expected = baseline[name]["value"]
+        
+        if result["kind"] == "time":
+            expected *= scale
+            change = result["value"] / expected - 1
+        else:
+            change = expected / result["value"] - 1
+        
+        status = "REGRESSED" if change > tolerance else "ok"
+        print(f"  {name:<24} {change:>+8.1%} vs baseline (tolerance {tolerance:.0%})  {status}")
+        
+        if change > tolerance:
+            regressions.append(f"{name} is {change:.1%} slower than baseline")
+    
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AgentPay SDK benchmarks")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--only", help="run benchmarks whose name contains this text")
+    parser.add_argument("--threshold", type=float, help="override every regression tolerance")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare against")
+    args = parser.parse_args(argv)
+    
+    print(f"Running benchmarks (JSON codec: {codec.get().name}):")
+    results = run(args.only)
+    
+    if args.save:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        else:
+            baseline = {}
+        if "_calibration" in baseline and args.only:
+            # Partial re-record: express the new numbers in the existing
+            # baseline's machine speed so the untouched entries stay valid
+            scale = baseline["_calibration"]["value"] / results.pop("_calibration")["value"]
+            for result in results.values():
+                if result["kind"] == "time":
+                    result["value"] *= scale
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save first")
+        return 0
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    
+    print("\nCompared with baseline:")
+    regressions = compare(results, baseline, args.threshold)
+    
+    if regressions:
+        print("\nFAILED:\n  " + "\n  ".join(regressions))
+        return 1
+    
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the agentpay package
+
+Cold-starting workers pay for `import agentpay` on every invocation, so the
+package defers the HTTP stack (requests/urllib3), asyncio and aiohttp until
+first use. This script runs `python -X importtime` in fresh interpreters and
+fails (exit 1) when:
+
+  * importing agentpay, PaymentResult or AgentPayError loads a forbidden module
+  * the best-of-N cumulative import time of agentpay exceeds the budget
+
+Usage:
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --budget-ms 40 --runs 7
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SDK_ROOT = os.path.dirname(HERE)
+
+DEFAULT_BUDGET_MS = 30.0
+DEFAULT_RUNS = 5
+
+# Must not be loaded by the light-weight entry points
+FORBIDDEN = ("requests", "urllib3", "aiohttp", "asyncio", "agentpay.client")
+
+SNIPPET = "import agentpay\nfrom agentpay import PaymentResult, AgentPayError\n"
+
+
+def measure() -> Tuple[float, List[str]]:
+    """Cumulative agentpay import time (ms) and every module it loaded"""
+    env = dict(os.environ, PYTHONPATH=SDK_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.pop("AGENTPAY_TOKEN", None)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        universal_newlines=True, check=True
+    )
+    
+    cumulative_us = 0
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        name = name.strip()
+        modules.append(name)
+        if name == "agentpay":
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, modules
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="agentpay import-time budget")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args(argv)
+    
+    timings = []
+    loaded = set()
+    for _ in range(args.runs):
+        elapsed, modules = measure()
+        timings.append(elapsed)
+        loaded.update(modules)
+    
+    best = min(timings)
+    print(f"import agentpay: best {best:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    
+    failures = []
+    leaked = sorted(m for m in loaded if m in FORBIDDEN)
+    if leaked:
+        failures.append(f"import agentpay loaded {', '.join(leaked)}")
+    if best > args.budget_ms:
+        failures.append(f"import agentpay took {best:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        return 1
+    
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
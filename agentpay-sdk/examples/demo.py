@@ -29,13 +29,16 @@ def main():
         ("flight", 400.00, {"from": "SFO", "to": "LAX", "date": "2025-02-01"}),
     ]
     
-    for intent, amount, details in purchases:
+    # This is the magic - one line to buy anything!
+    # pay_many() runs the purchases concurrently and yields them in order
+    for item in agentpay.pay_many(purchases, concurrency=4):
+        intent = item.request[0]
+        result = item.result
         print(f"\n🔄 Purchasing: {intent}")
         
-        # This is the magic - one line to buy anything!
-        result = agentpay.pay(intent, amount, details)
-        
-        if result.success:
+        if item.error:
+            print(f"   ❌ ERROR: {item.error}")
+        elif result.success:
             print(f"   ✅ SUCCESS: {result.message}")
             print(f"   💰 Amount: ${result.amount}")
             print(f"   🔗 Transaction: {result.transaction_id}")
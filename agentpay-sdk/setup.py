@@ -8,9 +8,9 @@ def read_readme():
     with open("README.md", "r", encoding="utf-8") as f:
         return f.read()
 
-# Read version from __init__.py
+# Read version from _version.py
 def read_version():
-    with open("agentpay/__init__.py", "r") as f:
+    with open("agentpay/_version.py", "r") as f:
         for line in f:
             if line.startswith("__version__"):
                 return line.split("=")[1].strip().strip('"').strip("'")
@@ -66,6 +66,20 @@ setup(
         "async": [
             "aiohttp>=3.7.0",
         ],
+        "fast": [
+            "msgspec>=0.18",
+        ],
+        "msgspec": [
+            "msgspec>=0.18",
+        ],
+        "orjson": [
+            "orjson>=3.0",
+        ],
+    },
+    entry_points={
+        "console_scripts": [
+            "agentpay=agentpay.cli:main",
+        ],
     },
     include_package_data=True,
     zip_safe=False,
@@ -0,0 +1,36 @@
+"""
+Shared setup for the agentpay test suite
+
+Run from agentpay-sdk/:
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+SDK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Test the package in this tree, not an installed copy
+if SDK_ROOT not in sys.path:
+    sys.path.insert(0, SDK_ROOT)
+
+from agentpay.client import Client
+from agentpay.retry import NO_RETRY
+from agentpay.testing import FakeServer
+
+
+@pytest.fixture
+def server():
+    """A fresh in-process fake AgentPay API, seeded so runs repeat"""
+    with FakeServer(seed=1) as fake:
+        yield fake
+
+
+@pytest.fixture
+def client(server):
+    """Client for the fake server without retries, so each call is one request"""
+    client = Client(token="agent_test", base_url=server.url, retry=NO_RETRY)
+    yield client
+    client.close()
@@ -0,0 +1,101 @@
+"""AsyncClient lifecycle: explicit close, the per-loop shared client, and warnings for unclosed sessions"""
+
+import asyncio
+import gc
+import threading
+import warnings
+
+import pytest
+
+aio = pytest.importorskip("agentpay.aio")
+
+
+def test_async_with_closes_the_session(server):
+    async def run():
+        async with aio.AsyncClient(token="agent_test", base_url=server.url) as client:
+            response = await client.request("GET", "/limits")
+            session = client._session
+        return response.status_code, session
+    
+    status, session = asyncio.run(run())
+    assert status == 200
+    assert session.closed
+
+
+def test_close_is_idempotent(server):
+    async def run():
+        client = aio.AsyncClient(token="agent_test", base_url=server.url)
+        await client.request("GET", "/limits")
+        await client.close()
+        await client.close()
+        return client
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", ResourceWarning)
+        client = asyncio.run(run())
+        del client
+        gc.collect()
+
+
+def test_the_shared_client_is_per_loop_and_closed_by_aio_close(server, monkeypatch):
+    monkeypatch.setitem(aio._config, "base_url", server.url)
+    
+    async def run():
+        client = aio.get_client()
+        assert aio.get_client() is client
+        await client.request("GET", "/limits")
+        session = client._session
+        await aio.close()
+        return client, session
+    
+    first, session = asyncio.run(run())
+    second, _ = asyncio.run(run())
+    assert first is not second
+    assert session.closed
+
+
+def test_a_client_dropped_with_an_open_session_warns(server):
+    async def run():
+        client = aio.AsyncClient(token="agent_test", base_url=server.url)
+        await client.request("GET", "/limits")
+    
+    with pytest.warns(ResourceWarning, match="Unclosed AsyncClient session"):
+        asyncio.run(run())
+        gc.collect()
+
+
+def test_moving_to_a_new_loop_closes_the_old_session_if_its_loop_still_runs(server):
+    client = aio.AsyncClient(token="agent_test", base_url=server.url)
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever)
+    thread.start()
+    
+    async def open_session():
+        return client._get_session()
+    
+    old = asyncio.run_coroutine_threadsafe(open_session(), old_loop).result()
+    
+    async def run():
+        await client.request("GET", "/limits")
+        await asyncio.sleep(0.05)
+        await client.close()
+    
+    try:
+        asyncio.run(run())
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join()
+        old_loop.close()
+    assert old.closed
+
+
+def test_a_session_stranded_on_a_finished_loop_warns(server):
+    client = aio.AsyncClient(token="agent_test", base_url=server.url)
+    
+    async def run():
+        await client.request("GET", "/limits")
+    
+    asyncio.run(run())
+    with pytest.warns(ResourceWarning):
+        asyncio.run(run())
+    asyncio.run(client.close())
@@ -0,0 +1,104 @@
+"""pay_many(): input order, completion order, lazy consumption, per-item failures and the concurrency cap"""
+
+import threading
+import time
+
+import pytest
+
+from agentpay.batch import pay_many
+from agentpay.client import Client
+from agentpay.models import PaymentResult
+from agentpay.retry import NO_RETRY
+from agentpay.testing import FakeServer
+
+
+class SlowClient:
+    """Stands in for Client.pay: sleeps amount/100 seconds and tracks purchases in flight"""
+    
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+    
+    def pay(self, intent, amount=None, details=None, **kwargs):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep((amount or 0.0) / 100)
+        with self._lock:
+            self.running -= 1
+        return PaymentResult(success=True, amount=amount)
+
+
+def test_purchases_stream_in_input_order_against_the_fake_server(server, client):
+    requests = [("gift-card", float(n + 1), {"brand": "amazon"}) for n in range(20)]
+    
+    items = list(pay_many(requests, concurrency=4, client=client))
+    
+    assert [item.index for item in items] == list(range(20))
+    assert all(item.ok for item in items)
+    assert [item.result.amount for item in items] == [float(n + 1) for n in range(20)]
+    assert server.calls["purchase"] == 20
+
+
+def test_a_failing_item_does_not_abort_the_batch():
+    requests = [
+        ("gift-card", 10.0),
+        {"amount": 5.0},
+        {"intent": "gift-card", "amount": 900.0},
+        {"intent": "gift-card", "amount": 20.0, "details": {"brand": "amazon"}},
+    ]
+    
+    with FakeServer(approval_threshold=100.0, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=NO_RETRY)
+        try:
+            items = list(pay_many(requests, concurrency=2, client=client))
+        finally:
+            client.close()
+    
+    assert [item.ok for item in items] == [True, False, False, True]
+    # A malformed request is reported on its item; one awaiting approval carries the result
+    assert isinstance(items[1].error, KeyError)
+    assert items[2].error is None and items[2].result.error == "approval_required"
+    assert items[3].request == requests[3]
+
+
+def test_unordered_results_arrive_as_each_purchase_finishes():
+    client = SlowClient()
+    
+    items = list(pay_many([("slow", 30.0), ("fast", 1.0), ("fast", 1.0)], concurrency=3, ordered=False, client=client))
+    
+    assert sorted(item.index for item in items) == [0, 1, 2]
+    assert items[-1].index == 0
+
+
+def test_the_input_is_consumed_lazily():
+    pulled = []
+    
+    def requests():
+        for n in range(1000):
+            pulled.append(n)
+            yield ("sms", 0.0)
+    
+    for ordered in (True, False):
+        pulled.clear()
+        batch = pay_many(requests(), concurrency=2, ordered=ordered, client=SlowClient())
+        next(batch)
+        # Ordered batches keep a window of twice the concurrency in flight
+        assert len(pulled) <= 5
+        batch.close()
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_concurrency_caps_purchases_in_flight(ordered):
+    client = SlowClient()
+    
+    items = list(pay_many([("sms", 2.0)] * 24, concurrency=3, ordered=ordered, client=client))
+    
+    assert len(items) == 24
+    assert client.peak == 3
+
+
+def test_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        pay_many([], concurrency=0)
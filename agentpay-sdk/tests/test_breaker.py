@@ -0,0 +1,166 @@
+"""Circuit breaker: opening on the failure rate, half-open probes, fail-fast transports"""
+
+import pytest
+
+from agentpay.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, endpoint_key
+from agentpay.client import Client
+from agentpay.errors import AgentPayError
+from agentpay.retry import NO_RETRY, RetryPolicy
+from agentpay.testing import FakeServer
+
+ENDPOINT = "POST /v1/authorize"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_rate=0.5, min_calls=4, reset_timeout=10.0, clock=clock)
+
+
+def test_endpoint_key_collapses_ids_but_keeps_versions():
+    assert endpoint_key("post", "/v1/authorize/auth_123/confirm?x=1") == "POST /v1/authorize/{id}/confirm"
+    assert endpoint_key("GET", "/v2/limits") == "GET /v2/limits"
+
+
+def test_stays_closed_until_min_calls(breaker):
+    for _ in range(3):
+        breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == CLOSED
+    breaker.before_call(ENDPOINT)
+
+
+def test_opens_at_failure_rate_and_fails_fast(breaker):
+    breaker.record_success(ENDPOINT)
+    breaker.record_success(ENDPOINT)
+    breaker.record_failure(ENDPOINT)
+    breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == OPEN
+    
+    with pytest.raises(AgentPayError) as raised:
+        breaker.before_call(ENDPOINT)
+    assert raised.value.code == "CIRCUIT_OPEN"
+    assert raised.value.details["retry_in"] == pytest.approx(10.0)
+    # Other endpoints are unaffected
+    breaker.before_call("GET /limits")
+
+
+def _open(breaker):
+    for _ in range(4):
+        breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == OPEN
+
+
+def test_half_open_admits_one_probe_and_success_closes(breaker, clock):
+    _open(breaker)
+    clock.now += 10.0
+    assert breaker.state(ENDPOINT) == HALF_OPEN
+    
+    breaker.before_call(ENDPOINT)
+    with pytest.raises(AgentPayError):
+        breaker.before_call(ENDPOINT)  # only half_open_calls probes at a time
+    
+    breaker.record_success(ENDPOINT)
+    assert breaker.state(ENDPOINT) == CLOSED
+    breaker.before_call(ENDPOINT)
+
+
+def test_failed_probe_reopens_for_another_timeout(breaker, clock):
+    _open(breaker)
+    clock.now += 10.0
+    breaker.before_call(ENDPOINT)
+    breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == OPEN
+    
+    clock.now += 5.0
+    with pytest.raises(AgentPayError) as raised:
+        breaker.before_call(ENDPOINT)
+    assert raised.value.details["retry_in"] == pytest.approx(5.0)
+
+
+def test_failures_age_out_of_the_window(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure(ENDPOINT)
+    clock.now += 31.0
+    breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == CLOSED
+
+
+def test_client_stops_calling_an_open_endpoint():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2)
+    with FakeServer(error_rate=1.0, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=NO_RETRY, breaker=breaker)
+        try:
+            for _ in range(2):
+                assert client.request("GET", "/limits").status_code == 503
+            with pytest.raises(AgentPayError) as raised:
+                client.request("GET", "/limits")
+        finally:
+            client.close()
+    assert raised.value.code == "CIRCUIT_OPEN"
+    assert server.calls["injected_errors"] == 2
+
+
+def test_client_probes_a_half_open_endpoint_and_closes_it_on_success(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, reset_timeout=10.0, clock=clock)
+    with FakeServer(error_rate=1.0, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=NO_RETRY, breaker=breaker)
+        try:
+            for _ in range(2):
+                client.request("GET", "/limits")
+            assert breaker.state("GET /limits") == OPEN
+            
+            server.error_rate = 0.0
+            clock.now += 10.0
+            assert client.request("GET", "/limits").status_code == 200
+        finally:
+            client.close()
+    assert breaker.state("GET /limits") == CLOSED
+
+
+def test_client_errors_do_not_trip_the_breaker(client):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2)
+    client.breaker = breaker
+    
+    for _ in range(5):
+        assert client.request("GET", "/v1/unknown").status_code == 404
+    
+    assert breaker.state("GET /v1/unknown") == CLOSED
+
+
+def test_retries_stop_once_the_circuit_opens():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2)
+    policy = RetryPolicy(max_attempts=10, backoff_base=0.0, backoff_max=0.0)
+    with FakeServer(error_rate=1.0, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=policy, breaker=breaker)
+        try:
+            with pytest.raises(AgentPayError) as raised:
+                client.request("GET", "/limits")
+        finally:
+            client.close()
+    assert raised.value.code == "CIRCUIT_OPEN"
+    assert server.calls["injected_errors"] == 2
+
+
+def test_an_expired_deadline_is_not_counted_against_the_endpoint(server, client):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=1)
+    client.breaker = breaker
+    
+    for _ in range(3):
+        with pytest.raises(AgentPayError) as raised:
+            client.request("GET", "/limits", deadline=0.0)
+        assert raised.value.code == "DEADLINE_EXCEEDED"
+    
+    assert server.calls["limits"] == 0
+    assert breaker.state("GET /limits") == CLOSED
@@ -0,0 +1,89 @@
+"""Client connection pooling: per-thread sessions, close(), and the shared client behind configure()"""
+
+import gc
+import threading
+
+import pytest
+
+import agentpay
+from agentpay.errors import AgentPayError
+
+
+@pytest.fixture
+def shared_client(server):
+    """Point the module-level client at the fake server, restoring the configuration afterwards"""
+    saved = dict(agentpay._config)
+    with agentpay._client_lock:
+        previous, agentpay._client = agentpay._client, None
+    agentpay.configure(token="agent_test", base_url=server.url)
+    yield
+    if agentpay._client is not None:
+        agentpay._client.close()
+    agentpay._config.clear()
+    agentpay._config.update(saved)
+    agentpay._client = previous
+
+
+def test_threads_share_one_connection_pool(server, client):
+    def call():
+        client.request("GET", "/limits")
+    
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert server.calls["limits"] == 4
+
+
+def test_sessions_of_finished_threads_are_released(client):
+    def call():
+        client._session()
+    
+    for _ in range(20):
+        thread = threading.Thread(target=call)
+        thread.start()
+        thread.join()
+    gc.collect()
+    
+    assert len(client._sessions) == 0
+    client._session()
+    assert len(client._sessions) == 1
+
+
+def test_a_closed_client_refuses_new_requests(server, client):
+    client.request("GET", "/limits")
+    client.close()
+    
+    def call():
+        with pytest.raises(AgentPayError) as raised:
+            client.request("GET", "/limits")
+        errors.append(raised.value.code)
+    
+    errors = []
+    thread = threading.Thread(target=call)
+    thread.start()
+    thread.join()
+    assert errors == ["CLIENT_CLOSED"]
+
+
+def test_configure_reuses_the_shared_client_for_plain_settings(shared_client):
+    client = agentpay.get_client()
+    
+    agentpay.configure(timeout=5)
+    
+    assert agentpay.get_client() is client
+    assert client.timeout == 5
+
+
+def test_changing_the_pool_size_closes_the_old_client(shared_client):
+    old = agentpay.get_client()
+    old.request("GET", "/limits")
+    
+    agentpay.configure(pool_size=old.pool_size + 1)
+    
+    assert old._closed
+    new = agentpay.get_client()
+    assert new is not old and new.pool_size == old.pool_size + 1
+    assert new.request("GET", "/limits").status_code == 200
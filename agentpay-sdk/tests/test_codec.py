@@ -0,0 +1,82 @@
+"""JSON codec: backend selection and lazy decoding of purchase details"""
+
+import pytest
+
+from agentpay import codec
+from agentpay.models import PaymentResult
+
+
+@pytest.fixture(autouse=True)
+def restore_codec(monkeypatch):
+    """Let each test pick its own codec without leaking it into the next"""
+    monkeypatch.delenv("AGENTPAY_JSON", raising=False)
+    previous = codec._codec
+    codec._codec = None
+    yield
+    codec._codec = previous
+
+
+class CountingCodec(codec.Codec):
+    """The msgspec codec, counting full decodes"""
+    
+    def __init__(self):
+        backend = codec.use("msgspec")
+        self.decodes = 0
+        
+        def loads(data):
+            self.decodes += 1
+            return backend.loads(data)
+        
+        super().__init__("counting", backend.dumps, loads, backend.loads_purchase)
+
+
+def test_msgspec_is_preferred_when_installed():
+    pytest.importorskip("msgspec")
+    
+    assert codec.get().name == "msgspec"
+
+
+def test_agentpay_json_forces_a_backend(monkeypatch):
+    monkeypatch.setenv("AGENTPAY_JSON", "json")
+    
+    assert codec.get().name == "json"
+
+
+def test_an_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        codec.use("yaml")
+
+
+def test_details_are_decoded_on_first_access_only(server, client):
+    pytest.importorskip("msgspec")
+    counting = codec.use(CountingCodec())
+    
+    result = client.pay("gift-card", 20.0, {"brand": "amazon"})
+    assert result.success and counting.decodes == 0
+    
+    assert result.details["params"]["brand"] == "amazon"
+    assert result.details["service"] == "gift-card"
+    assert counting.decodes == 1
+
+
+def test_results_with_raw_details_compare_and_export_decoded():
+    pytest.importorskip("msgspec")
+    loads_purchase = codec.use("msgspec").loads_purchase
+    body = b'{"success": true, "transactionId": "txn_1", "amount": 5, "details": {"note": "ok"}}'
+    data = loads_purchase(body)
+    
+    result = PaymentResult(success=True, transaction_id="txn_1", amount=5, details=data["details"])
+    
+    assert result == PaymentResult(success=True, transaction_id="txn_1", amount=5, details={"note": "ok"})
+    assert result.to_dict()["details"] == {"note": "ok"}
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_every_backend_round_trips(name):
+    if name != "json":
+        pytest.importorskip(name)
+    backend = codec.use(name)
+    
+    payload = {"amount": 12.5, "params": {"brand": "amazon"}, "note": "café"}
+    assert backend.loads(backend.dumps(payload)) == payload
+    assert backend.loads_purchase(backend.dumps({"success": True, "details": {}}))["success"] is True
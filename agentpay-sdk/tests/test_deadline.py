@@ -0,0 +1,117 @@
+"""Deadline budgets: capping per-attempt timeouts and failing with DEADLINE_EXCEEDED"""
+
+import asyncio
+import time
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.deadline import Deadline
+from agentpay.errors import AgentPayError
+from agentpay.retry import RetryPolicy
+from agentpay.testing import FakeServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 50.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_coerce_accepts_seconds_deadlines_and_none():
+    deadline = Deadline(1.0)
+    assert Deadline.coerce(deadline) is deadline
+    assert Deadline.coerce(2.0).budget == 2.0
+    assert not Deadline.coerce(None).bounded
+
+
+def test_unbounded_deadline_never_expires():
+    deadline = Deadline()
+    assert deadline.remaining() is None
+    assert deadline.timeout(7.0) == 7.0
+    deadline.check()
+
+
+def test_timeout_is_capped_by_the_time_left():
+    clock = FakeClock()
+    deadline = Deadline(5.0, clock=clock)
+    assert deadline.timeout(30.0) == 5.0
+    clock.now += 4.0
+    assert deadline.timeouts(3.0, 30.0) == (1.0, 1.0)
+
+
+def test_spent_budget_raises_instead_of_a_zero_timeout():
+    clock = FakeClock()
+    deadline = Deadline(1.0, clock=clock)
+    deadline.enter("confirm")
+    clock.now += 1.0
+    with pytest.raises(AgentPayError) as raised:
+        deadline.timeout(30.0)
+    assert raised.value.code == "DEADLINE_EXCEEDED"
+    assert raised.value.details == {"phase": "confirm", "budget": 1.0}
+
+
+def test_enter_fails_once_the_budget_is_spent():
+    clock = FakeClock()
+    deadline = Deadline(1.0, clock=clock).enter("authorize")
+    clock.now += 2.0
+    with pytest.raises(AgentPayError) as raised:
+        deadline.enter("merchant")
+    assert raised.value.details["phase"] == "merchant"
+
+
+def test_sleep_past_the_deadline_raises():
+    deadline = Deadline(0.05)
+    with pytest.raises(AgentPayError) as raised:
+        deadline.sleep(1.0)
+    assert raised.value.code == "DEADLINE_EXCEEDED"
+
+
+def test_slow_response_fails_with_deadline_exceeded():
+    with FakeServer(latency=0.5, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=RetryPolicy(max_attempts=5))
+        try:
+            started = time.monotonic()
+            with pytest.raises(AgentPayError) as raised:
+                client.request("GET", "/limits", deadline=0.2)
+            elapsed = time.monotonic() - started
+        finally:
+            client.close()
+    assert raised.value.code == "DEADLINE_EXCEEDED"
+    assert elapsed < 0.45
+
+
+def test_retries_stop_at_the_deadline():
+    policy = RetryPolicy(max_attempts=100, backoff_base=0.05, backoff_max=0.05)
+    with FakeServer(error_rate=1.0, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=policy, breaker=False)
+        try:
+            started = time.monotonic()
+            response = client.request("GET", "/limits", deadline=0.3)
+            elapsed = time.monotonic() - started
+        finally:
+            client.close()
+    assert response.status_code == 503
+    assert elapsed < 0.4
+    assert 1 < server.calls["injected_errors"] < 100
+
+
+def test_async_request_with_spent_budget_is_never_sent(server):
+    aio = pytest.importorskip("agentpay.aio")
+    
+    async def run():
+        clock = FakeClock()
+        deadline = Deadline(1.0, clock=clock)
+        clock.now += 0.5
+        async with aio.AsyncClient(token="agent_test", base_url=server.url) as client:
+            # Bounded (not yet expired) budgets still go through
+            assert (await client.request("GET", "/limits", deadline=deadline)).status_code == 200
+            clock.now += 0.5
+            await client.request("GET", "/limits", deadline=deadline)
+    
+    with pytest.raises(AgentPayError) as raised:
+        asyncio.run(run())
+    assert raised.value.code == "DEADLINE_EXCEEDED"
+    assert server.calls["limits"] == 1
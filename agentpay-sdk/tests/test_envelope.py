@@ -0,0 +1,168 @@
+"""Spending envelopes: holds, over-charges, release on failure, TTL expiry and concurrent draws"""
+
+import threading
+
+import pytest
+
+from agentpay.envelope import EnvelopeManager, SpendingEnvelope
+from agentpay.errors import AgentPayError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def envelope(clock):
+    return SpendingEnvelope("auth_1", "st_1", budget=50.0, ttl=60.0, clock=clock)
+
+
+def test_commit_turns_the_hold_into_spend(envelope):
+    reservation = envelope.reserve(20.0)
+    assert envelope.held == 20.0 and envelope.remaining == 30.0
+    
+    reservation.commit(18.5)
+    
+    assert envelope.held == 0.0 and envelope.spent == 18.5
+    assert envelope.remaining == pytest.approx(31.5)
+
+
+def test_commit_rejects_a_charge_above_the_hold(envelope):
+    reservation = envelope.reserve(20.0)
+    
+    with pytest.raises(AgentPayError) as raised:
+        reservation.commit(21.0)
+    
+    assert raised.value.code == "AMOUNT_EXCEEDS_RESERVATION"
+    assert raised.value.details["reserved_amount"] == 20.0
+    # Nothing was booked and the hold can still be released
+    assert envelope.spent == 0.0 and envelope.held == 20.0
+    reservation.release()
+    assert envelope.remaining == 50.0
+
+
+def test_cover_draws_extra_fees_from_the_envelope(envelope):
+    reservation = envelope.reserve(20.0)
+    
+    reservation.cover(21.75)
+    reservation.commit(21.75)
+    
+    assert envelope.spent == 21.75 and envelope.held == 0.0
+
+
+def test_cover_fails_when_the_envelope_cannot_pay_the_difference(envelope):
+    first = envelope.reserve(20.0)
+    envelope.reserve(29.0)
+    
+    with pytest.raises(AgentPayError) as raised:
+        first.cover(22.0)
+    
+    assert raised.value.code == "AMOUNT_EXCEEDS_RESERVATION"
+    assert first.amount == 20.0 and envelope.held == 49.0
+
+
+def test_a_failed_purchase_releases_its_hold(envelope):
+    def purchase():
+        reservation = envelope.reserve(30.0)
+        try:
+            raise AgentPayError("Merchant down", code="NETWORK_ERROR")
+        finally:
+            reservation.release()
+    
+    with pytest.raises(AgentPayError):
+        purchase()
+    assert envelope.remaining == 50.0 and envelope.spent == 0.0
+
+
+def test_a_reservation_settles_only_once(envelope):
+    reservation = envelope.reserve(10.0)
+    reservation.commit()
+    reservation.release()
+    reservation.commit()
+    
+    assert envelope.spent == 10.0 and envelope.held == 0.0
+
+
+def test_an_expired_envelope_refuses_new_draws(clock, envelope):
+    assert envelope.reserve(5.0) is not None
+    
+    clock.now += 60.0
+    
+    assert envelope.expired()
+    assert envelope.reserve(5.0) is None
+
+
+def test_the_manager_stops_drawing_within_the_renew_margin(clock):
+    envelopes = EnvelopeManager(budget=50.0, ttl=60.0, renew_margin=5.0, clock=clock)
+    envelopes.open("shop.com", "food", {"authorizationId": "auth_1", "scopedToken": "st_1"})
+    
+    assert envelopes.reserve("shop.com", "food", 10.0).authorization_id == "auth_1"
+    assert envelopes.reserve("shop.com", "travel", 10.0) is None
+    clock.now += 56.0
+    assert envelopes.reserve("shop.com", "food", 10.0) is None
+
+
+def _together(count, fn):
+    barrier = threading.Barrier(count)
+    
+    def run():
+        barrier.wait()
+        fn()
+    
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_reservations_never_exceed_the_budget(envelope):
+    granted = []
+    _together(20, lambda: granted.append(envelope.reserve(4.0)))
+    
+    reservations = [reservation for reservation in granted if reservation is not None]
+    assert len(reservations) == 12
+    assert envelope.held == pytest.approx(48.0)
+    
+    refused = []
+    
+    def cover():
+        reservation = reservations.pop()
+        try:
+            reservation.cover(5.0)
+        except AgentPayError:
+            refused.append(reservation)
+    
+    _together(12, cover)
+    
+    # Only two of the twelve extra dollars fit in the envelope
+    assert len(refused) == 10
+    assert envelope.held == pytest.approx(50.0)
+
+
+def test_an_envelope_opened_from_a_real_authorization_captures_partially(server, client):
+    envelopes = EnvelopeManager(budget=40.0)
+    auth_response = client.request(
+        "POST", "/v1/authorize", json={"agentToken": client.token, "amount": envelopes.budget, "merchant": "shop.com"}
+    ).json()
+    envelope = envelopes.open("shop.com", "food", auth_response)
+    
+    for amount in (15.0, 12.5):
+        reservation = envelopes.reserve("shop.com", "food", amount)
+        confirmed = client.request(
+            "POST", f"/v1/authorize/{reservation.authorization_id}/confirm", json={"finalAmount": amount}
+        )
+        assert confirmed.json()["success"]
+        reservation.commit(amount)
+    
+    assert envelope.spent == server.daily_spent == pytest.approx(27.5)
+    assert envelopes.reserve("shop.com", "food", 15.0) is None
@@ -0,0 +1,205 @@
+"""Event log: background delivery, flush under concurrent emitters, dropping when full, and the sinks"""
+
+import io
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentpay.events import ConsoleSink, EventLog, JSONLinesSink, RingBufferSink
+from agentpay.profile import Profiler
+
+
+@pytest.fixture
+def preemptive():
+    """Switch threads far more often than usual, so races in emit() show up"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+class Recorder:
+    """Sink remembering every event it was given, in delivery order"""
+    
+    def __init__(self):
+        self.events = []
+        self.batches = 0
+    
+    def __call__(self, events):
+        self.batches += 1
+        self.events.extend(events)
+
+
+def test_emit_is_a_no_op_without_sinks():
+    log = EventLog()
+    log.emit("purchase.started", amount=5.0)
+    
+    assert log._thread is None and not log._queue
+    assert log.flush(timeout=0.1)
+
+
+def test_events_reach_every_sink_in_batches():
+    recorder = Recorder()
+    recent = RingBufferSink(3)
+    log = EventLog([recorder, recent])
+    try:
+        for n in range(10):
+            log.emit("purchase.confirmed" if n % 2 else "purchase.authorized", n=n)
+        assert log.flush(timeout=2.0)
+    finally:
+        log.close()
+    
+    assert [event.fields["n"] for event in recorder.events] == list(range(10))
+    assert [event.seq for event in recorder.events] == list(range(1, 11))
+    assert recorder.batches < 10
+    assert [event.fields["n"] for event in recent.events()] == [7, 8, 9]
+    assert [event.fields["n"] for event in recent.events(kind="purchase.authorized")] == [8]
+    assert recorder.events[0].to_dict() == {"event": "purchase.authorized", "ts": recorder.events[0].time, "n": 0}
+
+
+def test_flush_waits_for_every_event_emitted_before_it_across_threads(preemptive):
+    recorder = Recorder()
+    log = EventLog([recorder], flush_interval=0.001)
+    missing = []
+    
+    def emitter(worker):
+        for n in range(300):
+            log.emit("tick", worker=worker, n=n)
+            if n % 10 == 0:
+                assert log.flush(timeout=5.0)
+                # Everything this thread emitted so far has been delivered
+                delivered = {(e.fields["worker"], e.fields["n"]) for e in list(recorder.events)}
+                missing.extend((worker, m) for m in range(n + 1) if (worker, m) not in delivered)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(emitter, range(8)))
+        assert log.flush(timeout=5.0)
+    finally:
+        log.close()
+    
+    assert missing == []
+    assert log.dropped == 0
+    # The queue is kept in sequence order, so sinks see it in order too
+    assert [event.seq for event in recorder.events] == list(range(1, 2401))
+
+
+def test_a_full_queue_drops_and_counts_the_oldest_events(preemptive):
+    recorder = Recorder()
+    # The writer won't wake on its own before flush()
+    log = EventLog([recorder], max_queue=50, flush_interval=60.0)
+    try:
+        threads = [
+            threading.Thread(target=lambda: [log.emit("tick") for _ in range(1000)])
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert log.flush(timeout=2.0)
+    finally:
+        log.close()
+    
+    assert log.dropped == 8000 - 50
+    assert [event.seq for event in recorder.events] == list(range(7951, 8001))
+
+
+def test_a_failing_sink_only_loses_its_own_events():
+    def broken(events):
+        raise IOError("disk full")
+    
+    recorder = Recorder()
+    log = EventLog([broken, recorder])
+    try:
+        log.emit("purchase.confirmed")
+        assert log.flush(timeout=2.0)
+    finally:
+        log.close()
+    
+    assert log.errors == 1
+    assert len(recorder.events) == 1
+
+
+def test_sinks_can_come_and_go():
+    first, second = Recorder(), Recorder()
+    log = EventLog([first])
+    try:
+        log.add_sink(second)
+        log.emit("one")
+        assert log.flush(timeout=2.0)
+        log.remove_sink(first)
+        log.emit("two")
+        assert log.flush(timeout=2.0)
+    finally:
+        log.close()
+    
+    assert [event.kind for event in first.events] == ["one"]
+    assert [event.kind for event in second.events] == ["one", "two"]
+
+
+def test_close_delivers_what_is_queued_and_ignores_later_events():
+    recorder = Recorder()
+    log = EventLog([recorder], flush_interval=60.0)
+    for n in range(5):
+        log.emit("tick", n=n)
+    
+    log.close()
+    log.emit("late")
+    
+    assert [event.fields.get("n") for event in recorder.events] == list(range(5))
+    assert not log._thread.is_alive()
+
+
+def test_json_lines_and_console_sinks_render_each_event(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    text = io.StringIO()
+    console = io.StringIO()
+    file_sink = JSONLinesSink(path)
+    log = EventLog([file_sink, JSONLinesSink(text), ConsoleSink(console)])
+    try:
+        log.emit("purchase.confirmed", amount=12.5, merchant="uber.com")
+        log.emit("purchase.failed", error="declined")
+        assert log.flush(timeout=2.0)
+    finally:
+        log.close()
+        file_sink.close()
+    
+    with open(path) as stream:
+        written = [json.loads(line) for line in stream]
+    assert [line["event"] for line in written] == ["purchase.confirmed", "purchase.failed"]
+    assert written[0]["amount"] == 12.5 and "ts" in written[0]
+    assert [json.loads(line) for line in text.getvalue().splitlines()] == written
+    assert console.getvalue() == "purchase.confirmed amount=12.5 merchant=uber.com\npurchase.failed error=declined\n"
+
+
+def test_purchases_against_the_fake_server_are_logged_from_many_threads(server, client, tmp_path):
+    path = str(tmp_path / "purchases.jsonl")
+    sink = JSONLinesSink(path)
+    log = EventLog([sink])
+    # Per-request timings go to the log too, as the profiler sees them
+    client.profiler = Profiler(callback=lambda record: log.emit("request", endpoint=record.endpoint,
+                                                                  status=record.status), keep=0)
+    
+    def purchase(n):
+        result = client.pay("gift-card", float(n + 1), {"brand": "amazon"})
+        log.emit("purchase.confirmed", transaction_id=result.transaction_id, amount=result.amount)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(purchase, range(20)))
+        assert log.flush(timeout=5.0)
+    finally:
+        log.close()
+        sink.close()
+    
+    with open(path) as stream:
+        events = [json.loads(line) for line in stream]
+    confirmed = {event["transaction_id"]: event["amount"] for event in events if event["event"] == "purchase.confirmed"}
+    assert confirmed == {txn["id"]: txn["amount"] for txn in server.transactions}
+    requests = [event for event in events if event["event"] == "request"]
+    assert len(requests) == 20
+    assert {(event["endpoint"], event["status"]) for event in requests} == {("POST /v1/purchase-direct", 200)}
@@ -0,0 +1,165 @@
+"""PurchaseExecutor: shared budget holds and settlement, refusals, deferred charges, concurrency cap"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from agentpay.errors import AgentPayError
+from agentpay.executor import PurchaseExecutor, worker_index
+from agentpay.merchant import SimulatedMerchant
+from agentpay.models import PaymentResult
+
+# The process-pool worker's simulator, set by _init_simulator
+_merchant = None
+
+
+def _init_simulator(merchant):
+    global _merchant
+    _merchant = merchant.for_worker(worker_index())
+
+
+def _worker_seed(request):
+    time.sleep(0.05)
+    return os.getpid(), worker_index(), _merchant.seed
+
+
+def _pay(client):
+    def purchase(request):
+        return client.pay("gift-card", request["amount"])
+    return purchase
+
+
+def test_purchases_spend_what_the_server_charged(server, client):
+    with PurchaseExecutor(_pay(client), budget=100.0) as executor:
+        results = list(executor.map([{"amount": 10.0}, {"amount": 15.0}]))
+    
+    assert all(result.success for result in results)
+    assert executor.spent == pytest.approx(25.0)
+    assert executor.held == 0.0
+    assert executor.remaining == pytest.approx(75.0)
+    assert server.daily_spent == pytest.approx(25.0)
+
+
+def test_a_purchase_the_budget_cannot_cover_is_never_started(server, client):
+    with PurchaseExecutor(_pay(client), budget=25.0) as executor:
+        results = list(executor.map([{"amount": 20.0}, {"amount": 10.0}]))
+    
+    assert results[0].success
+    assert isinstance(results[1], AgentPayError) and results[1].code == "BUDGET_EXCEEDED"
+    assert results[1].details["remaining_budget"] == pytest.approx(5.0)
+    assert server.calls["purchase"] == 1
+
+
+def test_holds_count_against_the_budget_while_in_flight():
+    release = threading.Event()
+    executor = PurchaseExecutor(lambda request: release.wait(5.0), budget=30.0)
+    
+    first = executor.submit({"amount": 20.0})
+    refused = executor.submit({"amount": 20.0})
+    
+    assert executor.held == 20.0 and executor.remaining == 10.0
+    assert refused.exception().code == "BUDGET_EXCEEDED"
+    release.set()
+    first.result()
+    executor.shutdown()
+    assert executor.spent == 20.0 and executor.held == 0.0
+
+
+def test_failed_and_refused_purchases_release_their_hold(server, client):
+    def purchase(request):
+        if request.get("crash"):
+            raise AgentPayError("Merchant down", code="NETWORK_ERROR")
+        return client.pay("gift-card", request["amount"])
+    
+    server.approval_threshold = 50.0
+    with PurchaseExecutor(purchase, budget=100.0) as executor:
+        crashed = executor.submit({"amount": 20.0, "crash": True})
+        refused = executor.submit({"amount": 60.0})
+        paid = executor.submit({"amount": 10.0})
+        with pytest.raises(AgentPayError):
+            crashed.result()
+        assert refused.result().error == "approval_required"
+        assert paid.result().success
+    
+    assert executor.spent == pytest.approx(10.0)
+    assert executor.held == 0.0
+
+
+def test_an_unsuccessful_payment_result_charges_nothing():
+    with PurchaseExecutor(lambda request: PaymentResult(success=False, error="DENIED"), budget=50.0) as executor:
+        assert not executor.submit({"amount": 40.0}).result().success
+    
+    assert executor.spent == 0.0 and executor.remaining == 50.0
+
+
+def test_a_deferred_charge_holds_until_it_resolves():
+    confirmations = []
+    
+    def charged(result, held):
+        confirmation = Future()
+        confirmations.append(confirmation)
+        return confirmation
+    
+    with PurchaseExecutor(lambda request: "done", budget=50.0, charged=charged) as executor:
+        executor.submit({"amount": 20.0}).result()
+        executor.submit({"amount": 20.0}).result()
+        assert executor.held == 40.0
+        
+        confirmations[0].set_result(12.5)
+        confirmations[1].set_exception(RuntimeError("confirm lost"))
+    
+    # A failed confirmation keeps what it held: the charge may have landed
+    assert executor.held == 0.0
+    assert executor.spent == pytest.approx(32.5)
+
+
+def test_submitting_after_shutdown_raises_without_holding():
+    executor = PurchaseExecutor(lambda request: None, budget=10.0)
+    executor.shutdown()
+    
+    with pytest.raises(RuntimeError):
+        executor.submit({"amount": 5.0})
+    assert executor.held == 0.0 and executor.pending() == 0
+
+
+def test_max_concurrency_caps_purchases_in_flight():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+    
+    def purchase(request):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+    
+    with PurchaseExecutor(purchase, max_concurrency=3) as executor:
+        list(executor.map({"amount": 1.0} for _ in range(12)))
+    
+    assert peak[0] == 3
+    assert executor.remaining is None
+
+
+def test_max_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        PurchaseExecutor(lambda request: None, max_concurrency=0)
+
+
+def test_process_workers_are_numbered_and_seed_their_own_simulator():
+    merchant = SimulatedMerchant(seed=7)
+    with PurchaseExecutor(
+        _worker_seed, max_concurrency=2, processes=True, initializer=_init_simulator, initargs=(merchant,)
+    ) as executor:
+        results = set(executor.map({"amount": 1.0} for _ in range(8)))
+    
+    assert worker_index() is None
+    workers = {pid: index for pid, index, _ in results}
+    assert set(workers.values()) <= {0, 1}
+    assert len(set(workers.values())) == len(workers)
+    for _, index, seed in results:
+        assert seed == merchant.for_worker(index).seed != merchant.seed
@@ -0,0 +1,134 @@
+"""Transaction history iterator: paging, background prefetch, de-duplication of shifted entries and filters"""
+
+import itertools
+import time
+from datetime import datetime
+
+import pytest
+
+from agentpay.errors import AgentPayError
+from agentpay.history import Transaction
+
+START = 1700000000
+
+
+def _seed(server, count, **metadata):
+    """Seed count transactions, one a minute; returns their ids newest first"""
+    ids = [server.add_transaction(float(n + 1), metadata=dict(metadata), created=START + n * 60)["id"]
+           for n in range(count)]
+    return ids[::-1]
+
+
+def _wait_for(condition, timeout=2.0):
+    stop = time.monotonic() + timeout
+    while not condition() and time.monotonic() < stop:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_every_page_is_walked_newest_first(server, client):
+    ids = _seed(server, 25)
+    
+    transactions = list(client.transactions(page_size=10))
+    
+    assert [txn.id for txn in transactions] == ids
+    assert all(isinstance(txn, Transaction) for txn in transactions)
+    assert transactions[0].created_at.timestamp() == START + 24 * 60
+    assert server.calls["transactions"] == 3
+
+
+def test_the_next_page_is_fetched_while_the_current_one_is_consumed(server, client):
+    _seed(server, 12)
+    
+    walk = client.transactions(page_size=5)
+    next(walk)
+    # Still on the first page, but the second is already on its way
+    assert _wait_for(lambda: server.calls["transactions"] == 2)
+    assert not _wait_for(lambda: server.calls["transactions"] > 2, timeout=0.1)
+    
+    assert len(list(walk)) == 11
+    assert server.calls["transactions"] == 3
+
+
+def test_without_prefetch_pages_are_fetched_on_demand(server, client):
+    _seed(server, 12)
+    
+    walk = client.transactions(page_size=5, prefetch=False)
+    first_page = list(itertools.islice(walk, 5))
+    
+    time.sleep(0.05)
+    assert len(first_page) == 5 and server.calls["transactions"] == 1
+    next(walk)
+    assert server.calls["transactions"] == 2
+
+
+def test_stopping_early_cancels_the_walk(server, client):
+    _seed(server, 30)
+    
+    walk = client.transactions(page_size=5)
+    assert len(list(itertools.islice(walk, 3))) == 3
+    walk.close()
+    
+    time.sleep(0.05)
+    assert server.calls["transactions"] <= 2
+
+
+def test_entries_pushed_onto_the_next_page_are_yielded_once(server, client):
+    ids = _seed(server, 12)
+    
+    walk = client.transactions(page_size=5, prefetch=False)
+    seen = [txn.id for txn in itertools.islice(walk, 5)]
+    # Two new purchases push the last two of the first page onto the second
+    server.add_transaction(1.0, created=START + 3600)
+    server.add_transaction(2.0, created=START + 3660)
+    seen += [txn.id for txn in walk]
+    
+    assert seen == ids
+
+
+def test_filters_run_on_the_server_and_on_each_page(server, client):
+    _seed(server, 6, merchant="DoorDash.com", category="food")
+    _seed(server, 6, service="amazon.com", category="shopping")
+    server.add_transaction(99.0, metadata={"merchant": "doordash.com"}, created=START + 30, status="pending")
+    
+    food = list(client.transactions(merchant="doordash.com", category="FOOD", page_size=4))
+    assert len(food) == 6
+    assert {txn.merchant for txn in food} == {"DoorDash.com"}
+    
+    pending = list(client.transactions(status="pending"))
+    assert [txn.amount for txn in pending] == [99.0]
+    
+    window = list(client.transactions(since=START + 60, until=START + 180, merchant="amazon.com"))
+    assert [txn.created for txn in window] == [START + 180, START + 120, START + 60]
+    
+    large = list(client.transactions(where=lambda txn: txn.amount >= 5.0))
+    assert sorted(txn.amount for txn in large) == [5.0, 5.0, 6.0, 6.0, 99.0]
+
+
+def test_time_bounds_accept_datetimes_strings_and_unix_seconds(server, client):
+    _seed(server, 3)
+    
+    assert len(list(client.transactions(since="2023-11-14T22:14:00Z"))) == 2
+    # Naive datetimes are UTC
+    assert len(list(client.transactions(since=datetime(2023, 11, 14, 22, 14)))) == 2
+    assert len(list(client.transactions(until=START))) == 1
+    with pytest.raises(ValueError):
+        list(client.transactions(since="last tuesday"))
+
+
+def test_a_failing_page_raises_after_the_pages_before_it(server, client):
+    _seed(server, 8)
+    
+    walk = client.transactions(page_size=5, prefetch=False)
+    assert len(list(itertools.islice(walk, 5))) == 5
+    server.error_rate = 1.0
+    
+    with pytest.raises(AgentPayError) as raised:
+        next(walk)
+    assert raised.value.details["status"] == 503
+
+
+def test_page_size_is_bounded(client):
+    for page_size in (0, 1001):
+        with pytest.raises(ValueError):
+            next(client.transactions(page_size=page_size))
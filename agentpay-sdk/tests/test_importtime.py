@@ -0,0 +1,31 @@
+"""Import-time budget: `import agentpay` stays light and fast (see benchmarks/importtime.py)"""
+
+import importlib.util
+import os
+
+from conftest import SDK_ROOT
+
+
+def _importtime():
+    path = os.path.join(SDK_ROOT, "benchmarks", "importtime.py")
+    spec = importlib.util.spec_from_file_location("agentpay_importtime", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+importtime = _importtime()
+
+
+def test_import_loads_no_heavy_modules():
+    _, modules = importtime.measure()
+    leaked = sorted(name for name in modules if name in importtime.FORBIDDEN)
+    assert not leaked, f"import agentpay loaded {', '.join(leaked)}"
+
+
+def test_import_time_within_budget():
+    # Best of several fresh interpreters, as the benchmark script reports it
+    best = min(importtime.measure()[0] for _ in range(importtime.DEFAULT_RUNS))
+    assert best <= importtime.DEFAULT_BUDGET_MS, (
+        f"import agentpay took {best:.1f} ms, over the {importtime.DEFAULT_BUDGET_MS:.0f} ms budget"
+    )
@@ -0,0 +1,158 @@
+"""SQLite ledger: incremental sync against the fake server, pending local purchases and spending queries"""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.history import Transaction
+from agentpay.ledger import Ledger, period_start
+
+START = 1700000000
+
+
+@pytest.fixture
+def ledger(client):
+    with Ledger(":memory:", client=client) as ledger:
+        yield ledger
+
+
+def _seed(server, count, created=START, **metadata):
+    return [server.add_transaction(float(n + 1), metadata=dict(metadata), created=created + n * 60)
+            for n in range(count)]
+
+
+def test_sync_fetches_the_history_then_only_what_is_new(server, ledger):
+    _seed(server, 5, merchant="doordash.com", category="food")
+    
+    assert ledger.sync() == 5
+    assert ledger.cursor == START + 240
+    assert ledger.last_synced is not None
+    
+    _seed(server, 2, created=START + 600, merchant="amazon.com")
+    # The walk restarts at the newest second already stored, so that row comes again
+    assert ledger.sync() == 3
+    assert ledger.cursor == START + 660
+    assert ledger.totals(status=None) == (18.0, 7)
+
+
+def test_a_recent_sync_is_skipped(server, ledger):
+    _seed(server, 2)
+    ledger.sync()
+    calls = server.calls["transactions"]
+    
+    assert ledger.sync(max_age=60) == 0
+    assert server.calls["transactions"] == calls
+
+
+def test_a_full_sync_picks_up_status_changes(server, ledger):
+    refunded = _seed(server, 3)[0]
+    ledger.sync()
+    assert ledger.spent() == 6.0
+    
+    refunded["status"] = "refunded"
+    ledger.sync()
+    assert ledger.spent() == 6.0
+    
+    assert ledger.sync(full=True) == 3
+    assert ledger.spent() == 5.0
+    assert [txn.status for txn in ledger.query(status="refunded")] == ["refunded"]
+
+
+def test_a_recorded_purchase_counts_until_the_server_copy_replaces_it(server, ledger):
+    confirmed = server.add_transaction(12.5, metadata={"merchant": "uber.com"}, created=START)
+    
+    ledger.record_purchase(confirmed["id"], 12.5, "Uber.com", "travel", created=START)
+    assert ledger.spent(merchant="uber.com", category="travel") == 12.5
+    
+    ledger.sync()
+    assert ledger.totals(merchant="uber.com") == (12.5, 1)
+    # The server's copy, without the category only the local row knew
+    assert ledger.query()[0].category is None
+
+
+def test_sync_keeps_local_purchases_the_server_has_not_listed_yet(server, ledger):
+    _seed(server, 3)
+    newest = START + 120
+    ledger.record_purchase("txn_stale", 4.0, created=newest - 60)
+    ledger.record_purchase("txn_same_second", 5.0, created=newest)
+    ledger.record_purchase("txn_newer", 6.0, created=newest + 30)
+    
+    ledger.sync()
+    
+    ids = {txn.id for txn in ledger.query()}
+    # Older than what the server listed: it never landed
+    assert "txn_stale" not in ids
+    # At or after the newest server row: the next sync may still bring it
+    assert {"txn_same_second", "txn_newer"} <= ids
+    assert ledger.spent() == 6.0 + 5.0 + 6.0
+
+
+def test_queries_filter_and_order_locally(ledger):
+    ledger.record(Transaction("txn_1", 10.0, created=START, metadata={"merchant": "DoorDash.com", "category": "food"}))
+    ledger.record(Transaction("txn_2", 20.0, created=START + 60, agent_id="agent_a",
+                              metadata={"service": "amazon.com", "category": "shopping"}))
+    ledger.record(Transaction("txn_3", 30.0, status="completed", created=START + 120,
+                              metadata={"merchant": "doordash.com", "category": "Food"}))
+    ledger.record(Transaction("txn_4", 40.0, status="pending", created=START + 180))
+    
+    assert ledger.spent(merchant="doordash.com") == 30.0
+    assert ledger.totals(merchant="DOORDASH.COM", status=None) == (40.0, 2)
+    assert ledger.totals(category="food", status=None) == (40.0, 2)
+    assert ledger.totals(agent_id="agent_a", status=None) == (20.0, 1)
+    assert ledger.totals(since=START + 60, until=START + 120, status=None) == (50.0, 2)
+    assert ledger.totals(since="2023-11-14T22:15:00Z", status=None) == (70.0, 2)
+    
+    assert [txn.id for txn in ledger.query()] == ["txn_4", "txn_3", "txn_2", "txn_1"]
+    assert [txn.id for txn in ledger.query(limit=2, category="food")] == ["txn_3", "txn_1"]
+    assert ledger.query(agent_id="agent_a")[0].merchant == "amazon.com"
+
+
+def test_named_periods():
+    now = datetime(2025, 3, 10, 15, 30, tzinfo=timezone.utc).timestamp()
+    
+    assert period_start("today", now) == datetime(2025, 3, 10, tzinfo=timezone.utc)
+    assert period_start("7d", now) == datetime(2025, 3, 3, 15, 30, tzinfo=timezone.utc)
+    assert period_start("30d", now) == datetime(2025, 2, 8, 15, 30, tzinfo=timezone.utc)
+    assert period_start("all", now) is None
+    with pytest.raises(ValueError):
+        period_start("fortnight", now)
+
+
+def test_spending_since_today(ledger):
+    ledger.record_purchase("txn_today", 8.0)
+    ledger.record_purchase("txn_old", 9.0, created=START)
+    
+    assert ledger.spent(since="today") == 8.0
+    assert ledger.spent(since="all") == 17.0
+
+
+def test_a_ledger_file_survives_reopening(server, client, tmp_path):
+    _seed(server, 3)
+    path = str(tmp_path / "ledger" / "account.sqlite3")
+    with Ledger(path, client=client) as ledger:
+        ledger.sync()
+    
+    with Ledger(path, client=client) as ledger:
+        assert ledger.cursor == START + 120
+        assert ledger.spent() == 6.0
+
+
+def test_each_account_gets_its_own_default_file(server, tmp_path, monkeypatch):
+    monkeypatch.delenv("AGENTPAY_LEDGER", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    first = Client(token="agent_one", base_url=server.url)
+    second = Client(token="agent_two", base_url=server.url)
+    try:
+        with Ledger(client=first) as one, Ledger(client=second) as two, Ledger(client=first) as again:
+            assert one.path != two.path
+            assert one.path == again.path
+            assert os.path.dirname(one.path) == str(tmp_path / ".agentpay")
+        
+        monkeypatch.setenv("AGENTPAY_LEDGER", str(tmp_path / "shared.sqlite3"))
+        with Ledger(client=first) as shared:
+            assert shared.path == str(tmp_path / "shared.sqlite3")
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,103 @@
+"""LimitsCache: TTL reads, shared fetches, local spend and generation-based invalidation"""
+
+import threading
+import time
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.errors import AgentPayError
+from agentpay.limitscache import SpendingLimits
+from agentpay.retry import NO_RETRY
+from agentpay.testing import FakeServer
+
+
+def _slow_limits_server():
+    return FakeServer(latency={"limits": 0.2, "default": 0.0})
+
+
+def test_reads_within_the_ttl_are_served_from_the_cache(server, client):
+    first = client.limits()
+    assert client.limits() is first
+    assert server.calls["limits"] == 1
+    
+    client.limits(max_age=0)
+    client.limits(refresh=True)
+    assert server.calls["limits"] == 3
+
+
+def test_concurrent_readers_share_one_request():
+    with _slow_limits_server() as server, Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(client.limits())) for _ in range(8)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+    
+    assert server.calls["limits"] == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+
+
+def test_recorded_spend_is_subtracted_until_the_next_fetch(server, client):
+    assert client.limits().remaining_daily == 1000.0
+    
+    client.limits_cache().record_spend(12.5)
+    
+    cached = client.limits()
+    assert cached.remaining_daily == 987.5 and cached.daily_spent == 12.5
+    assert server.calls["limits"] == 1
+
+
+def test_pay_updates_the_cache_and_failures_drop_it(server, client):
+    client.limits()
+    client.pay("gift-card", 25.0)
+    assert client.limits_cache().peek().remaining_daily == 975.0
+    
+    server.error_rate = 1.0
+    client.pay("gift-card", 25.0)
+    assert client.limits_cache().peek() is None
+
+
+def test_a_fetch_overtaken_by_spend_is_returned_but_not_cached():
+    with _slow_limits_server() as server, Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+        cache = client.limits_cache()
+        reader = threading.Thread(target=cache.get)
+        reader.start()
+        while not server.calls["limits"] and reader.is_alive():
+            time.sleep(0.01)
+        # The server may or may not have counted this spend in its answer
+        cache.record_spend(5.0)
+        reader.join()
+        
+        assert cache.peek() is None
+        cache.get()
+        assert cache.peek() is not None
+
+
+def test_invalidate_forces_a_refetch(server, client):
+    client.limits()
+    client.limits_cache().invalidate()
+    
+    assert client.limits_cache().peek() is None
+    client.limits()
+    assert server.calls["limits"] == 2
+
+
+def test_fetch_errors_reach_the_caller_and_are_not_cached(server, client):
+    server.error_rate = 1.0
+    with pytest.raises(AgentPayError) as raised:
+        client.limits()
+    assert raised.value.code == "SERVICE_UNAVAILABLE"
+    
+    server.error_rate = 0.0
+    assert client.limits().daily_limit == 1000.0
+
+
+def test_spending_limits_allows_respects_both_limits():
+    limits = SpendingLimits(daily_limit=100.0, per_transaction=50.0, daily_spent=70.0, remaining_daily=30.0)
+    
+    assert limits.allows(30.0)
+    assert not limits.allows(31.0)
+    assert not SpendingLimits(daily_limit=None, per_transaction=50.0).allows(60.0)
+    assert limits.daily_percentage == 70.0
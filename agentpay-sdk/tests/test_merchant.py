@@ -0,0 +1,165 @@
+"""Merchant backends: the MerchantExecutor interface, VirtualClock and the seeded simulator"""
+
+import asyncio
+import pickle
+import time
+
+import pytest
+
+from agentpay.deadline import Deadline
+from agentpay.errors import AgentPayError
+from agentpay.merchant import (
+    MerchantExecutor,
+    MerchantProfile,
+    SimulatedMerchant,
+    VirtualClock,
+    order_completed,
+)
+
+PROFILES = {
+    "shop.com": MerchantProfile(latency=(1.0, 3.0), failure_rate=0.2, surcharge=(-0.5, 2.0)),
+    "default": MerchantProfile(latency=0.5),
+}
+
+
+def _run(merchant, count=50):
+    return [merchant.execute("shop.com", 20.0, f"auth_{n}", "lunch") for n in range(count)]
+
+
+def test_merchant_executor_requires_execute():
+    with pytest.raises(TypeError):
+        MerchantExecutor()
+
+
+def test_a_subclass_without_execute_cannot_be_instantiated():
+    class Unfinished(MerchantExecutor):
+        pass
+    
+    with pytest.raises(TypeError):
+        Unfinished()
+
+
+def test_a_subclass_gets_aexecute_for_free():
+    class Instant(MerchantExecutor):
+        def execute(self, merchant, amount, authorization_id, intent, *, scoped_token=None, deadline=None):
+            return order_completed(merchant, "ORDER_1", amount, authorization_id, [intent])
+    
+    order = asyncio.run(Instant().aexecute("shop.com", 12.0, "auth_1", "lunch"))
+    assert order["success"] and order["amount_charged"] == 12.0
+    assert order["transaction_details"]["authorization_id"] == "auth_1"
+
+
+def test_virtual_clock_only_moves_forward_when_told():
+    clock = VirtualClock(start=1000.0)
+    
+    assert clock.advance(2.5) == 1002.5
+    clock.advance(-10.0)
+    assert clock.now() == 1002.5 and clock.elapsed == 2.5
+    
+    copy = pickle.loads(pickle.dumps(clock))
+    assert copy.now() == 1002.5 and copy.start == 1000.0
+
+
+def test_simulated_latency_advances_the_virtual_clock_without_sleeping():
+    clock = VirtualClock(start=1000.0)
+    merchant = SimulatedMerchant({"default": MerchantProfile(latency=2.0)}, seed=1, clock=clock)
+    
+    started = time.monotonic()
+    for n in range(1000):
+        merchant.execute("slow.com", 5.0, f"auth_{n}", "lunch")
+    
+    assert time.monotonic() - started < 1.0
+    assert clock.elapsed == pytest.approx(2000.0)
+    stats = merchant.summary()["slow.com"]
+    assert stats["count"] == 1000 and stats["p99"] == 2.0
+
+
+def test_the_same_seed_replays_the_same_orders():
+    first = _run(SimulatedMerchant(PROFILES, seed=7, clock=VirtualClock(start=1000.0)))
+    second = _run(SimulatedMerchant(PROFILES, seed=7, clock=VirtualClock(start=1000.0)))
+    other = _run(SimulatedMerchant(PROFILES, seed=8, clock=VirtualClock(start=1000.0)))
+    
+    assert first == second
+    assert first != other
+    assert any(not order["success"] for order in first)
+
+
+def test_reset_restarts_the_random_sequence():
+    merchant = SimulatedMerchant(PROFILES, seed=3, clock=VirtualClock(start=1000.0))
+    first = [order.get("amount_charged") for order in _run(merchant, 10)]
+    
+    merchant.reset()
+    
+    assert [order.get("amount_charged") for order in _run(merchant, 10)] == first
+    assert merchant.summary()["shop.com"]["count"] == 10
+
+
+def test_charges_include_surcharges_but_never_drop_below_the_authorization():
+    orders = _run(SimulatedMerchant(PROFILES, seed=5, clock=VirtualClock()), 200)
+    
+    charges = [order["amount_charged"] for order in orders if order["success"]]
+    assert min(charges) >= 20.0
+    assert max(charges) > 20.0
+
+
+def test_a_virtual_order_past_the_deadline_fails_with_the_time_it_used():
+    clock = VirtualClock(start=1000.0)
+    merchant = SimulatedMerchant({"default": MerchantProfile(latency=30.0)}, seed=1, clock=clock)
+    deadline = Deadline(5.0)
+    deadline.enter("merchant")
+    
+    with pytest.raises(AgentPayError) as raised:
+        merchant.execute("slow.com", 5.0, "auth_1", "lunch", deadline=deadline)
+    
+    assert raised.value.code == "DEADLINE_EXCEEDED"
+    assert raised.value.details["phase"] == "merchant"
+    assert clock.elapsed <= 5.0
+    # Virtual time never spends the real budget
+    assert deadline.remaining() > 4.0
+    assert merchant.summary()["slow.com"]["failures"] == 1
+
+
+def test_without_a_virtual_clock_latency_is_real_and_bounded_by_the_deadline():
+    merchant = SimulatedMerchant({"default": MerchantProfile(latency=5.0)}, seed=1)
+    
+    started = time.monotonic()
+    with pytest.raises(AgentPayError):
+        merchant.execute("slow.com", 5.0, "auth_1", "lunch", deadline=Deadline(0.1))
+    assert time.monotonic() - started < 1.0
+
+
+def test_a_pickled_simulator_keeps_its_settings():
+    merchant = SimulatedMerchant(PROFILES, seed=7, clock=VirtualClock(start=1000.0))
+    copy = pickle.loads(pickle.dumps(merchant))
+    
+    assert _run(copy, 10) == _run(merchant, 10)
+
+
+def test_each_worker_copy_draws_its_own_reproducible_sequence():
+    merchant = SimulatedMerchant(PROFILES, seed=7, clock=VirtualClock(start=1000.0))
+    
+    def draws(copy):
+        return [(order.get("amount_charged"), order.get("error")) for order in _run(copy, 10)]
+    
+    workers = [draws(merchant.for_worker(index)) for index in range(3)]
+    
+    assert workers[0] != workers[1] != workers[2] != workers[0]
+    assert draws(merchant.for_worker(1)) == workers[1]
+    assert merchant.for_worker(0).seed != SimulatedMerchant(PROFILES, seed=8).for_worker(0).seed
+    assert SimulatedMerchant(seed=None).for_worker(2).seed is None
+
+
+def test_simulated_orders_confirm_against_the_fake_server(server, client):
+    merchant = SimulatedMerchant({"default": MerchantProfile(latency=1.0)}, seed=1, clock=VirtualClock())
+    authorization = client.request(
+        "POST", "/v1/authorize", json={"agentToken": client.token, "amount": 20.0, "merchant": "shop.com"}
+    ).json()
+    
+    order = merchant.execute("shop.com", 20.0, authorization["authorizationId"], "lunch")
+    confirmed = client.request(
+        "POST", f"/v1/authorize/{authorization['authorizationId']}/confirm",
+        json={"finalAmount": order["amount_charged"]}
+    )
+    
+    assert confirmed.json()["success"]
+    assert server.daily_spent == pytest.approx(20.0)
@@ -0,0 +1,97 @@
+"""PurchasePipeline: stage order, per-item failures, overlap and early exit"""
+
+import threading
+import time
+
+import pytest
+
+from agentpay.pipeline import PurchasePipeline, StageFailure
+
+
+def _recording_stage(name, log, lock, delay=0.0):
+    def stage(item):
+        if delay:
+            time.sleep(delay)
+        with lock:
+            log.append((name, item.index))
+        item.state[name] = item.request
+    return name, stage
+
+
+def test_items_pass_every_stage_in_order_and_come_out_in_input_order():
+    log, lock = [], threading.Lock()
+    pipeline = PurchasePipeline([_recording_stage(name, log, lock) for name in ("a", "b", "c")])
+    
+    items = list(pipeline.run(range(20)))
+    
+    assert [item.index for item in items] == list(range(20))
+    assert all(item.ok and item.state == {"a": i, "b": i, "c": i} for i, item in enumerate(items))
+    for index in range(20):
+        assert [name for name, i in log if i == index] == ["a", "b", "c"]
+
+
+def test_a_failing_item_skips_its_later_stages_only():
+    def authorize(item):
+        if item.request == 2:
+            raise StageFailure("denied")
+        item.state["authorized"] = True
+    
+    confirmed = []
+    pipeline = PurchasePipeline([("authorize", authorize), ("confirm", lambda item: confirmed.append(item.index))])
+    
+    items = list(pipeline.run(range(5)))
+    
+    assert confirmed == [0, 1, 3, 4]
+    failed = items[2]
+    assert not failed.ok
+    assert isinstance(failed.error, StageFailure)
+    assert failed.failed_stage == "authorize"
+
+
+def test_unexpected_exceptions_are_recorded_on_the_item():
+    def merchant(item):
+        raise RuntimeError("checkout crashed")
+    
+    (item,) = PurchasePipeline([("merchant", merchant)]).run(["x"])
+    assert isinstance(item.error, RuntimeError)
+    assert item.failed_stage == "merchant"
+
+
+def test_stages_overlap_across_items():
+    delay = 0.05
+    stages = [(name, lambda item: time.sleep(delay)) for name in ("a", "b", "c")]
+    
+    started = time.monotonic()
+    list(PurchasePipeline(stages).run(range(10)))
+    elapsed = time.monotonic() - started
+    
+    # Sequential would take 10 * 3 * delay; pipelined is about (10 + 2) * delay
+    assert elapsed < 10 * 3 * delay * 0.7
+
+
+def test_errors_from_the_input_iterable_reach_the_consumer():
+    def requests():
+        yield 1
+        raise ValueError("bad queue")
+    
+    with pytest.raises(ValueError, match="bad queue"):
+        list(PurchasePipeline([("a", lambda item: None)]).run(requests()))
+
+
+def test_stopping_early_lets_the_workers_exit():
+    pipeline = PurchasePipeline([("a", lambda item: None)], buffer=1)
+    before = threading.active_count()
+    
+    for item in pipeline.run(range(1000)):
+        if item.index == 3:
+            break
+    
+    deadline = time.monotonic() + 2.0
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() <= before
+
+
+def test_a_pipeline_needs_stages():
+    with pytest.raises(ValueError):
+        PurchasePipeline([])
@@ -0,0 +1,108 @@
+"""Pre-flight policy: local denials, cached server limits, and purchases that never leave the process"""
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.limitscache import SpendingLimits
+from agentpay.policy import Policy
+from agentpay.retry import NO_RETRY
+
+
+@pytest.fixture
+def policy_client(server):
+    """Factory for clients of the fake server with a given policy"""
+    clients = []
+    
+    def make(policy):
+        client = Client(token="agent_test", base_url=server.url, retry=NO_RETRY, policy=policy)
+        clients.append(client)
+        return client
+    
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_blocked_and_unlisted_categories_are_denied():
+    policy = Policy(blocked_categories={"Gambling"}, allowed_categories={"gift-card", "gambling"})
+    
+    assert policy.evaluate(5.0, category=" gambling ").code == "CATEGORY_BLOCKED"
+    assert policy.evaluate(5.0, category="travel").code == "CATEGORY_BLOCKED"
+    assert policy.evaluate(5.0, category="GIFT-CARD") is None
+
+
+def test_blocked_merchants_are_denied():
+    policy = Policy(blocked_merchants="casino.example")
+    
+    denial = policy.evaluate(5.0, merchant="Casino.Example")
+    assert denial.code == "MERCHANT_BLOCKED"
+    assert denial.details == {"merchant": "Casino.Example"}
+    assert policy.evaluate(5.0, merchant="shop.example") is None
+
+
+def test_the_stricter_per_transaction_limit_wins():
+    limits = SpendingLimits(daily_limit=1000.0, per_transaction=40.0, remaining_daily=1000.0)
+    
+    assert Policy(per_transaction=50.0).evaluate(45.0) is None
+    denial = Policy(per_transaction=50.0).evaluate(45.0, limits=limits)
+    assert denial.code == "TRANSACTION_LIMIT_EXCEEDED"
+    assert denial.details["transaction_limit"] == 40.0
+
+
+def test_daily_budget_uses_cached_limits_or_spent_today():
+    limits = SpendingLimits(daily_limit=100.0, per_transaction=None, daily_spent=80.0, remaining_daily=20.0)
+    
+    assert Policy().evaluate(25.0, limits=limits).code == "DAILY_LIMIT_EXCEEDED"
+    assert Policy(daily_limit=100.0).evaluate(25.0, spent_today=80.0).code == "DAILY_LIMIT_EXCEEDED"
+    assert Policy(daily_limit=100.0).evaluate(25.0) is None
+    assert Policy().evaluate(20.0, limits=limits) is None
+
+
+def test_envelope_switches_skip_the_matching_checks():
+    policy = Policy(per_transaction=50.0, daily_limit=100.0)
+    
+    assert policy.evaluate(80.0, spent_today=0.0, per_transaction=False) is None
+    assert policy.evaluate(40.0, spent_today=90.0, daily=False) is None
+    assert policy.evaluate(40.0, spent_today=90.0, per_transaction=False).code == "DAILY_LIMIT_EXCEEDED"
+
+
+def test_from_dict_accepts_camel_case():
+    policy = Policy.from_dict({"perTransaction": 25, "blockedCategories": ["gambling"], "dailyLimit": 200})
+    
+    assert policy.per_transaction == 25 and policy.daily_limit == 200
+    assert policy.blocked_categories == frozenset({"gambling"})
+
+
+def test_pay_denied_locally_sends_no_request(server, policy_client):
+    client = policy_client(Policy(per_transaction=50.0, blocked_categories={"gambling"}))
+    
+    blocked = client.pay("gambling", 10.0)
+    too_big = client.pay("gift-card", 75.0)
+    
+    assert blocked.error == "CATEGORY_BLOCKED" and blocked.details["preflight"]
+    assert too_big.error == "TRANSACTION_LIMIT_EXCEEDED"
+    assert sum(server.calls.values()) == 0
+
+
+def test_pay_uses_fresh_cached_server_limits(server, policy_client):
+    client = policy_client(Policy())
+    server.daily_spent = 990.0
+    
+    # Nothing cached yet: the server decides
+    assert client.preflight(20.0) is None
+    client.limits()
+    
+    result = client.pay("gift-card", 20.0)
+    assert result.error == "DAILY_LIMIT_EXCEEDED"
+    assert server.calls["purchase"] == 0
+
+
+def test_stale_limits_are_ignored(server):
+    with Client(token="agent_test", base_url=server.url, retry=NO_RETRY, policy=Policy(), limits_ttl=0.0) as client:
+        server.daily_spent = 990.0
+        client.limits()
+        assert client.preflight(20.0) is None
+
+
+def test_clients_without_a_policy_never_deny(client):
+    assert client.preflight(1e9, category="gambling") is None
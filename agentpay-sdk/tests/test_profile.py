@@ -0,0 +1,126 @@
+"""Latency profiler: phase records against the fake server, server-reported time, summaries and the CLI"""
+
+import json
+
+import pytest
+
+from agentpay.cli import main
+from agentpay.client import Client
+from agentpay.errors import AgentPayError
+from agentpay.profile import PHASES, Profiler, RequestProfile, server_time
+from agentpay.retry import NO_RETRY
+from agentpay.testing import FakeServer
+
+
+def _record(total, server=None, **fields):
+    return RequestProfile("GET", "GET /limits", 200, 1, total=total, server=server, **fields)
+
+
+def test_server_time_reads_every_reported_format():
+    assert server_time({"Server-Timing": "db;dur=12.5, app;dur=7.5"}, None) == pytest.approx(0.020)
+    assert server_time({"X-Response-Time": "40ms"}, None) == pytest.approx(0.040)
+    assert server_time({"X-Response-Time": " 8 "}, None) == pytest.approx(0.008)
+    assert server_time({}, {"latency": 250}) == pytest.approx(0.250)
+    # Headers win over the body
+    assert server_time({"Server-Timing": "app;dur=5"}, {"latency": 250}) == pytest.approx(0.005)
+
+
+def test_server_time_is_none_when_unreported_or_unparseable():
+    assert server_time({}, None) is None
+    assert server_time({"Server-Timing": "cache;desc=hit"}, [1, 2]) is None
+    assert server_time({"X-Response-Time": "fast"}, {"latency": "slow"}) is None
+
+
+def test_client_requests_are_broken_into_phases():
+    profiler = Profiler()
+    with FakeServer(latency=0.02, seed=1) as server:
+        client = Client(token="agent_test", base_url=server.url, retry=NO_RETRY, profiler=profiler)
+        try:
+            for _ in range(5):
+                assert client.request("GET", "/limits").status_code == 200
+        finally:
+            client.close()
+    
+    records = list(profiler.records)
+    assert len(records) == 5
+    assert [record.attempt for record in records] == [1] * 5
+    assert {record.endpoint for record in records} == {"GET /limits"}
+    # Only the first request opens a connection; the rest reuse it
+    assert [record.reused for record in records] == [False, True, True, True, True]
+    assert records[0].connect > 0.0 and records[1].connect == 0.0
+    for record in records:
+        assert record.server == pytest.approx(0.02, abs=0.01)
+        assert record.ttfb >= record.server
+        assert record.total >= record.ttfb + record.parse
+        assert record.network == pytest.approx(record.total - record.parse - record.server)
+
+
+def test_failed_attempts_are_recorded_with_their_error():
+    records = []
+    profiler = Profiler(callback=records.append, keep=0)
+    with FakeServer(seed=1) as server:
+        url = server.url
+    client = Client(token="agent_test", base_url=url, retry=NO_RETRY, breaker=False, profiler=profiler)
+    try:
+        with pytest.raises(AgentPayError):
+            client.request("GET", "/limits")
+    finally:
+        client.close()
+    
+    assert len(records) == 1
+    assert records[0].status is None and records[0].error
+    # keep=0 streams records without retaining them
+    assert not profiler.records
+    assert profiler.report() == "No requests profiled."
+
+
+def test_summary_and_report_cover_the_retained_records():
+    profiler = Profiler(keep=3)
+    for n in range(1, 6):
+        profiler.record(_record(total=n / 10, server=n / 100 if n % 2 else None))
+    
+    summary = profiler.summary()
+    assert set(summary) <= set(PHASES)
+    # Only the last three records are kept
+    assert summary["total"]["max"] == pytest.approx(0.5)
+    assert summary["total"]["p50"] == pytest.approx(0.4)
+    assert summary["total"]["mean"] == pytest.approx(0.4)
+    # The server phase only counts records that reported one
+    assert summary["server"]["p50"] == pytest.approx(0.03) and summary["server"]["max"] == pytest.approx(0.05)
+    
+    profiler.record(RequestProfile("GET", "GET /limits", 503, 1, total=0.1, reused=False))
+    report = profiler.report()
+    assert report.splitlines()[0].startswith("phase")
+    assert "3 requests, 67% on reused connections, 1 errors" in report
+    
+    profiler.clear()
+    assert profiler.summary() == {}
+
+
+def test_cli_profiles_a_local_server(capsys):
+    assert main(["profile", "-n", "5", "--local", "--json"]) == 0
+    
+    summary = json.loads(capsys.readouterr().out)
+    assert {"total", "ttfb", "server"} <= set(summary)
+    assert summary["total"]["max"] >= summary["total"]["p50"] > 0.0
+
+
+def test_cli_prints_a_report(capsys):
+    assert main(["profile", "-n", "3", "--local"]) == 0
+    
+    output = capsys.readouterr().out
+    assert "Profiled 3 x pay('gift-card')" in output
+    assert "3 requests" in output
+
+
+def test_cli_without_a_token_fails(server, capsys, monkeypatch):
+    monkeypatch.delenv("AGENTPAY_TOKEN", raising=False)
+    
+    assert main(["profile", "-n", "2", "--base-url", server.url]) == 2
+    assert "Error:" in capsys.readouterr().err
+    assert server.calls["purchase"] == 0
+
+
+def test_cli_without_a_command_prints_help(capsys):
+    assert main([]) == 1
+    assert "profile" in capsys.readouterr().out
@@ -0,0 +1,190 @@
+"""Shared rate limiter: GCRA burst and pacing, budgets shared through the lock file, server back-off"""
+
+import asyncio
+import os
+import pickle
+import threading
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.deadline import Deadline
+from agentpay.errors import AgentPayError
+from agentpay.ratelimit import RateLimiter, parse_rate_limit_reset
+from agentpay.retry import NO_RETRY
+from agentpay.testing import FakeServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "ratelimit")
+
+
+def test_a_burst_is_free_then_requests_are_paced(clock, state_path):
+    limiter = RateLimiter(rate=10, burst=3, path=state_path, clock=clock)
+    
+    waits = [limiter.reserve() for _ in range(5)]
+    
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3:] == pytest.approx([0.1, 0.2])
+
+
+def test_an_idle_period_refills_the_burst(clock, state_path):
+    limiter = RateLimiter(rate=10, burst=2, path=state_path, clock=clock)
+    for _ in range(4):
+        limiter.reserve()
+    
+    clock.now += 1.0
+    
+    assert [limiter.reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+
+
+def test_limiters_on_one_file_share_the_budget(clock, state_path):
+    first = RateLimiter(rate=10, burst=2, path=state_path, clock=clock)
+    second = RateLimiter(rate=10, burst=2, path=state_path, clock=clock)
+    
+    waits = [first.reserve(), second.reserve(), first.reserve(), second.reserve()]
+    
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+
+
+def test_the_same_key_maps_to_the_same_file():
+    assert RateLimiter(5, key="agent_a").path == RateLimiter(1, key="agent_a").path
+    assert RateLimiter(5, key="agent_a").path != RateLimiter(5, key="agent_b").path
+
+
+def test_a_pickled_limiter_keeps_its_file(clock, state_path):
+    limiter = RateLimiter(rate=10, burst=1, path=state_path, clock=clock)
+    copy = pickle.loads(pickle.dumps(limiter))
+    
+    assert copy.path == state_path
+    assert [limiter.reserve(), copy.reserve()] == pytest.approx([0.0, 0.1])
+
+
+def test_a_slot_past_max_wait_is_not_taken(clock, state_path):
+    limiter = RateLimiter(rate=1, burst=1, path=state_path, clock=clock)
+    limiter.reserve()
+    
+    assert limiter.reserve(max_wait=0.5) is None
+    assert limiter.reserve(max_wait=2.0) == pytest.approx(1.0)
+
+
+def test_acquire_fails_fast_when_the_slot_is_past_the_deadline(state_path):
+    limiter = RateLimiter(rate=1, burst=1, path=state_path)
+    limiter.block(10.0)
+    
+    with pytest.raises(AgentPayError) as raised:
+        limiter.acquire(Deadline(0.1))
+    assert raised.value.code == "DEADLINE_EXCEEDED"
+
+
+def test_retry_after_on_a_429_holds_everyone_back(clock, state_path):
+    limiter = RateLimiter(rate=10, burst=5, path=state_path, clock=clock)
+    other = RateLimiter(rate=10, burst=5, path=state_path, clock=clock)
+    
+    limiter.observe(429, {"Retry-After": "2"})
+    
+    # After the pause requests resume paced, not as a burst
+    assert other.reserve() == pytest.approx(2.0)
+    assert other.reserve() == pytest.approx(2.1)
+
+
+def test_exhausted_rate_limit_headers_push_the_bucket_back(clock, state_path):
+    limiter = RateLimiter(rate=10, burst=1, path=state_path, clock=clock)
+    
+    limiter.observe(200, {"RateLimit-Remaining": "0", "RateLimit-Reset": "3"})
+    
+    assert limiter.reserve() == pytest.approx(3.0)
+
+
+def test_parse_rate_limit_reset():
+    assert parse_rate_limit_reset({"RateLimit-Remaining": "4", "RateLimit-Reset": "3"}) is None
+    assert parse_rate_limit_reset({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "3"}) == 3.0
+    assert parse_rate_limit_reset({"RateLimit-Remaining": "0", "RateLimit-Reset": "1700000010"},
+                                  now=1700000000.0) == 10.0
+    assert parse_rate_limit_reset({"RateLimit-Remaining": "0", "RateLimit-Reset": "soon"}) is None
+
+
+def test_a_clock_stepping_back_keeps_the_schedule(clock, state_path):
+    limiter = RateLimiter(rate=1, burst=1, path=state_path, clock=clock)
+    limiter.reserve()
+    
+    clock.now -= 3600.0
+    
+    assert limiter.reserve() == pytest.approx(1.0)
+
+
+def test_client_feeds_server_429s_back_into_the_limiter(state_path):
+    limiter = RateLimiter(rate=100, burst=10, path=state_path)
+    with FakeServer(rate_limit=(1.0, 1)) as server:
+        with Client(token="agent_test", base_url=server.url, retry=NO_RETRY, rate_limiter=limiter) as client:
+            assert client.request("GET", "/limits").status_code == 200
+            assert client.request("GET", "/limits").status_code == 429
+    
+    assert server.calls["rate_limited"] == 1
+    assert limiter.reserve() > 0.3
+
+
+def test_aacquire_waits_for_the_file_lock_off_the_event_loop(state_path):
+    fcntl = pytest.importorskip("fcntl")
+    limiter = RateLimiter(rate=100, burst=10, path=state_path)
+    limiter.reserve()
+    
+    async def main():
+        # Another process holding the state file
+        holder = os.open(state_path, os.O_RDWR)
+        fcntl.flock(holder, fcntl.LOCK_EX)
+        
+        def release():
+            fcntl.flock(holder, fcntl.LOCK_UN)
+            os.close(holder)
+        
+        threading.Timer(0.2, release).start()
+        acquiring = asyncio.ensure_future(limiter.aacquire())
+        ticks = 0
+        while not acquiring.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await acquiring
+        return ticks
+    
+    # The loop kept running the whole time the lock was held
+    assert asyncio.run(main()) >= 10
+
+
+def test_aobserve_pushes_the_shared_bucket_back(clock, state_path):
+    limiter = RateLimiter(rate=10, burst=5, path=state_path, clock=clock)
+    
+    asyncio.run(limiter.aobserve(429, {"Retry-After": "2"}))
+    asyncio.run(limiter.aobserve(200, {}))
+    
+    assert limiter.reserve() == pytest.approx(2.0)
+
+
+def test_async_client_paces_through_the_limiter(state_path):
+    aio = pytest.importorskip("agentpay.aio")
+    limiter = RateLimiter(rate=100, burst=10, path=state_path)
+    
+    async def run(url):
+        async with aio.AsyncClient(token="agent_test", base_url=url, retry=NO_RETRY, rate_limiter=limiter) as client:
+            first = await client.request("GET", "/limits")
+            second = await client.request("GET", "/limits")
+        return first.status_code, second.status_code
+    
+    with FakeServer(rate_limit=(1.0, 1)) as server:
+        assert asyncio.run(run(server.url)) == (200, 429)
+    
+    assert limiter.reserve() > 0.3
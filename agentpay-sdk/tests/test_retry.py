@@ -0,0 +1,158 @@
+"""Retries: one Idempotency-Key per purchase, what is and isn't retried, and backoff within the deadline"""
+
+import time
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.deadline import Deadline
+from agentpay.errors import AgentPayError
+from agentpay.retry import NO_RETRY, RetryPolicy, parse_retry_after
+from agentpay.testing import FakeServer
+
+FAST_RETRY = RetryPolicy(max_attempts=3, backoff_base=0.01, backoff_max=0.02)
+
+
+class FlakyServer(FakeServer):
+    """FakeServer answering its first `failures` requests with `status`, recording each Idempotency-Key"""
+    
+    def __init__(self, failures, status=503, retry_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.status = status
+        self.retry_after = retry_after
+        self.keys = []
+    
+    def _handle(self, method, path, query, headers, body):
+        with self._lock:
+            self.keys.append(headers.get("idempotency-key"))
+            failing = len(self.keys) <= self.failures
+        if failing:
+            time.sleep(self._delay("default"))
+            extra = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+            return self.status, extra, {"error": "Injected failure", "code": "SERVICE_UNAVAILABLE"}
+        return super()._handle(method, path, query, headers, body)
+
+
+def _client(server, retry=FAST_RETRY, **kwargs):
+    return Client(token="agent_test", base_url=server.url, retry=retry, breaker=False, **kwargs)
+
+
+def test_every_retry_of_a_purchase_carries_the_same_idempotency_key():
+    with FlakyServer(failures=2) as server, _client(server) as client:
+        result = client.pay("gift-card", 20.0)
+    
+    assert result.success
+    assert len(server.keys) == 3
+    assert len(set(server.keys)) == 1 and server.keys[0]
+    assert len(server.transactions) == 1
+
+
+def test_separate_purchases_get_separate_keys():
+    with FlakyServer(failures=0) as server, _client(server) as client:
+        client.pay("gift-card", 20.0)
+        client.pay("gift-card", 20.0)
+    
+    assert len(set(server.keys)) == 2
+    assert len(server.transactions) == 2
+
+
+def test_a_replayed_retry_is_not_charged_twice(server):
+    with _client(server) as client:
+        payload = {"agentToken": client.token, "service": "gift-card", "params": {"amount": 10}}
+        for _ in range(2):
+            client.request("POST", "/v1/purchase-direct", json=payload, idempotency_key="purchase-1")
+    
+    assert server.calls["replayed"] == 1
+    assert len(server.transactions) == 1
+
+
+def test_client_errors_are_not_retried():
+    with FlakyServer(failures=1, status=400) as server, _client(server) as client:
+        response = client.request("GET", "/limits")
+    
+    assert response.status_code == 400
+    assert len(server.keys) == 1
+
+
+def test_no_retry_sends_exactly_once():
+    with FlakyServer(failures=1) as server, _client(server, retry=NO_RETRY) as client:
+        result = client.pay("gift-card", 20.0)
+    
+    assert not result.success and result.error == "SERVICE_UNAVAILABLE"
+    assert len(server.keys) == 1
+
+
+def test_posts_without_an_idempotency_key_are_never_retried():
+    with FlakyServer(failures=1) as server, _client(server) as client:
+        response = client.request("POST", "/v1/authorize", json={"agentToken": "agent_test", "amount": 5})
+    
+    assert response.status_code == 503
+    assert server.keys == [None]
+
+
+def test_gets_are_retried_and_the_last_response_is_returned():
+    with FlakyServer(failures=5) as server, _client(server) as client:
+        response = client.request("GET", "/limits")
+    
+    assert response.status_code == 503
+    assert len(server.keys) == FAST_RETRY.max_attempts
+
+
+def test_timeouts_are_retried_then_reported_as_network_errors():
+    with FakeServer(latency={"limits": 0.5, "default": 0.0}) as server, \
+            _client(server, timeout=0.05) as client:
+        with pytest.raises(AgentPayError) as raised:
+            client.request("GET", "/limits")
+    
+    assert raised.value.code == "NETWORK_ERROR"
+    assert raised.value.details["attempts"] == 3
+    assert server.calls["limits"] == 3
+
+
+def test_retries_stop_when_the_next_backoff_would_overrun_the_deadline():
+    retry = RetryPolicy(max_attempts=10, backoff_base=0.0)
+    with FlakyServer(failures=100, retry_after=0.2) as server, _client(server, retry=retry) as client:
+        started = time.monotonic()
+        response = client.request("GET", "/limits", deadline=0.5)
+        elapsed = time.monotonic() - started
+    
+    # Attempts at 0.0s, 0.2s and 0.4s; a fourth would start past the deadline
+    assert response.status_code == 503
+    assert len(server.keys) == 3
+    assert elapsed < 0.5
+
+
+def test_retry_after_from_a_429_is_honoured():
+    with FakeServer(rate_limit=(2.0, 1)) as server, \
+            _client(server, retry=RetryPolicy(max_attempts=2, backoff_base=0.0)) as client:
+        client.request("GET", "/limits")
+        started = time.monotonic()
+        response = client.request("GET", "/limits")
+    
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.3
+    assert server.calls["rate_limited"] == 1
+
+
+def test_next_delay_stops_after_the_last_attempt():
+    policy = RetryPolicy(max_attempts=3, backoff_base=0.1, backoff_max=0.15)
+    deadline = Deadline(None)
+    
+    assert 0 <= policy.next_delay(1, deadline) <= 0.1
+    assert 0 <= policy.next_delay(2, deadline) <= 0.15
+    assert policy.next_delay(3, deadline) is None
+
+
+def test_next_delay_gives_up_when_the_backoff_would_overrun_the_deadline():
+    policy = RetryPolicy(max_attempts=5)
+    
+    assert policy.next_delay(1, Deadline(10.0), retry_after=1.0) == 1.0
+    assert policy.next_delay(1, Deadline(0.5), retry_after=1.0) is None
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"Retry-After": "1.5"}) == 1.5
+    assert parse_retry_after({"Retry-After": "-3"}) == 0.0
+    assert parse_retry_after({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}) is None
+    assert parse_retry_after({}) is None
@@ -0,0 +1,138 @@
+"""Single flight: named purchases coalesce while in flight, unnamed ones never do"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.retry import NO_RETRY
+from agentpay.singleflight import AsyncSingleFlight, SingleFlight, flight_key
+from agentpay.testing import FakeServer
+
+
+def _together(count, fn):
+    """Call fn from count threads at once and return the results"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    
+    def run(index):
+        barrier.wait()
+        results[index] = fn()
+    
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.fixture
+def slow_client():
+    with FakeServer(latency={"purchase": 0.3, "default": 0.0}) as server:
+        with Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+            yield server, client
+
+
+def test_concurrent_calls_naming_one_purchase_share_its_request(slow_client):
+    server, client = slow_client
+    
+    results = _together(5, lambda: client.pay("gift-card", 20.0, {"brand": "amazon"}, purchase_key="order-17"))
+    
+    assert server.calls["purchase"] == 1
+    assert len({result.transaction_id for result in results}) == 1
+    assert client.single_flight.shared == 4
+    assert client.single_flight.in_flight() == 0
+
+
+def test_identical_unnamed_purchases_are_all_sent(slow_client):
+    server, client = slow_client
+    
+    results = _together(5, lambda: client.pay("gift-card", 20.0, {"brand": "amazon"}))
+    
+    assert server.calls["purchase"] == 5
+    assert len({result.transaction_id for result in results}) == 5
+    assert client.single_flight.shared == 0
+
+
+def test_an_idempotency_key_also_names_the_purchase(slow_client):
+    server, client = slow_client
+    
+    _together(3, lambda: client.pay("gift-card", 20.0, idempotency_key="idem-1"))
+    
+    assert server.calls["purchase"] == 1
+
+
+def test_a_finished_purchase_is_not_reused(slow_client):
+    server, client = slow_client
+    
+    first = client.pay("gift-card", 20.0, purchase_key="order-17")
+    second = client.pay("gift-card", 20.0, purchase_key="order-17")
+    
+    assert server.calls["purchase"] == 2
+    assert first.transaction_id != second.transaction_id
+
+
+def test_flight_key_separates_different_purchases():
+    base = flight_key("purchase", "agent_a", "Gift-Card", 20.0, "k", {"brand": "amazon", "qty": 1})
+    
+    assert base == flight_key("purchase", "agent_a", " gift-card", 20.001, "k", {"qty": 1, "brand": "amazon"})
+    assert base != flight_key("purchase", "agent_b", "gift-card", 20.0, "k", {"brand": "amazon", "qty": 1})
+    assert base != flight_key("purchase", "agent_a", "gift-card", 20.01, "k", {"brand": "amazon", "qty": 1})
+    assert base != flight_key("purchase", "agent_a", "gift-card", 20.0, "other", {"brand": "amazon", "qty": 1})
+    assert base != flight_key("purchase", "agent_a", "gift-card", 20.0, "k", {"brand": "apple", "qty": 1})
+
+
+def test_joined_callers_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    
+    def fail():
+        release.wait(5.0)
+        raise ValueError("declined")
+    
+    errors = []
+    
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.shared < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+    assert flight.in_flight() == 0
+
+
+def test_async_single_flight_coalesces_and_shields_joiners():
+    calls = []
+    
+    async def purchase():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "txn_1"
+    
+    async def main():
+        flight = AsyncSingleFlight()
+        leader = asyncio.ensure_future(flight.do("key", purchase))
+        await asyncio.sleep(0)
+        joiner = asyncio.ensure_future(flight.do("key", purchase))
+        cancelled = asyncio.ensure_future(flight.do("key", purchase))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await leader, await joiner, flight
+    
+    leader, joiner, flight = asyncio.run(main())
+    assert leader == joiner == "txn_1"
+    assert calls == [1]
+    assert flight.shared == 2 and flight.in_flight() == 0
@@ -0,0 +1,106 @@
+"""FakeServer: the emulated API routes, limits, injected faults, rate limiting and replay"""
+
+import pytest
+
+from agentpay.client import Client
+from agentpay.retry import NO_RETRY
+from agentpay.testing import FakeServer
+
+
+def _authorize(client, amount):
+    return client.request(
+        "POST", "/v1/authorize", json={"agentToken": client.token, "amount": amount, "merchant": "shop"}
+    ).json()
+
+
+def test_pay_records_a_transaction(server, client):
+    result = client.pay("gift-card", 25.0, {"brand": "amazon"})
+    
+    assert result.success and result.amount == 25.0
+    assert server.calls["purchase"] == 1
+    assert server.daily_spent == pytest.approx(25.0)
+    assert [t.id for t in client.transactions()] == [result.transaction_id]
+
+
+def test_authorize_then_confirm_captures_at_most_the_authorized_amount(server, client):
+    authorization = _authorize(client, 40.0)
+    assert authorization["authorized"]
+    confirm = f"/v1/authorize/{authorization['authorizationId']}/confirm"
+    
+    first = client.request("POST", confirm, json={"finalAmount": 30.0})
+    over = client.request("POST", confirm, json={"finalAmount": 20.0})
+    
+    assert first.status_code == 200 and first.json()["amount"] == 30.0
+    assert over.status_code == 400 and over.json()["code"] == "AMOUNT_EXCEEDS_AUTHORIZATION"
+    assert client.request("POST", "/v1/authorize/auth_missing/confirm", json={}).status_code == 404
+    assert server.daily_spent == pytest.approx(30.0)
+
+
+def test_authorize_enforces_the_configured_limits():
+    with FakeServer(daily_limit=50.0, transaction_limit=30.0) as server, \
+            Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+        assert "per-transaction" in _authorize(client, 35.0)["reason"]
+        server.daily_spent = 40.0
+        assert "daily limit" in _authorize(client, 20.0)["reason"]
+        assert _authorize(client, 10.0)["authorized"]
+        
+        limits = client.limits(refresh=True)
+        assert limits.daily_limit == 50.0
+        assert limits.remaining_daily == pytest.approx(10.0)
+
+
+def test_unknown_tokens_are_rejected():
+    with FakeServer(tokens=["agent_good"]) as server:
+        with Client(token="agent_bad", base_url=server.url, retry=NO_RETRY) as client:
+            result = client.pay("gift-card", 10.0)
+    assert not result.success and result.error == "INVALID_AGENT_TOKEN"
+
+
+def test_purchases_over_the_approval_threshold_need_approval():
+    with FakeServer(approval_threshold=100.0) as server:
+        with Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+            result = client.pay("laptop", 150.0)
+    assert result.error == "approval_required"
+    assert result.details["estimated_amount"] == 150.0
+    assert server.transactions == []
+
+
+def test_injected_errors_leave_no_state_behind():
+    with FakeServer(error_rate=1.0, error_status=503) as server:
+        with Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+            response = client.request("POST", "/v1/authorize", json={"agentToken": "agent_test", "amount": 5})
+    assert response.status_code == 503
+    assert server.calls["injected_errors"] == 1
+    assert server.authorizations == {}
+
+
+def test_requests_over_the_rate_limit_get_429_with_retry_after():
+    with FakeServer(rate_limit=(1.0, 2)) as server:
+        with Client(token="agent_test", base_url=server.url, retry=NO_RETRY) as client:
+            statuses = [client.request("GET", "/limits").status_code for _ in range(3)]
+            limited = client.request("GET", "/limits")
+    assert statuses == [200, 200, 429]
+    assert float(limited.headers["Retry-After"]) > 0
+    assert server.calls["rate_limited"] == 2
+
+
+def test_a_repeated_idempotency_key_replays_the_first_response(server, client):
+    payload = {"agentToken": client.token, "service": "gift-card", "params": {"amount": 15}}
+    first = client.request("POST", "/v1/purchase-direct", json=payload, idempotency_key="key-1")
+    again = client.request("POST", "/v1/purchase-direct", json=payload, idempotency_key="key-1")
+    
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json() == first.json()
+    assert len(server.transactions) == 1
+    assert server.calls["replayed"] == 1
+
+
+def test_seeded_transactions_do_not_count_toward_spend(server, client):
+    server.add_transaction(12.5, created=1700000000, agent_id="agent_1")
+    
+    (transaction,) = client.transactions()
+    assert transaction.amount == 12.5
+    assert server.daily_spent == 0.0
+    
+    server.reset()
+    assert server.transactions == [] and not server.calls
@@ -0,0 +1,106 @@
+"""ConfirmationQueue: background batching, per-entry results and failures, flush and close"""
+
+import threading
+import time
+
+import pytest
+
+from agentpay.writebehind import ConfirmationQueue
+
+
+def _authorize(client, amount):
+    response = client.request(
+        "POST", "/v1/authorize", json={"agentToken": client.token, "amount": amount, "merchant": "shop"}
+    )
+    return response.json()["authorizationId"]
+
+
+def _confirmer(client):
+    def confirm(authorization_id, amount):
+        response = client.request(
+            "POST", f"/v1/authorize/{authorization_id}/confirm", json={"finalAmount": amount}
+        )
+        body = response.json()
+        if not body.get("success"):
+            raise RuntimeError(body.get("code"))
+        return body["transactionId"]
+    return confirm
+
+
+def test_submit_returns_at_once_and_confirms_in_the_background(server, client):
+    authorizations = [_authorize(client, 10.0) for _ in range(5)]
+    confirmations = ConfirmationQueue(_confirmer(client))
+    
+    futures = [confirmations.submit(authorization_id, 10.0) for authorization_id in authorizations]
+    
+    assert confirmations.flush(timeout=5.0)
+    assert confirmations.pending() == 0
+    assert all(future.result().startswith("txn_") for future in futures)
+    assert server.calls["confirm"] == 5
+    assert server.daily_spent == pytest.approx(50.0)
+    confirmations.close()
+
+
+def test_a_failed_confirmation_only_fails_its_own_future(server, client):
+    good = _authorize(client, 10.0)
+    confirmations = ConfirmationQueue(_confirmer(client))
+    
+    ok = confirmations.submit(good, 10.0)
+    missing = confirmations.submit("auth_missing", 10.0)
+    
+    assert ok.result(timeout=5.0).startswith("txn_")
+    with pytest.raises(RuntimeError, match="AUTHORIZATION_NOT_FOUND"):
+        missing.result(timeout=5.0)
+    confirmations.close()
+
+
+def test_entries_arriving_together_are_sent_as_one_batch():
+    batches = []
+    
+    def confirm_batch(entries):
+        batches.append(len(entries))
+        return [args[0] * 2 for args, _ in entries]
+    
+    confirmations = ConfirmationQueue(lambda n: n, max_batch=4, flush_interval=0.2, confirm_batch=confirm_batch)
+    futures = [confirmations.submit(n) for n in range(10)]
+    
+    assert [future.result(timeout=5.0) for future in futures] == [n * 2 for n in range(10)]
+    assert batches == [4, 4, 2]
+    confirmations.close()
+
+
+def test_a_short_batch_result_fails_the_leftover_entries():
+    confirmations = ConfirmationQueue(
+        lambda n: n, flush_interval=0.2, confirm_batch=lambda entries: [entries[0][0][0]]
+    )
+    first, second = confirmations.submit(1), confirmations.submit(2)
+    
+    assert first.result(timeout=5.0) == 1
+    with pytest.raises(RuntimeError, match="too few results"):
+        second.result(timeout=5.0)
+    confirmations.close()
+
+
+def test_flush_times_out_while_confirmations_are_stuck():
+    release = threading.Event()
+    confirmations = ConfirmationQueue(lambda: release.wait(5.0), flush_interval=0.0)
+    confirmations.submit()
+    
+    assert not confirmations.flush(timeout=0.1)
+    assert confirmations.pending() == 1
+    release.set()
+    assert confirmations.close(timeout=5.0)
+
+
+def test_close_sends_what_is_queued_then_refuses_more():
+    sent = []
+    confirmations = ConfirmationQueue(lambda n: sent.append(n) or n, flush_interval=0.05)
+    for n in range(3):
+        confirmations.submit(n)
+    
+    started = time.monotonic()
+    assert confirmations.close(timeout=5.0)
+    assert time.monotonic() - started < 5.0
+    assert sorted(sent) == [0, 1, 2]
+    with pytest.raises(RuntimeError):
+        confirmations.submit(3)
@@ -6,21 +6,93 @@ This integration allows CrewAI agents to use AgentPay's /v1/authorize → /confi
 for secure, controlled spending across any merchant on the internet.
 
 Installation:
-    pip install crewai requests
+    pip install crewai agentpay
 
 Usage:
-    from crewai_agentpay import AgentPayTool, create_purchase_agent
+    from crewai_agentpay import AgentPayTool, create_purchase_agent, create_purchase_executor
     
     tool = AgentPayTool(agent_token="your_jwt_token")
     agent = create_purchase_agent(tool)
     result = agent.execute_task("Order lunch from DoorDash for $25")
+    
+    # Queue of purchases with authorize/merchant/confirm overlapped across items
+    for response in tool.purchase_many([{"merchant": "amazon.com", "amount": 12.0, ...}, ...]):
+        print(response)
+    
+    # Envelope mode: one authorization covers many small purchases at a merchant
+    tool = AgentPayTool(agent_token="your_jwt_token", envelope_budget=100.00, envelope_ttl=300)
+    
+    # Local ledger: confirmed purchases are recorded, spending questions never hit the API
+    tool = AgentPayTool(agent_token="your_jwt_token", ledger=True)
+    history_tool = AgentPaySpendingTool(ledger=tool.ledger)
+    
+    # Budget checks served from a TTL cache kept current by the tool's confirms
+    limits_tool = AgentPayLimitsTool(client=tool.client)
+    
+    # Pre-flight policy: certain refusals are answered locally before /v1/authorize
+    tool = AgentPayTool(agent_token="your_jwt_token", policy=Policy(blocked_categories={"gambling"}))
+    
+    # Agents in one crew naming the same purchase (a "purchase_key" parameter) share one flow
+    flights = SingleFlight()
+    tools = [AgentPayTool(agent_token="your_jwt_token", single_flight=flights) for _ in range(3)]
+    
+    # Worker processes sharing one token pace authorize/confirm calls through one budget
+    tool = AgentPayTool(agent_token="your_jwt_token", rate_limiter=RateLimiter(5, burst=10, key="your_jwt_token"))
+    
+    # Parallel purchases under a crew-wide concurrency cap and shared budget
+    tool.executor = create_purchase_executor(tool, max_concurrency=8, budget=250.00)
+    futures = [tool.submit(purchase) for purchase in purchases]
+    
+    # Purchase progress as structured events, written off the purchase path
+    tool = AgentPayTool(agent_token="your_jwt_token", events=EventLog([JSONLinesSink("purchases.jsonl")]))
+    
+    # Pluggable checkout: a seeded simulator on a virtual clock runs a crew test in milliseconds
+    tool = AgentPayTool(agent_token="your_jwt_token", merchant=SimulatedMerchant(seed=7, clock=VirtualClock()))
 """
 
-import requests
 import json
-from typing import Dict, Any, Optional, List
+import sys
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, List, Tuple, Union, Iterable, Iterator
 from crewai_tools import BaseTool
 from pydantic import BaseModel, Field
+from agentpay import Client, AgentPayError, SpendingLimits, Policy, RateLimiter
+from agentpay.deadline import Deadline
+from agentpay.envelope import EnvelopeManager, Reservation
+from agentpay.ledger import Ledger
+from agentpay.pipeline import PurchasePipeline, PipelineItem, StageFailure
+from agentpay.writebehind import ConfirmationQueue
+from agentpay.retry import new_idempotency_key
+from agentpay.singleflight import SingleFlight, flight_key
+from agentpay.executor import PurchaseExecutor, worker_index
+from agentpay.events import EventLog, ConsoleSink, default_log
+from agentpay.merchant import MerchantExecutor, SimulatedMerchant
+
+
+class PurchaseOutcome:
+    """
+    Result of one purchase flow: the text for the agent and what it spent.
+    
+    charged is 0 when nothing was bought (refused, failed at the merchant, or
+    the confirmation was rejected, including with an HTTP 4xx) and the amount charged once the merchant
+    completed the order, including when the flow failed afterwards and the
+    confirmation's fate is unknown. For a write-behind purchase it is a
+    Future of that amount, resolved when the background confirmation settles.
+    None means the charge is unknown. str() is the response text.
+    """
+    
+    __slots__ = ('response', 'charged')
+    
+    def __init__(self, response: str, charged: Union[float, Future] = 0.0):
+        self.response = response
+        self.charged = charged
+    
+    def __str__(self) -> str:
+        return self.response
+    
+    def __repr__(self) -> str:
+        return f"PurchaseOutcome(charged={self.charged!r}, response={self.response[:40]!r})"
 
 
 class AgentPayTool(BaseTool):
@@ -46,18 +118,58 @@ class AgentPayTool(BaseTool):
     - Make any online purchase with proper authorization
     
     Always specify the merchant, amount, category, and clear intent.
+    To make several purchases at once, pass a JSON list of purchase objects.
     """
     
-    def __init__(self, agent_token: str, api_base: str = "https://api.agentpay.org"):
+    def __init__(self, agent_token: str, api_base: str = "https://api.agentpay.org",
+                 envelope_budget: Optional[float] = None, envelope_ttl: float = 300.0,
+                 purchase_timeout: Optional[float] = 30.0, write_behind: bool = False,
+                 ledger: Union[Ledger, bool, None] = None, policy: Optional[Policy] = None,
+                 single_flight: Union[SingleFlight, bool, None] = True,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 executor: Optional[PurchaseExecutor] = None,
+                 events: Optional[EventLog] = None,
+                 merchant: Optional[MerchantExecutor] = None):
         super().__init__()
+        # Settings a process-pool worker needs to rebuild this tool (see create_purchase_executor)
+        self.worker_options = {
+            'agent_token': agent_token, 'api_base': api_base, 'envelope_budget': envelope_budget,
+            'envelope_ttl': envelope_ttl, 'purchase_timeout': purchase_timeout,
+            'policy': policy, 'rate_limiter': rate_limiter, 'merchant': merchant
+        }
         self.agent_token = agent_token
         self.api_base = api_base.rstrip('/')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Authorization': f'Bearer {agent_token}',
-            'Content-Type': 'application/json',
-            'User-Agent': 'CrewAI-AgentPay/1.0'
-        })
+        # One time budget for the whole authorize → merchant → confirm flow
+        self.purchase_timeout = purchase_timeout
+        # Opt-in: confirm in the background instead of blocking the agent on /confirm
+        self.confirmations = ConfirmationQueue(self._confirm_transaction) if write_behind else None
+        self.pending_confirmations: Dict[str, Future] = {}
+        # Opt-in: authorize a budget once and draw repeat purchases from it locally
+        self.envelopes = EnvelopeManager(envelope_budget, envelope_ttl) if envelope_budget else None
+        # Concurrent calls naming the same purchase share one flow; pass one
+        # SingleFlight to every agent's tool to deduplicate across the crew
+        self.single_flight = SingleFlight() if single_flight is True else (single_flight or None)
+        # Pooled client retries transient failures under one Idempotency-Key per call
+        self.client = Client(
+            token=agent_token,
+            base_url=self.api_base,
+            headers={
+                'Authorization': f'Bearer {agent_token}',
+                'Content-Type': 'application/json',
+                'User-Agent': 'CrewAI-AgentPay/1.0'
+            },
+            policy=policy,
+            single_flight=self.single_flight,
+            rate_limiter=rate_limiter
+        )
+        # Opt-in: record confirmed purchases locally so spending queries stay offline
+        self.ledger = Ledger(client=self.client) if ledger is True else (ledger or None)
+        # Opt-in: parallel purchases under a crew-wide concurrency cap and budget
+        self.executor = executor
+        # Structured purchase events (the shared default log has no sinks until one is added)
+        self.events = events if events is not None else default_log
+        # Checkout backend; defaults to simulated demo merchants running in real time
+        self.merchant = merchant or SimulatedMerchant()
     
     def _run(self, argument: str) -> str:
         """
@@ -68,27 +180,120 @@ class AgentPayTool(BaseTool):
         
         OR JSON format:
         '{"merchant": "doordash.com", "amount": 25.99, "category": "food", "intent": "Order lunch"}'
+        
+        OR a JSON list of purchases, executed as one batch (in parallel on the
+        tool's PurchaseExecutor if it has one, else pipelined):
+        '[{"merchant": "amazon.com", ...}, {"merchant": "uber.com", ...}]'
         """
         
         try:
+            if argument.strip().startswith('['):
+                purchases = json.loads(argument)
+                responses = self.execute_many(purchases) if self.executor is not None else self.purchase_many(purchases)
+                return "\n\n".join(
+                    f"[{index + 1}/{len(purchases)}] {response}"
+                    for index, response in enumerate(responses)
+                )
+            
             # Parse the argument
             params = self._parse_argument(argument)
             
             if 'error' in params:
                 return f"❌ Parameter error: {params['error']}"
             
-            # Execute the purchase flow
-            return self._execute_purchase_flow(
-                params['merchant'],
-                params['amount'],
-                params['category'],
-                params['intent'],
-                params.get('metadata', {})
-            )
+            return self._purchase_request(params).response
             
         except Exception as e:
             return f"❌ AgentPay tool error: {str(e)}"
     
+    def _purchase_request(self, params: Dict[str, Any]) -> PurchaseOutcome:
+        """Run one parsed purchase request through the full flow."""
+        
+        missing = [key for key in ('merchant', 'amount', 'category', 'intent') if key not in params]
+        if missing:
+            return PurchaseOutcome(f"❌ Parameter error: Missing required parameters: {', '.join(missing)}")
+        
+        flow_args = (
+            params['merchant'],
+            float(params['amount']),
+            params['category'],
+            params['intent'],
+            params.get('metadata', {})
+        )
+        key = self._flight_key(params)
+        if self.single_flight is None or key is None:
+            return self._execute_purchase_flow(*flow_args)
+        # A duplicate call (another agent, or a retried task) naming the same
+        # purchase waits for the flow already running
+        return self.single_flight.do(key, self._execute_purchase_flow, *flow_args)
+    
+    def _flight_key(self, params: Dict[str, Any]) -> Optional[Tuple]:
+        """Single-flight key of a purchase named by a purchase_key; None if unnamed."""
+        
+        metadata = dict(params.get('metadata') or {})
+        named_in_metadata = metadata.pop('purchase_key', None)
+        purchase_key = params.get('purchase_key') or named_in_metadata
+        if not purchase_key:
+            return None
+        # Same name but a different request is a different purchase
+        details = {'category': params['category'], 'intent': params['intent'], 'metadata': metadata}
+        return flight_key('tool', self.agent_token, params['merchant'], params['amount'], purchase_key, details)
+    
+    def submit(self, purchase: Dict[str, Any]) -> Future:
+        """
+        Queue a purchase on the tool's PurchaseExecutor and return a Future for its PurchaseOutcome.
+        
+        The purchase is a dict with merchant, amount, category, intent and
+        optional metadata. Purchases from every tool sharing the executor
+        count toward its concurrency cap and shared budget.
+        """
+        
+        if self.executor is None:
+            raise RuntimeError("AgentPayTool has no executor; see create_purchase_executor()")
+        future = self.executor.submit(purchase)
+        fields = {'merchant': purchase.get('merchant'), 'amount': purchase.get('amount'),
+                  'category': purchase.get('category')}
+        if future.done() and future.exception() is not None:
+            # Refused up front: the shared budget can't cover it
+            self.events.emit('purchase.budget_exceeded', remaining_budget=self.executor.remaining, **fields)
+            return future
+        
+        # The flow's own events come from whichever worker runs it (only
+        # thread workers share this log); these bracket it from the crew's side
+        submitted = time.monotonic()
+        self.events.emit('purchase.submitted', pending=self.executor.pending(),
+                         remaining_budget=self.executor.remaining, **fields)
+        future.add_done_callback(lambda done: self._emit_executed(done, fields, submitted))
+        return future
+    
+    def _emit_executed(self, done: Future, fields: Dict[str, Any], submitted: float) -> None:
+        """Report a purchase the executor finished, with what it spent of the budget."""
+        
+        if done.cancelled() or done.exception() is not None:
+            error = 'cancelled' if done.cancelled() else done.exception()
+            self.events.emit('purchase.failed', error=str(error), code=getattr(error, 'code', None),
+                             total_ms=_elapsed_ms(submitted), executor=True, **fields)
+            return
+        charged = done.result().charged
+        self.events.emit('purchase.executed', charged=None if isinstance(charged, Future) else charged,
+                         confirm_pending=isinstance(charged, Future), remaining_budget=self.executor.remaining,
+                         total_ms=_elapsed_ms(submitted), **fields)
+    
+    def execute_many(self, purchases: Iterable[Dict[str, Any]]) -> List[str]:
+        """Run purchases in parallel on the tool's executor; responses in input order."""
+        
+        futures = [self.submit(purchase) for purchase in purchases]
+        return [self._executor_response(future.exception() or future.result()) for future in futures]
+    
+    def _executor_response(self, response: Any) -> str:
+        """Turn an executor outcome (a response or the exception it raised) into tool text."""
+        
+        if isinstance(response, AgentPayError) and response.code == 'BUDGET_EXCEEDED':
+            return f"❌ Crew budget exceeded: {response}"
+        if isinstance(response, BaseException):
+            return f"❌ AgentPay tool error: {str(response)}"
+        return response.response
+    
     def _parse_argument(self, argument: str) -> Dict[str, Any]:
         """Parse CrewAI tool argument into purchase parameters."""
         
@@ -128,62 +333,293 @@ class AgentPayTool(BaseTool):
             return {'error': f'Parameter parsing error: {str(e)}'}
     
     def _execute_purchase_flow(self, merchant: str, amount: float, category: str, 
-                              intent: str, metadata: Dict = None) -> str:
+                              intent: str, metadata: Dict = None) -> PurchaseOutcome:
         """Execute the complete AgentPay purchase flow."""
         
+        reservation = None
+        # Nothing is spent until the merchant completes the order
+        charged = 0.0
+        deadline = Deadline(self.purchase_timeout)
+        # Progress goes to the event log: emit() only enqueues, sinks write off-thread
+        events = self.events
+        purchase_id = new_idempotency_key()
+        started = time.monotonic()
         try:
-            # Step 1: Request Authorization from Control Tower
-            print(f"🎯 Requesting authorization for ${amount} at {merchant}...")
+            # Step 1: Request Authorization from Control Tower (or draw from an envelope)
+            events.emit('purchase.authorize_requested', purchase_id=purchase_id,
+                        merchant=merchant, amount=amount, category=category)
             
-            auth_response = self._request_authorization(
-                merchant, amount, category, intent, metadata
+            deadline.enter('authorize')
+            step = time.monotonic()
+            auth_response, reservation = self._authorize_purchase(
+                merchant, amount, category, intent, metadata, deadline
             )
             
             if not auth_response.get('authorized'):
                 reason = auth_response.get('reason', 'Unknown error')
-                return f"❌ Authorization denied: {reason}\n\nPlease check your spending limits or try a smaller amount."
+                events.emit('purchase.authorize_denied', purchase_id=purchase_id, reason=reason,
+                            code=auth_response.get('code'), duration_ms=_elapsed_ms(step))
+                return PurchaseOutcome(
+                    f"❌ Authorization denied: {reason}\n\nPlease check your spending limits or try a smaller amount."
+                )
             
             authorization_id = auth_response['authorizationId']
             scoped_token = auth_response.get('scopedToken')
-            latency = auth_response.get('latency', 0)
             
-            print(f"✅ Authorization granted in {latency}ms: {authorization_id}")
+            events.emit('purchase.authorize_granted', purchase_id=purchase_id,
+                        authorization_id=authorization_id, envelope=reservation is not None,
+                        latency_ms=auth_response.get('latency', 0), duration_ms=_elapsed_ms(step))
             
             # Step 2: Execute merchant purchase
-            print(f"🛍️ Executing purchase at {merchant}...")
-            
+            deadline.enter('merchant')
+            step = time.monotonic()
             purchase_result = self._execute_merchant_purchase(
-                merchant, amount, authorization_id, intent, scoped_token
+                merchant, amount, authorization_id, intent, scoped_token, deadline
             )
             
             if not purchase_result['success']:
-                return f"❌ Purchase failed: {purchase_result['error']}\n\nThe authorization has been released."
+                events.emit('purchase.merchant_failed', purchase_id=purchase_id,
+                            error=purchase_result['error'], duration_ms=_elapsed_ms(step))
+                return PurchaseOutcome(
+                    f"❌ Purchase failed: {purchase_result['error']}\n\nThe authorization has been released."
+                )
             
-            print(f"✅ Purchase completed: {purchase_result['order_id']}")
+            charged = purchase_result['amount_charged']
+            events.emit('purchase.merchant_completed', purchase_id=purchase_id,
+                        order_id=purchase_result['order_id'], amount_charged=purchase_result['amount_charged'],
+                        duration_ms=_elapsed_ms(step))
+            if reservation is not None:
+                # Taxes and fees beyond the hold come out of the envelope, or the purchase fails before confirming
+                reservation.cover(charged)
             
             # Step 3: Confirm transaction with AgentPay
-            print(f"💳 Confirming transaction with AgentPay...")
+            if self.confirmations is not None:
+                # Write-behind: hand the confirmation (and the envelope hold) to the queue
+                confirmation = self._confirm_later(
+                    authorization_id, amount, purchase_result, reservation, category, purchase_id
+                )
+                reservation = None
+                events.emit('purchase.confirm_queued', purchase_id=purchase_id,
+                            order_id=purchase_result['order_id'], total_ms=_elapsed_ms(started))
+                return PurchaseOutcome(
+                    self._format_pending_response(purchase_result),
+                    _charged_when_confirmed(confirmation, charged)
+                )
             
+            deadline.enter('confirm')
+            step = time.monotonic()
             confirm_response = self._confirm_transaction(
-                authorization_id, amount, purchase_result['transaction_details']
+                authorization_id, amount, purchase_result['transaction_details'], reservation, deadline,
+                category=category
             )
             
             if not confirm_response.get('success'):
                 error = confirm_response.get('error', 'Unknown error')
-                return f"❌ Transaction confirmation failed: {error}"
+                events.emit('purchase.confirm_failed', purchase_id=purchase_id,
+                            error=error, duration_ms=_elapsed_ms(step))
+                return PurchaseOutcome(f"❌ Transaction confirmation failed: {error}")
             
-            print(f"✅ Transaction confirmed: {confirm_response['transactionId']}")
+            if reservation is not None:
+                reservation.commit(purchase_result['amount_charged'])
+            
+            events.emit('purchase.confirmed', purchase_id=purchase_id,
+                        transaction_id=confirm_response['transactionId'],
+                        duration_ms=_elapsed_ms(step), total_ms=_elapsed_ms(started))
             
             # Return formatted success response
-            return self._format_success_response(confirm_response, purchase_result)
+            return PurchaseOutcome(self._format_success_response(confirm_response, purchase_result), charged)
             
+        except AgentPayError as e:
+            events.emit('purchase.failed', purchase_id=purchase_id, error=str(e), code=e.code,
+                        phase=e.details.get('phase'), total_ms=_elapsed_ms(started))
+            if _refused(e):
+                charged = 0.0
+            if e.code == 'DEADLINE_EXCEEDED':
+                return PurchaseOutcome(self._format_timeout_response(e), charged)
+            return PurchaseOutcome(f"❌ Purchase flow error: {str(e)}", charged)
         except Exception as e:
-            return f"❌ Purchase flow error: {str(e)}"
+            events.emit('purchase.failed', purchase_id=purchase_id, error=str(e),
+                        total_ms=_elapsed_ms(started))
+            if _refused(e):
+                charged = 0.0
+            return PurchaseOutcome(f"❌ Purchase flow error: {str(e)}", charged)
+        finally:
+            # Return held envelope funds for any purchase that didn't complete
+            if reservation is not None:
+                reservation.release()
+    
+    def purchase_many(self, purchases: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Run a queue of purchases through a pipelined authorize → merchant → confirm flow.
+        
+        Each purchase is a dict with merchant, amount, category, intent and
+        optional metadata. Consecutive purchases overlap (N is confirmed while
+        N+1 is at the merchant and N+2 is being authorized), each purchase
+        still runs its steps in order, and results are yielded in input order.
+        """
+        
+        pipeline = PurchasePipeline([
+            ('authorize', self._authorize_stage),
+            ('merchant', self._merchant_stage),
+            ('confirm', self._confirm_stage),
+        ])
+        
+        for item in pipeline.run(purchases):
+            yield self._pipeline_response(item)
+    
+    def _authorize_stage(self, item: PipelineItem) -> None:
+        """Pipeline stage 1: authorize (or draw from an envelope)."""
+        
+        params = item.request
+        missing = [key for key in ('merchant', 'amount', 'category', 'intent') if key not in params]
+        if missing:
+            raise StageFailure(f"❌ Parameter error: Missing required parameters: {', '.join(missing)}")
+        
+        events = self.events
+        purchase_id = item.state['purchase_id'] = new_idempotency_key()
+        item.state['started'] = step = time.monotonic()
+        events.emit('purchase.authorize_requested', purchase_id=purchase_id, merchant=params['merchant'],
+                    amount=float(params['amount']), category=params['category'], pipeline=True)
+        
+        deadline = item.state['deadline'] = Deadline(self.purchase_timeout)
+        deadline.enter('authorize')
+        auth_response, reservation = self._authorize_purchase(
+            params['merchant'], float(params['amount']), params['category'],
+            params['intent'], params.get('metadata'), deadline
+        )
+        item.state['reservation'] = reservation
+        
+        if not auth_response.get('authorized'):
+            reason = auth_response.get('reason', 'Unknown error')
+            events.emit('purchase.authorize_denied', purchase_id=purchase_id, reason=reason,
+                        code=auth_response.get('code'), duration_ms=_elapsed_ms(step))
+            raise StageFailure(f"❌ Authorization denied: {reason}")
+        
+        events.emit('purchase.authorize_granted', purchase_id=purchase_id,
+                    authorization_id=auth_response['authorizationId'], envelope=reservation is not None,
+                    latency_ms=auth_response.get('latency', 0), duration_ms=_elapsed_ms(step))
+        item.state['auth_response'] = auth_response
+    
+    def _merchant_stage(self, item: PipelineItem) -> None:
+        """Pipeline stage 2: complete the purchase at the merchant."""
+        
+        params = item.request
+        auth_response = item.state['auth_response']
+        deadline = item.state['deadline'].enter('merchant')
+        step = time.monotonic()
+        
+        purchase_result = self._execute_merchant_purchase(
+            params['merchant'], float(params['amount']), auth_response['authorizationId'],
+            params['intent'], auth_response.get('scopedToken'), deadline
+        )
+        
+        if not purchase_result['success']:
+            self.events.emit('purchase.merchant_failed', purchase_id=item.state['purchase_id'],
+                             error=purchase_result['error'], duration_ms=_elapsed_ms(step))
+            raise StageFailure(f"❌ Purchase failed: {purchase_result['error']}")
+        
+        self.events.emit('purchase.merchant_completed', purchase_id=item.state['purchase_id'],
+                         order_id=purchase_result['order_id'], amount_charged=purchase_result['amount_charged'],
+                         duration_ms=_elapsed_ms(step))
+        if item.state['reservation'] is not None:
+            # Taxes and fees beyond the hold come out of the envelope, or the purchase fails before confirming
+            item.state['reservation'].cover(purchase_result['amount_charged'])
+        item.state['purchase_result'] = purchase_result
+    
+    def _confirm_stage(self, item: PipelineItem) -> None:
+        """Pipeline stage 3: confirm the transaction with AgentPay."""
+        
+        params = item.request
+        purchase_result = item.state['purchase_result']
+        reservation = item.state['reservation']
+        deadline = item.state['deadline'].enter('confirm')
+        step = time.monotonic()
+        
+        confirm_response = self._confirm_transaction(
+            item.state['auth_response']['authorizationId'], float(params['amount']),
+            purchase_result['transaction_details'], reservation, deadline,
+            category=params['category']
+        )
+        
+        if not confirm_response.get('success'):
+            self.events.emit('purchase.confirm_failed', purchase_id=item.state['purchase_id'],
+                             error=confirm_response.get('error', 'Unknown error'), duration_ms=_elapsed_ms(step))
+            raise StageFailure(f"❌ Transaction confirmation failed: {confirm_response.get('error')}")
+        
+        if reservation is not None:
+            reservation.commit(purchase_result['amount_charged'])
+        
+        self.events.emit('purchase.confirmed', purchase_id=item.state['purchase_id'],
+                         transaction_id=confirm_response['transactionId'],
+                         duration_ms=_elapsed_ms(step), total_ms=_elapsed_ms(item.state['started']))
+        item.state['confirm_response'] = confirm_response
+    
+    def _pipeline_response(self, item: PipelineItem) -> str:
+        """Turn a finished pipeline item into the same text _run returns."""
+        
+        reservation = item.state.get('reservation')
+        if reservation is not None:
+            reservation.release()
+        
+        error = item.error
+        if error is None:
+            return self._format_success_response(item.state['confirm_response'], item.state['purchase_result'])
+        if isinstance(error, StageFailure):
+            return str(error)
+        started = item.state.get('started')
+        self.events.emit('purchase.failed', purchase_id=item.state.get('purchase_id'), error=str(error),
+                         code=getattr(error, 'code', None),
+                         phase=error.details.get('phase') if isinstance(error, AgentPayError) else None,
+                         total_ms=_elapsed_ms(started) if started is not None else None)
+        if isinstance(error, AgentPayError) and error.code == 'DEADLINE_EXCEEDED':
+            return self._format_timeout_response(error)
+        return f"❌ Purchase flow error: {str(error)}"
+    
+    def _authorize_purchase(self, merchant: str, amount: float, category: str, 
+                          intent: str, metadata: Optional[Dict] = None,
+                          deadline: Optional[Deadline] = None) -> Tuple[Dict, Optional[Reservation]]:
+        """Authorize a purchase, drawing from a spending envelope when enabled."""
+        
+        if self.envelopes is None or not self.envelopes.covers(amount):
+            return self._request_authorization(merchant, amount, category, intent, metadata, deadline), None
+        
+        # Each purchase still answers to the per-transaction limits; its share
+        # of the daily budget was authorized with the envelope
+        denial = self.client.preflight(amount, category=category, merchant=merchant, daily=False)
+        if denial is not None:
+            return denial.as_authorization(), None
+        
+        reservation = self.envelopes.reserve(merchant, category, amount)
+        if reservation is None:
+            # No live envelope for this merchant: authorize a fresh budget
+            auth_response = self._request_authorization(
+                merchant, self.envelopes.budget, category, f"Spending envelope: {intent}",
+                {**(metadata or {}), **self.envelopes.authorization_metadata()}, deadline, envelope=True
+            )
+            if auth_response.get('authorized'):
+                reservation = self.envelopes.open(merchant, category, auth_response).reserve(amount)
+        
+        if reservation is None:
+            # Envelope denied or unusable: fall back to a single authorization
+            return self._request_authorization(merchant, amount, category, intent, metadata, deadline), None
+        
+        return {
+            'authorized': True,
+            'authorizationId': reservation.authorization_id,
+            'scopedToken': reservation.scoped_token,
+            'envelope': True
+        }, reservation
     
     def _request_authorization(self, merchant: str, amount: float, category: str, 
-                             intent: str, metadata: Optional[Dict] = None) -> Dict:
+                             intent: str, metadata: Optional[Dict] = None,
+                             deadline: Optional[Deadline] = None, envelope: bool = False) -> Dict:
         """Request spending authorization from AgentPay Control Tower."""
         
+        # Certain refusals are answered locally, in the same shape, without a round trip
+        denial = self.client.preflight(amount, category=category, merchant=merchant, per_transaction=not envelope)
+        if denial is not None:
+            return denial.as_authorization()
+        
         payload = {
             'agentToken': self.agent_token,
             'merchant': merchant,
@@ -195,77 +631,37 @@ class AgentPayTool(BaseTool):
         if metadata:
             payload['metadata'] = metadata
         
-        response = self.session.post(f'{self.api_base}/v1/authorize', json=payload)
+        response = self.client.request(
+            'POST', '/v1/authorize', json=payload,
+            idempotency_key=new_idempotency_key(), deadline=deadline
+        )
         response.raise_for_status()
         
-        return response.json()
+        auth_response = response.json()
+        if not auth_response.get('authorized'):
+            # Our cached view of the budget was wrong; refetch on the next limits read
+            self.client.limits_cache().invalidate()
+        return auth_response
     
     def _execute_merchant_purchase(self, merchant: str, amount: float, 
-                                 auth_id: str, intent: str, scoped_token: str = None) -> Dict:
+                                 auth_id: str, intent: str, scoped_token: str = None,
+                                 deadline: Optional[Deadline] = None) -> Dict:
         """
         Execute the actual purchase at the merchant.
         
-        In real implementation, this would integrate with:
+        Delegates to the tool's MerchantExecutor. A real implementation would integrate with:
         - Browser automation (Playwright, Selenium)
         - Merchant APIs (where available)
         - RPA tools for complex checkout flows
         """
         
-        # For demo purposes, simulate a realistic purchase flow
-        import time
-        import random
-        
-        # Simulate different merchant behaviors
-        merchant_configs = {
-            'doordash.com': {'processing_time': 2.0, 'failure_rate': 0.02},
-            'amazon.com': {'processing_time': 1.5, 'failure_rate': 0.01},
-            'uber.com': {'processing_time': 1.0, 'failure_rate': 0.03},
-            'default': {'processing_time': 1.5, 'failure_rate': 0.02}
-        }
-        
-        config = merchant_configs.get(merchant, merchant_configs['default'])
-        
-        # Simulate processing time
-        time.sleep(config['processing_time'])
-        
-        # Simulate occasional failures
-        if random.random() < config['failure_rate']:
-            errors = [
-                f'Merchant {merchant} is temporarily unavailable',
-                'Payment method declined by merchant',
-                'Item out of stock',
-                'Delivery not available to your area'
-            ]
-            return {
-                'success': False,
-                'error': random.choice(errors)
-            }
-        
-        # Simulate successful purchase
-        order_id = f"{merchant.split('.')[0].upper()}_{int(time.time())}_{random.randint(1000, 9999)}"
-        
-        # Add some variance to final amount (taxes, fees, etc.)
-        final_amount = amount + round(random.uniform(-0.50, 2.00), 2)
-        final_amount = max(final_amount, amount)  # Never less than authorized
-        
-        return {
-            'success': True,
-            'order_id': order_id,
-            'merchant': merchant,
-            'amount_charged': final_amount,
-            'transaction_details': {
-                'orderId': order_id,
-                'merchant': merchant,
-                'items': [intent],
-                'timestamp': time.time(),
-                'authorization_id': auth_id,
-                'scoped_token_used': bool(scoped_token),
-                'final_amount': final_amount
-            }
-        }
+        return self.merchant.execute(
+            merchant, amount, auth_id, intent, scoped_token=scoped_token, deadline=deadline
+        )
     
     def _confirm_transaction(self, authorization_id: str, final_amount: float, 
-                           transaction_details: Dict) -> Dict:
+                           transaction_details: Dict, reservation: Optional[Reservation] = None,
+                           deadline: Optional[Deadline] = None, category: Optional[str] = None) -> Dict:
         """Confirm the completed transaction with AgentPay."""
         
         payload = {
@@ -273,13 +669,107 @@ class AgentPayTool(BaseTool):
             'transactionDetails': transaction_details
         }
         
-        response = self.session.post(
-            f'{self.api_base}/v1/authorize/{authorization_id}/confirm',
-            json=payload
+        if reservation is not None:
+            # Partial capture against the envelope's scoped authorization
+            payload['scopedToken'] = reservation.scoped_token
+            payload['partial'] = True
+        
+        response = self.client.request(
+            'POST',
+            f'/v1/authorize/{authorization_id}/confirm',
+            json=payload,
+            idempotency_key=new_idempotency_key(),
+            deadline=deadline
         )
         response.raise_for_status()
         
-        return response.json()
+        confirm_response = response.json()
+        self._after_confirm(confirm_response, final_amount, transaction_details, category)
+        return confirm_response
+    
+    def _after_confirm(self, confirm_response: Dict, final_amount: float,
+                       transaction_details: Dict, category: Optional[str] = None) -> None:
+        """Keep the cached limits and the local ledger in step with a successful confirm."""
+        
+        if not confirm_response.get('success'):
+            return
+        
+        amount = confirm_response.get('amount', final_amount)
+        self.client.limits_cache().record_spend(amount)
+        
+        if self.ledger is not None:
+            self.ledger.record_purchase(
+                confirm_response.get('transactionId') or transaction_details['orderId'],
+                amount,
+                transaction_details.get('merchant'),
+                category,
+                description=', '.join(transaction_details.get('items', []))
+            )
+    
+    def _confirm_later(self, authorization_id: str, amount: float, purchase_result: Dict,
+                       reservation: Optional[Reservation] = None, category: Optional[str] = None,
+                       purchase_id: Optional[str] = None) -> Future:
+        """Queue a write-behind confirmation; the envelope hold settles when it completes."""
+        
+        order_id = purchase_result['order_id']
+        queued = time.monotonic()
+        future = self.confirmations.submit(
+            authorization_id, amount, purchase_result['transaction_details'], reservation,
+            category=category
+        )
+        self.pending_confirmations[order_id] = future
+        
+        def settle(done: Future) -> None:
+            self.pending_confirmations.pop(order_id, None)
+            confirmed = (not done.cancelled() and done.exception() is None
+                         and done.result().get('success'))
+            if confirmed:
+                self.events.emit('purchase.confirmed', purchase_id=purchase_id, order_id=order_id,
+                                 transaction_id=done.result().get('transactionId'),
+                                 duration_ms=_elapsed_ms(queued), write_behind=True)
+            else:
+                error = ('cancelled' if done.cancelled() else
+                         str(done.exception()) if done.exception() is not None else
+                         done.result().get('error', 'Unknown error'))
+                self.events.emit('purchase.confirm_failed', purchase_id=purchase_id, order_id=order_id,
+                                 error=error, duration_ms=_elapsed_ms(queued), write_behind=True)
+            if reservation is not None:
+                if confirmed:
+                    reservation.commit(purchase_result['amount_charged'])
+                else:
+                    reservation.release()
+        
+        future.add_done_callback(settle)
+        return future
+    
+    def flush_confirmations(self, timeout: Optional[float] = None) -> bool:
+        """Wait for all write-behind confirmations; True if they all finished in time."""
+        
+        return self.confirmations is None or self.confirmations.flush(timeout)
+    
+    def _format_timeout_response(self, error: AgentPayError) -> str:
+        """Report which phase of the purchase flow ran out of time."""
+        
+        phase = error.details.get('phase') or 'unknown'
+        return (f"❌ Purchase timed out during the {phase} phase "
+                f"(budget {error.details.get('budget')}s).\n\nNo further steps were attempted.")
+    
+    def _format_pending_response(self, purchase_result: Dict) -> str:
+        """Format a purchase whose AgentPay confirmation is still in flight."""
+        
+        return f"""🎉 PURCHASE COMPLETED SUCCESSFULLY!
+
+📋 ORDER SUMMARY:
+   • Merchant: {purchase_result['merchant']}
+   • Order ID: {purchase_result['order_id']}
+   • Items: {', '.join(purchase_result['transaction_details']['items'])}
+   • Order Amount: ${purchase_result['amount_charged']:.2f}
+
+💳 PAYMENT DETAILS:
+   • Confirmation with AgentPay is being processed in the background
+
+The purchase has been completed at {purchase_result['merchant']} and will be charged to your
+registered payment method once confirmation finishes."""
     
     def _format_success_response(self, confirm_response: Dict, purchase_result: Dict) -> str:
         """Format a successful purchase response for CrewAI agents."""
@@ -314,6 +804,237 @@ The purchase has been successfully completed and charged to your registered paym
 You should receive confirmation from {purchase_result['merchant']} shortly."""
 
 
+class AgentPaySpendingTool(BaseTool):
+    """
+    CrewAI tool answering "how much have we spent" from the local AgentPay ledger.
+    
+    Reads only the SQLite ledger, so crew members can check spending as often
+    as they like without an API call. Keep it fresh with ledger.sync().
+    """
+    
+    name: str = "AgentPay Spending History Tool"
+    description: str = """
+    Check how much has already been spent through AgentPay.
+    
+    Argument format: "period=today,merchant=doordash.com,category=food"
+    (all optional; period is one of today, 7d, 30d, all and defaults to today)
+    OR JSON: '{"period": "7d", "category": "food"}'
+    """
+    
+    def __init__(self, ledger: Ledger):
+        super().__init__()
+        self.ledger = ledger
+    
+    def _run(self, argument: str = '') -> str:
+        """Sum matching transactions in the local ledger."""
+        
+        try:
+            if argument.strip().startswith('{'):
+                params = json.loads(argument)
+            else:
+                params = dict(
+                    (key.strip(), value.strip())
+                    for key, value in (pair.split('=', 1) for pair in argument.split(',') if '=' in pair)
+                )
+            
+            period = params.get('period') or 'today'
+            merchant = params.get('merchant')
+            category = params.get('category')
+            total, count = self.ledger.totals(since=period, merchant=merchant, category=category)
+        except json.JSONDecodeError:
+            return "❌ Parameter error: Invalid JSON format"
+        except ValueError as e:
+            return f"❌ Spending history error: {str(e)}"
+        
+        scope = ''.join([
+            f" at {merchant}" if merchant else '',
+            f" on {category}" if category else ''
+        ])
+        window = 'in total' if period == 'all' else ('today' if period == 'today' else f"in the last {period}")
+        return f"💰 Spent {window}{scope}: ${total:.2f} across {count} transaction{'s' if count != 1 else ''}"
+
+
+class AgentPayLimitsTool(BaseTool):
+    """
+    CrewAI tool reporting the crew's spending limits and remaining budget.
+    
+    Answers come from the client's limits cache: concurrent checks from crew
+    members share one /limits request, purchases confirmed through
+    AgentPayTool are subtracted locally, and a denial forces a refetch.
+    """
+    
+    name: str = "AgentPay Spending Limits Tool"
+    description: str = """
+    Check current spending limits, today's spend and the remaining budget.
+    
+    Optionally pass an amount to check whether a purchase of that size fits:
+    "amount=25.99" OR '{"amount": 25.99}' OR just "25.99"
+    """
+    
+    def __init__(self, client: Client, max_age: Optional[float] = None):
+        super().__init__()
+        self.client = client
+        # Freshness required per check (defaults to the client's limits_ttl)
+        self.max_age = max_age
+    
+    def _run(self, argument: str = '') -> str:
+        """Report limits from the cache, fetching them only when stale."""
+        
+        try:
+            amount = self._parse_amount(argument)
+        except (ValueError, TypeError):
+            return "❌ Parameter error: amount must be a number"
+        
+        try:
+            limits = self.client.limits(max_age=self.max_age)
+        except AgentPayError as e:
+            return f"❌ Could not fetch spending limits: {str(e)}"
+        
+        return self._format_limits(limits, amount)
+    
+    def _parse_amount(self, argument: str) -> Optional[float]:
+        """Accept a bare number, amount=N or {"amount": N}; nothing means no check."""
+        
+        argument = (argument or '').strip()
+        if not argument:
+            return None
+        if argument.startswith('{'):
+            amount = json.loads(argument).get('amount')
+            return float(amount) if amount is not None else None
+        if '=' in argument:
+            argument = argument.split('=', 1)[1]
+        return float(argument.strip().lstrip('$'))
+    
+    def _format_limits(self, limits: SpendingLimits, amount: Optional[float]) -> str:
+        """Format limits for the agent, with a verdict when an amount was given."""
+        
+        def money(value: Optional[float]) -> str:
+            return 'no limit' if value is None else f"${value:.2f}"
+        
+        text = (f"Daily limit: {money(limits.daily_limit)}, Spent today: ${limits.daily_spent:.2f}, "
+                f"Remaining: {money(limits.remaining_daily)}, "
+                f"Per-transaction limit: {money(limits.per_transaction)}")
+        
+        if amount is None:
+            return text
+        if limits.allows(amount):
+            return f"✅ ${amount:.2f} fits within your limits. {text}"
+        return f"❌ ${amount:.2f} exceeds your limits. {text}"
+
+
+def _elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.monotonic() reading, for event timings."""
+    
+    return round((time.monotonic() - started) * 1000, 1)
+
+
+# Each process-pool worker builds its own tool (and pooled client) once
+_worker_tool: Optional[AgentPayTool] = None
+
+
+def _init_purchase_worker(tool_options: Dict[str, Any]) -> None:
+    """Process-pool initializer: build this worker's AgentPayTool."""
+    
+    global _worker_tool
+    merchant = tool_options.get('merchant')
+    if isinstance(merchant, SimulatedMerchant):
+        # A seeded simulator would otherwise replay the same outcomes in every worker
+        tool_options = dict(tool_options, merchant=merchant.for_worker(worker_index()))
+    _worker_tool = AgentPayTool(**tool_options)
+
+
+def _purchase_in_worker(purchase: Dict[str, Any]) -> PurchaseOutcome:
+    """Process-pool task: run one purchase on this worker's tool."""
+    
+    return _worker_tool._purchase_request(purchase)
+
+
+def _capped_charge(charged: Optional[float], held: float) -> float:
+    """Budget a charge uses: what was held if the flow didn't report one, and never more than that."""
+    
+    # Surcharges beyond the hold come out of the spending envelope, not the executor's budget
+    return held if charged is None else min(float(charged), held)
+
+
+def _outcome_charged(outcome: PurchaseOutcome, held: float) -> Union[float, Future]:
+    """Budget a finished purchase used, as its flow reported it and capped at what it held."""
+    
+    charged = outcome.charged
+    if not isinstance(charged, Future):
+        return _capped_charge(charged, held)
+    
+    capped = Future()
+    
+    def settle(done: Future) -> None:
+        if done.cancelled() or done.exception() is not None:
+            capped.set_result(held)
+        else:
+            capped.set_result(_capped_charge(done.result(), held))
+    
+    charged.add_done_callback(settle)
+    return capped
+
+
+def _refused(error: BaseException) -> bool:
+    """Whether AgentPay definitely turned a request down (HTTP 4xx), so nothing was captured."""
+    
+    if isinstance(error, AgentPayError):
+        status = error.details.get('status') if error.code == 'HTTP_ERROR' else None
+    else:
+        # raise_for_status() on the client's requests.Response
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is not None and 400 <= status < 500
+
+
+def _charged_when_confirmed(confirmation: Future, amount: float) -> Future:
+    """Future of what a write-behind purchase spent: 0 only if its confirm was cancelled or rejected."""
+    
+    charged = Future()
+    
+    def settle(done: Future) -> None:
+        if done.cancelled():
+            rejected = True
+        elif done.exception() is not None:
+            # A confirm that failed in transit may still have landed, so it keeps the charge
+            rejected = _refused(done.exception())
+        else:
+            rejected = not done.result().get('success')
+        charged.set_result(0.0 if rejected else amount)
+    
+    confirmation.add_done_callback(settle)
+    return charged
+
+
+def create_purchase_executor(agentpay_tool: AgentPayTool, max_concurrency: int = 8,
+                             budget: Optional[float] = None, processes: bool = False) -> PurchaseExecutor:
+    """
+    Create a PurchaseExecutor running purchases through agentpay_tool's flow.
+    
+    Pass the result as executor= to every agent's AgentPayTool (or set
+    tool.executor) so the whole crew shares one concurrency cap and budget.
+    
+    Args:
+        agentpay_tool: Tool whose authorize → merchant → confirm flow runs each purchase
+        max_concurrency: Purchases in flight at once across the crew
+        budget: Total the crew may spend through the executor
+        processes: Use a process pool; each worker rebuilds the tool from its
+            settings (a local ledger and write-behind confirms stay in this process,
+            and each step's events stay in the worker; submit() still reports
+            purchase.submitted / purchase.executed here)
+    """
+    
+    if processes:
+        return PurchaseExecutor(
+            _purchase_in_worker, max_concurrency=max_concurrency, budget=budget, processes=True,
+            charged=_outcome_charged, initializer=_init_purchase_worker,
+            initargs=(agentpay_tool.worker_options,)
+        )
+    return PurchaseExecutor(
+        agentpay_tool._purchase_request, max_concurrency=max_concurrency, budget=budget,
+        charged=_outcome_charged
+    )
+
+
 # CrewAI Agent Configuration
 def create_purchase_agent(agentpay_tool: AgentPayTool):
     """Create a CrewAI agent specialized in making purchases."""
@@ -340,14 +1061,19 @@ def create_purchase_agent(agentpay_tool: AgentPayTool):
         - Enterprise-grade security with scoped JWT tokens
         - Complete audit trails and spending analytics
         """,
-        tools=[agentpay_tool],
+        tools=[agentpay_tool, AgentPayLimitsTool(client=agentpay_tool.client)],
         verbose=True,
         memory=True
     )
 
 
-def create_purchase_crew():
-    """Create a complete CrewAI crew for purchase operations."""
+def create_purchase_crew(max_concurrency: int = 8, budget: Optional[float] = None):
+    """
+    Create a complete CrewAI crew for purchase operations.
+    
+    Purchases the crew makes run in parallel on a shared PurchaseExecutor,
+    at most max_concurrency at a time and within budget if one is given.
+    """
     
     from crewai import Agent, Task, Crew
     
@@ -355,6 +1081,7 @@ def create_purchase_crew():
     agentpay_tool = AgentPayTool(
         agent_token="your_agentpay_jwt_token_here"
     )
+    agentpay_tool.executor = create_purchase_executor(agentpay_tool, max_concurrency, budget)
     
     # Create purchase agent
     purchase_agent = create_purchase_agent(agentpay_tool)
@@ -390,6 +1117,9 @@ def create_purchase_crew():
         - Confirm the transaction
         - Provide receipt and confirmation
         
+        If the request contains several purchases, pass them to the tool as one
+        JSON list so they are executed in parallel.
+        
         Purchase request: {purchase_request}""",
         agent=purchase_agent,
         expected_output="Complete purchase confirmation with order details and receipt"
@@ -407,6 +1137,9 @@ def create_purchase_crew():
 if __name__ == "__main__":
     print("=== AgentPay CrewAI Integration Example ===\n")
     
+    # Show purchase progress as it happens
+    default_log.add_sink(ConsoleSink(sys.stdout))
+    
     # Example 1: Direct tool usage
     agentpay_tool = AgentPayTool(
         agent_token="your_agentpay_jwt_token_here",
@@ -418,6 +1151,7 @@ if __name__ == "__main__":
         "merchant=doordash.com,amount=24.99,category=food,intent=Order chicken burrito bowl with guacamole for lunch"
     )
     
+    default_log.flush()
     print("Direct Tool Result:")
     print(result)
     print("\n" + "="*50 + "\n")
@@ -435,6 +1169,7 @@ if __name__ == "__main__":
     })
     
     result2 = agentpay_tool._run(json_request)
+    default_log.flush()
     print("JSON Format Result:")
     print(result2)
     print("\n" + "="*50 + "\n")
@@ -477,6 +1212,6 @@ Advanced Features:
 Get started:
 1. Sign up at https://agentpay.com
 2. Get your agent JWT token
-3. Install: pip install crewai requests
+3. Install: pip install crewai agentpay
 4. Use AgentPayTool in your CrewAI agents and crews!
 """ 
\ No newline at end of file
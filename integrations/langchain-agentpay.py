@@ -6,21 +6,67 @@ This integration allows LangChain agents to use AgentPay's /v1/authorize → /co
 for secure, controlled spending across any merchant on the internet.
 
 Installation:
-    pip install langchain requests
+    pip install langchain "agentpay[async]"
 
 Usage:
     from langchain_agentpay import AgentPayTool
     
     tool = AgentPayTool(agent_token="your_jwt_token")
     result = tool.purchase("doordash.com", 25.99, "food", "Order lunch delivery")
+    
+    # Queue of purchases with authorize/merchant/confirm overlapped across items
+    for response in tool.purchase_many([{"merchant": "amazon.com", "amount": 12.0, ...}, ...]):
+        print(response)
+    
+    # Async agents get a fully non-blocking flow
+    result = await tool.arun({"merchant": "doordash.com", "amount": 25.99, ...})
+    
+    # Envelope mode: one authorization covers many small purchases at a merchant
+    tool = AgentPayTool(agent_token="your_jwt_token", envelope_budget=100.00, envelope_ttl=300)
+    
+    # Local ledger: confirmed purchases are recorded, spending questions never hit the API
+    tool = AgentPayTool(agent_token="your_jwt_token", ledger=True)
+    history_tool = AgentPaySpendingTool(ledger=tool.ledger)
+    
+    # Budget checks served from a TTL cache kept current by the tool's confirms
+    limits_tool = AgentPayLimitsTool(client=tool.client)
+    
+    # Pre-flight policy: certain refusals are answered locally before /v1/authorize
+    tool = AgentPayTool(agent_token="your_jwt_token", policy=Policy(blocked_categories={"gambling"}))
+    
+    # Concurrent calls naming the same purchase (metadata["purchase_key"]) share one flow
+    flights = SingleFlight()
+    tools = [AgentPayTool(agent_token="your_jwt_token", single_flight=flights) for _ in range(3)]
+    
+    # Worker processes sharing one token pace authorize/confirm calls through one budget
+    tool = AgentPayTool(agent_token="your_jwt_token", rate_limiter=RateLimiter(5, burst=10, key="your_jwt_token"))
+    
+    # Pluggable checkout: a seeded simulator on a virtual clock runs an agent test in milliseconds
+    tool = AgentPayTool(agent_token="your_jwt_token", merchant=SimulatedMerchant(seed=7, clock=VirtualClock()))
+    
+    # Purchase progress as structured events, written off the purchase path
+    tool = AgentPayTool(agent_token="your_jwt_token", events=EventLog([JSONLinesSink("purchases.jsonl")]))
 """
 
-import requests
 import json
-from typing import Dict, Any, Optional
+import asyncio
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Tuple, Union, Iterable, Iterator
 from langchain.tools import BaseTool
 from langchain.pydantic_v1 import BaseModel, Field
-from langchain.callbacks.manager import CallbackManagerForToolUse
+from langchain.callbacks.manager import CallbackManagerForToolUse, AsyncCallbackManagerForToolRun
+from agentpay import Client, AgentPayError, SpendingLimits, Policy, RateLimiter
+from agentpay.breaker import CircuitBreaker
+from agentpay.deadline import Deadline
+from agentpay.retry import new_idempotency_key
+from agentpay.singleflight import SingleFlight, AsyncSingleFlight, flight_key
+from agentpay.envelope import EnvelopeManager, Reservation
+from agentpay.ledger import Ledger, PERIODS
+from agentpay.pipeline import PurchasePipeline, PipelineItem, StageFailure
+from agentpay.writebehind import ConfirmationQueue
+from agentpay.merchant import MerchantExecutor, MerchantProfile, SimulatedMerchant
+from agentpay.events import EventLog, default_log
 
 
 class AgentPayInput(BaseModel):
@@ -56,16 +102,69 @@ class AgentPayTool(BaseTool):
     
     args_schema = AgentPayInput
     
-    def __init__(self, agent_token: str, api_base: str = "https://api.agentpay.org"):
+    # Processing time in seconds of the default simulated merchant
+    merchant_delay: float = 0.5
+    
+    def __init__(self, agent_token: str, api_base: str = "https://api.agentpay.org",
+                 envelope_budget: Optional[float] = None, envelope_ttl: float = 300.0,
+                 purchase_timeout: Optional[float] = 30.0, write_behind: bool = False,
+                 ledger: Union[Ledger, bool, None] = None, policy: Optional[Policy] = None,
+                 single_flight: Union[SingleFlight, bool, None] = True,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 merchant: Optional[MerchantExecutor] = None,
+                 events: Optional[EventLog] = None):
         super().__init__()
         self.agent_token = agent_token
         self.api_base = api_base.rstrip('/')
-        self.session = requests.Session()
-        self.session.headers.update({
+        # One time budget for the whole authorize → merchant → confirm flow
+        self.purchase_timeout = purchase_timeout
+        # Opt-in: confirm in the background instead of blocking the agent on /confirm
+        self.confirmations = ConfirmationQueue(self._confirm_transaction) if write_behind else None
+        self.pending_confirmations: Dict[str, Future] = {}
+        # Opt-in: authorize a budget once and draw repeat purchases from it locally
+        self.envelopes = EnvelopeManager(envelope_budget, envelope_ttl) if envelope_budget else None
+        self.headers = {
             'Authorization': f'Bearer {agent_token}',
             'Content-Type': 'application/json',
             'User-Agent': 'LangChain-AgentPay/1.0'
-        })
+        }
+        # One breaker for both transports so an outage fails fast on either path
+        self.breaker = CircuitBreaker()
+        # Concurrent calls naming the same purchase share one flow; pass one SingleFlight
+        # to several tools to deduplicate across agents
+        self.single_flight = SingleFlight() if single_flight is True else (single_flight or None)
+        self.async_single_flight = AsyncSingleFlight() if self.single_flight is not None else None
+        # Pooled clients retry transient failures under one Idempotency-Key per call
+        self.client = Client(
+            token=agent_token, base_url=self.api_base, headers=self.headers, breaker=self.breaker,
+            policy=policy, single_flight=self.single_flight, rate_limiter=rate_limiter
+        )
+        # Opt-in: record confirmed purchases locally so spending queries stay offline
+        self.ledger = Ledger(client=self.client) if ledger is True else (ledger or None)
+        # Sync-only agents never import aiohttp; see async_client
+        self._async_client = None
+        # Structured purchase events (the shared default log has no sinks until one is added)
+        self.events = events if events is not None else default_log
+        # Checkout backend; the default simulator follows merchant_delay even if it changes later
+        self.merchant = merchant or SimulatedMerchant({
+            'default': MerchantProfile(
+                latency=lambda rng: self.merchant_delay, failure_rate=0.05,
+                errors=('Merchant {merchant} temporarily unavailable',)
+            )
+        }, order_prefix='ORDER')
+    
+    @property
+    def async_client(self):
+        """Pooled aiohttp client for _arun, created on first async use."""
+        
+        if self._async_client is None:
+            from agentpay.aio import AsyncClient
+            
+            self._async_client = AsyncClient(
+                token=self.agent_token, base_url=self.api_base, headers=self.headers, breaker=self.breaker,
+                rate_limiter=self.client.rate_limiter
+            )
+        return self._async_client
     
     def _run(
         self,
@@ -78,44 +177,321 @@ class AgentPayTool(BaseTool):
     ) -> str:
         """Execute the AgentPay authorization and purchase flow."""
         
+        key = self._flight_key(merchant, amount, category, intent, metadata)
+        if self.single_flight is None or key is None:
+            return self._purchase_flow(merchant, amount, category, intent, metadata)
+        # A duplicate call (another agent, or a framework retry) waits for the running flow
+        return self.single_flight.do(key, self._purchase_flow, merchant, amount, category, intent, metadata)
+    
+    def _flight_key(self, merchant: str, amount: float, category: str, intent: str,
+                    metadata: Optional[Dict[str, Any]] = None) -> Optional[Tuple]:
+        """Single-flight key of a purchase named by metadata["purchase_key"]; None if unnamed."""
+        
+        metadata = dict(metadata or {})
+        purchase_key = metadata.pop('purchase_key', None)
+        if not purchase_key:
+            return None
+        # Same name but a different request is a different purchase
+        details = {'category': category, 'intent': intent, 'metadata': metadata}
+        return flight_key('tool', self.agent_token, merchant, amount, purchase_key, details)
+    
+    def _purchase_flow(self, merchant: str, amount: float, category: str,
+                       intent: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Run authorize → merchant → confirm for one purchase."""
+        
+        reservation = None
+        deadline = Deadline(self.purchase_timeout)
+        # Progress goes to the event log: emit() only enqueues, sinks write off-thread
+        events = self.events
+        purchase_id = new_idempotency_key()
+        started = time.monotonic()
         try:
-            # Step 1: Request Authorization from Control Tower
-            auth_response = self._request_authorization(
-                merchant, amount, category, intent, metadata
+            # Step 1: Request Authorization from Control Tower (or draw from an envelope)
+            events.emit('purchase.authorize_requested', purchase_id=purchase_id,
+                        merchant=merchant, amount=amount, category=category)
+            
+            deadline.enter('authorize')
+            step = time.monotonic()
+            auth_response, reservation = self._authorize_purchase(
+                merchant, amount, category, intent, metadata, deadline
             )
             
             if not auth_response.get('authorized'):
+                self._emit_denied(purchase_id, auth_response, step)
                 return f"❌ Authorization denied: {auth_response.get('reason', 'Unknown error')}"
             
             authorization_id = auth_response['authorizationId']
-            scoped_token = auth_response.get('scopedToken')
+            self._emit_granted(purchase_id, auth_response, reservation, step)
             
             # Step 2: Simulate the actual purchase at the merchant
             # In real implementation, this would be where the agent interacts with the merchant
+            deadline.enter('merchant')
+            step = time.monotonic()
             purchase_result = self._simulate_merchant_purchase(
-                merchant, amount, authorization_id, intent
+                merchant, amount, authorization_id, intent, deadline
             )
             
+            self._emit_merchant(purchase_id, purchase_result, step)
             if not purchase_result['success']:
                 return f"❌ Purchase failed: {purchase_result['error']}"
+            if reservation is not None:
+                # Taxes and fees beyond the hold come out of the envelope, or the purchase fails before confirming
+                reservation.cover(purchase_result['amount_charged'])
             
             # Step 3: Confirm the transaction with AgentPay
+            if self.confirmations is not None:
+                # Write-behind: hand the confirmation (and the envelope hold) to the queue
+                self._confirm_later(authorization_id, amount, purchase_result, reservation, category, purchase_id)
+                reservation = None
+                events.emit('purchase.confirm_queued', purchase_id=purchase_id,
+                            order_id=purchase_result['order_id'], total_ms=_elapsed_ms(started))
+                return self._format_pending_response(purchase_result)
+            
+            deadline.enter('confirm')
+            step = time.monotonic()
             confirm_response = self._confirm_transaction(
-                authorization_id, amount, purchase_result['transaction_details']
+                authorization_id, amount, purchase_result['transaction_details'], reservation, deadline,
+                category=category
             )
             
+            self._emit_confirm(purchase_id, confirm_response, step, started)
             if not confirm_response.get('success'):
                 return f"❌ Transaction confirmation failed: {confirm_response.get('error')}"
             
+            if reservation is not None:
+                reservation.commit(purchase_result['amount_charged'])
+            
             # Success! Return formatted result
             return self._format_success_response(confirm_response, purchase_result)
             
+        except AgentPayError as e:
+            self._emit_failed(purchase_id, e, started)
+            if e.code == 'DEADLINE_EXCEEDED':
+                return self._format_timeout_response(e)
+            return f"❌ AgentPay error: {str(e)}"
         except Exception as e:
+            self._emit_failed(purchase_id, e, started)
             return f"❌ AgentPay error: {str(e)}"
+        finally:
+            # Return held envelope funds for any purchase that didn't complete
+            if reservation is not None:
+                reservation.release()
     
-    def _request_authorization(self, merchant: str, amount: float, category: str, 
+    def purchase_many(self, purchases: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Run a queue of purchases through a pipelined authorize → merchant → confirm flow.
+        
+        Each purchase is a dict with merchant, amount, category, intent and
+        optional metadata. Consecutive purchases overlap (N is confirmed while
+        N+1 is at the merchant and N+2 is being authorized), each purchase
+        still runs its steps in order, and results are yielded in input order.
+        """
+        
+        pipeline = PurchasePipeline([
+            ('authorize', self._authorize_stage),
+            ('merchant', self._merchant_stage),
+            ('confirm', self._confirm_stage),
+        ])
+        
+        for item in pipeline.run(purchases):
+            yield self._pipeline_response(item)
+    
+    def _authorize_stage(self, item: PipelineItem) -> None:
+        """Pipeline stage 1: authorize (or draw from an envelope)."""
+        
+        params = item.request
+        missing = [key for key in ('merchant', 'amount', 'category', 'intent') if key not in params]
+        if missing:
+            raise StageFailure(f"❌ Parameter error: Missing required parameters: {', '.join(missing)}")
+        
+        purchase_id = item.state['purchase_id'] = new_idempotency_key()
+        item.state['started'] = step = time.monotonic()
+        self.events.emit('purchase.authorize_requested', purchase_id=purchase_id, merchant=params['merchant'],
+                         amount=float(params['amount']), category=params['category'], pipeline=True)
+        
+        deadline = item.state['deadline'] = Deadline(self.purchase_timeout)
+        deadline.enter('authorize')
+        auth_response, item.state['reservation'] = self._authorize_purchase(
+            params['merchant'], float(params['amount']), params['category'],
+            params['intent'], params.get('metadata'), deadline
+        )
+        
+        if not auth_response.get('authorized'):
+            self._emit_denied(purchase_id, auth_response, step)
+            raise StageFailure(f"❌ Authorization denied: {auth_response.get('reason', 'Unknown error')}")
+        
+        self._emit_granted(purchase_id, auth_response, item.state['reservation'], step)
+        item.state['auth_response'] = auth_response
+    
+    def _merchant_stage(self, item: PipelineItem) -> None:
+        """Pipeline stage 2: complete the purchase at the merchant."""
+        
+        params = item.request
+        auth_response = item.state['auth_response']
+        deadline = item.state['deadline'].enter('merchant')
+        step = time.monotonic()
+        
+        purchase_result = self._simulate_merchant_purchase(
+            params['merchant'], float(params['amount']), auth_response['authorizationId'],
+            params['intent'], deadline
+        )
+        
+        self._emit_merchant(item.state['purchase_id'], purchase_result, step)
+        if not purchase_result['success']:
+            raise StageFailure(f"❌ Purchase failed: {purchase_result['error']}")
+        if item.state['reservation'] is not None:
+            # Taxes and fees beyond the hold come out of the envelope, or the purchase fails before confirming
+            item.state['reservation'].cover(purchase_result['amount_charged'])
+        
+        item.state['purchase_result'] = purchase_result
+    
+    def _confirm_stage(self, item: PipelineItem) -> None:
+        """Pipeline stage 3: confirm the transaction with AgentPay."""
+        
+        params = item.request
+        purchase_result = item.state['purchase_result']
+        reservation = item.state['reservation']
+        deadline = item.state['deadline'].enter('confirm')
+        step = time.monotonic()
+        
+        confirm_response = self._confirm_transaction(
+            item.state['auth_response']['authorizationId'], float(params['amount']),
+            purchase_result['transaction_details'], reservation, deadline,
+            category=params['category']
+        )
+        
+        self._emit_confirm(item.state['purchase_id'], confirm_response, step, item.state['started'])
+        if not confirm_response.get('success'):
+            raise StageFailure(f"❌ Transaction confirmation failed: {confirm_response.get('error')}")
+        
+        if reservation is not None:
+            reservation.commit(purchase_result['amount_charged'])
+        
+        item.state['confirm_response'] = confirm_response
+    
+    def _pipeline_response(self, item: PipelineItem) -> str:
+        """Turn a finished pipeline item into the same text _run returns."""
+        
+        reservation = item.state.get('reservation')
+        if reservation is not None:
+            reservation.release()
+        
+        error = item.error
+        if error is None:
+            return self._format_success_response(item.state['confirm_response'], item.state['purchase_result'])
+        if isinstance(error, StageFailure):
+            return str(error)
+        self._emit_failed(item.state.get('purchase_id'), error, item.state.get('started'))
+        if isinstance(error, AgentPayError) and error.code == 'DEADLINE_EXCEEDED':
+            return self._format_timeout_response(error)
+        return f"❌ AgentPay error: {str(error)}"
+    
+    def _emit_denied(self, purchase_id: str, auth_response: Dict, step: float) -> None:
+        self.events.emit('purchase.authorize_denied', purchase_id=purchase_id,
+                         reason=auth_response.get('reason', 'Unknown error'),
+                         code=auth_response.get('code'), duration_ms=_elapsed_ms(step))
+    
+    def _emit_granted(self, purchase_id: str, auth_response: Dict,
+                      reservation: Optional[Reservation], step: float) -> None:
+        self.events.emit('purchase.authorize_granted', purchase_id=purchase_id,
+                         authorization_id=auth_response['authorizationId'], envelope=reservation is not None,
+                         latency_ms=auth_response.get('latency', 0), duration_ms=_elapsed_ms(step))
+    
+    def _emit_merchant(self, purchase_id: str, purchase_result: Dict, step: float) -> None:
+        if purchase_result['success']:
+            self.events.emit('purchase.merchant_completed', purchase_id=purchase_id,
+                             order_id=purchase_result['order_id'],
+                             amount_charged=purchase_result['amount_charged'], duration_ms=_elapsed_ms(step))
+        else:
+            self.events.emit('purchase.merchant_failed', purchase_id=purchase_id,
+                             error=purchase_result['error'], duration_ms=_elapsed_ms(step))
+    
+    def _emit_confirm(self, purchase_id: str, confirm_response: Dict, step: float, started: float) -> None:
+        if confirm_response.get('success'):
+            self.events.emit('purchase.confirmed', purchase_id=purchase_id,
+                             transaction_id=confirm_response.get('transactionId'),
+                             duration_ms=_elapsed_ms(step), total_ms=_elapsed_ms(started))
+        else:
+            self.events.emit('purchase.confirm_failed', purchase_id=purchase_id,
+                             error=confirm_response.get('error', 'Unknown error'), duration_ms=_elapsed_ms(step))
+    
+    def _emit_failed(self, purchase_id: Optional[str], error: Exception, started: Optional[float]) -> None:
+        self.events.emit('purchase.failed', purchase_id=purchase_id, error=str(error),
+                         code=getattr(error, 'code', None),
+                         phase=error.details.get('phase') if isinstance(error, AgentPayError) else None,
+                         total_ms=_elapsed_ms(started) if started is not None else None)
+    
+    def _authorize_purchase(self, merchant: str, amount: float, category: str, 
+                          intent: str, metadata: Optional[Dict] = None,
+                          deadline: Optional[Deadline] = None) -> Tuple[Dict, Optional[Reservation]]:
+        """Authorize a purchase, drawing from a spending envelope when enabled."""
+        
+        if self.envelopes is None or not self.envelopes.covers(amount):
+            return self._request_authorization(merchant, amount, category, intent, metadata, deadline), None
+        
+        # Each purchase still answers to the per-transaction limits; its share
+        # of the daily budget was authorized with the envelope
+        denial = self.client.preflight(amount, category=category, merchant=merchant, daily=False)
+        if denial is not None:
+            return denial.as_authorization(), None
+        
+        reservation = self.envelopes.reserve(merchant, category, amount)
+        if reservation is None:
+            # No live envelope for this merchant: authorize a fresh budget
+            auth_response = self._request_authorization(
+                merchant, self.envelopes.budget, category, f"Spending envelope: {intent}",
+                {**(metadata or {}), **self.envelopes.authorization_metadata()}, deadline, envelope=True
+            )
+            if auth_response.get('authorized'):
+                reservation = self.envelopes.open(merchant, category, auth_response).reserve(amount)
+        
+        if reservation is None:
+            # Envelope denied or unusable: fall back to a single authorization
+            return self._request_authorization(merchant, amount, category, intent, metadata, deadline), None
+        
+        return self._envelope_authorization(reservation), reservation
+    
+    async def _aauthorize_purchase(self, merchant: str, amount: float, category: str, 
+                                 intent: str, metadata: Optional[Dict] = None,
+                                 deadline: Optional[Deadline] = None) -> Tuple[Dict, Optional[Reservation]]:
+        """Async version of _authorize_purchase."""
+        
+        if self.envelopes is None or not self.envelopes.covers(amount):
+            return await self._arequest_authorization(merchant, amount, category, intent, metadata, deadline), None
+        
+        # Each purchase still answers to the per-transaction limits; its share
+        # of the daily budget was authorized with the envelope
+        denial = self.client.preflight(amount, category=category, merchant=merchant, daily=False)
+        if denial is not None:
+            return denial.as_authorization(), None
+        
+        reservation = self.envelopes.reserve(merchant, category, amount)
+        if reservation is None:
+            auth_response = await self._arequest_authorization(
+                merchant, self.envelopes.budget, category, f"Spending envelope: {intent}",
+                {**(metadata or {}), **self.envelopes.authorization_metadata()}, deadline, envelope=True
+            )
+            if auth_response.get('authorized'):
+                reservation = self.envelopes.open(merchant, category, auth_response).reserve(amount)
+        
+        if reservation is None:
+            return await self._arequest_authorization(merchant, amount, category, intent, metadata, deadline), None
+        
+        return self._envelope_authorization(reservation), reservation
+    
+    def _envelope_authorization(self, reservation: Reservation) -> Dict:
+        """Authorization response equivalent for a purchase drawn from an envelope."""
+        
+        return {
+            'authorized': True,
+            'authorizationId': reservation.authorization_id,
+            'scopedToken': reservation.scoped_token,
+            'envelope': True
+        }
+    
+    def _authorization_payload(self, merchant: str, amount: float, category: str, 
                              intent: str, metadata: Optional[Dict] = None) -> Dict:
-        """Request spending authorization from AgentPay Control Tower."""
+        """Build the /v1/authorize request body."""
         
         payload = {
             'agentToken': self.agent_token,
@@ -128,15 +504,59 @@ class AgentPayTool(BaseTool):
         if metadata:
             payload['metadata'] = metadata
         
-        response = self.session.post(f'{self.api_base}/v1/authorize', json=payload)
+        return payload
+    
+    def _request_authorization(self, merchant: str, amount: float, category: str, 
+                             intent: str, metadata: Optional[Dict] = None,
+                             deadline: Optional[Deadline] = None, envelope: bool = False) -> Dict:
+        """Request spending authorization from AgentPay Control Tower."""
+        
+        # Certain refusals are answered locally, in the same shape, without a round trip
+        denial = self.client.preflight(amount, category=category, merchant=merchant, per_transaction=not envelope)
+        if denial is not None:
+            return denial.as_authorization()
+        
+        payload = self._authorization_payload(merchant, amount, category, intent, metadata)
+        
+        response = self.client.request(
+            'POST', '/v1/authorize', json=payload,
+            idempotency_key=new_idempotency_key(), deadline=deadline
+        )
         response.raise_for_status()
         
-        return response.json()
+        auth_response = response.json()
+        if not auth_response.get('authorized'):
+            # Our cached view of the budget was wrong; refetch on the next limits read
+            self.client.limits_cache().invalidate()
+        return auth_response
+    
+    async def _arequest_authorization(self, merchant: str, amount: float, category: str, 
+                                    intent: str, metadata: Optional[Dict] = None,
+                                    deadline: Optional[Deadline] = None, envelope: bool = False) -> Dict:
+        """Request spending authorization without blocking the event loop."""
+        
+        denial = self.client.preflight(amount, category=category, merchant=merchant, per_transaction=not envelope)
+        if denial is not None:
+            return denial.as_authorization()
+        
+        payload = self._authorization_payload(merchant, amount, category, intent, metadata)
+        
+        response = await self.async_client.request(
+            'POST', '/v1/authorize', json=payload,
+            idempotency_key=new_idempotency_key(), deadline=deadline
+        )
+        response.raise_for_status()
+        
+        auth_response = response.json()
+        if not auth_response.get('authorized'):
+            # Our cached view of the budget was wrong; refetch on the next limits read
+            self.client.limits_cache().invalidate()
+        return auth_response
     
     def _simulate_merchant_purchase(self, merchant: str, amount: float, 
-                                  auth_id: str, intent: str) -> Dict:
+                                  auth_id: str, intent: str, deadline: Optional[Deadline] = None) -> Dict:
         """
-        Simulate the actual purchase at the merchant.
+        Complete the purchase at the merchant through the tool's MerchantExecutor.
         
         In real implementation, this would be where LangChain agents:
         - Navigate to the merchant website
@@ -145,53 +565,156 @@ class AgentPayTool(BaseTool):
         - Use the AgentPay authorization for payment
         """
         
-        # For demo purposes, simulate a successful purchase
-        import time
-        import random
+        return self.merchant.execute(merchant, amount, auth_id, intent, deadline=deadline)
+    
+    async def _asimulate_merchant_purchase(self, merchant: str, amount: float, 
+                                         auth_id: str, intent: str,
+                                         deadline: Optional[Deadline] = None) -> Dict:
+        """Async version of _simulate_merchant_purchase (waits without blocking)."""
         
-        # Simulate processing time
-        time.sleep(0.5)
+        return await self.merchant.aexecute(merchant, amount, auth_id, intent, deadline=deadline)
+    
+    def _confirmation_payload(self, final_amount: float, transaction_details: Dict,
+                            reservation: Optional[Reservation] = None) -> Dict:
+        """Build the /confirm request body."""
         
-        # Simulate occasional failures for realism
-        if random.random() < 0.05:  # 5% failure rate
-            return {
-                'success': False,
-                'error': f'Merchant {merchant} temporarily unavailable'
-            }
+        payload = {
+            'finalAmount': final_amount,
+            'transactionDetails': transaction_details
+        }
         
-        # Simulate successful purchase
-        order_id = f"ORDER_{int(time.time())}_{random.randint(1000, 9999)}"
+        if reservation is not None:
+            # Partial capture against the envelope's scoped authorization
+            payload['scopedToken'] = reservation.scoped_token
+            payload['partial'] = True
         
-        return {
-            'success': True,
-            'order_id': order_id,
-            'merchant': merchant,
-            'amount_charged': amount,
-            'transaction_details': {
-                'orderId': order_id,
-                'merchant': merchant,
-                'items': [intent],  # Simplified item list
-                'timestamp': time.time(),
-                'authorization_id': auth_id
-            }
-        }
+        return payload
     
     def _confirm_transaction(self, authorization_id: str, final_amount: float, 
-                           transaction_details: Dict) -> Dict:
+                           transaction_details: Dict, reservation: Optional[Reservation] = None,
+                           deadline: Optional[Deadline] = None, category: Optional[str] = None) -> Dict:
         """Confirm the completed transaction with AgentPay."""
         
-        payload = {
-            'finalAmount': final_amount,
-            'transactionDetails': transaction_details
-        }
+        payload = self._confirmation_payload(final_amount, transaction_details, reservation)
         
-        response = self.session.post(
-            f'{self.api_base}/v1/authorize/{authorization_id}/confirm',
-            json=payload
+        response = self.client.request(
+            'POST',
+            f'/v1/authorize/{authorization_id}/confirm',
+            json=payload,
+            idempotency_key=new_idempotency_key(),
+            deadline=deadline
         )
         response.raise_for_status()
         
-        return response.json()
+        confirm_response = response.json()
+        self._after_confirm(confirm_response, final_amount, transaction_details, category)
+        return confirm_response
+    
+    async def _aconfirm_transaction(self, authorization_id: str, final_amount: float, 
+                                  transaction_details: Dict, reservation: Optional[Reservation] = None,
+                                  deadline: Optional[Deadline] = None, category: Optional[str] = None) -> Dict:
+        """Confirm the completed transaction without blocking the event loop."""
+        
+        payload = self._confirmation_payload(final_amount, transaction_details, reservation)
+        
+        response = await self.async_client.request(
+            'POST',
+            f'/v1/authorize/{authorization_id}/confirm',
+            json=payload,
+            idempotency_key=new_idempotency_key(),
+            deadline=deadline
+        )
+        response.raise_for_status()
+        
+        confirm_response = response.json()
+        # The ledger write is a blocking SQLite call: keep it off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, self._after_confirm, confirm_response, final_amount, transaction_details, category
+        )
+        return confirm_response
+    
+    def _after_confirm(self, confirm_response: Dict, final_amount: float,
+                       transaction_details: Dict, category: Optional[str] = None) -> None:
+        """Keep the cached limits and the local ledger in step with a successful confirm."""
+        
+        if not confirm_response.get('success'):
+            return
+        
+        amount = confirm_response.get('amount', final_amount)
+        self.client.limits_cache().record_spend(amount)
+        
+        if self.ledger is not None:
+            self.ledger.record_purchase(
+                confirm_response.get('transactionId') or transaction_details['orderId'],
+                amount,
+                transaction_details.get('merchant'),
+                category,
+                description=', '.join(transaction_details.get('items', []))
+            )
+    
+    def _confirm_later(self, authorization_id: str, amount: float, purchase_result: Dict,
+                       reservation: Optional[Reservation] = None, category: Optional[str] = None,
+                       purchase_id: Optional[str] = None) -> Future:
+        """Queue a write-behind confirmation; the envelope hold settles when it completes."""
+        
+        order_id = purchase_result['order_id']
+        queued = time.monotonic()
+        future = self.confirmations.submit(
+            authorization_id, amount, purchase_result['transaction_details'], reservation,
+            category=category
+        )
+        self.pending_confirmations[order_id] = future
+        
+        def settle(done: Future) -> None:
+            self.pending_confirmations.pop(order_id, None)
+            confirmed = (not done.cancelled() and done.exception() is None
+                         and done.result().get('success'))
+            if confirmed:
+                self.events.emit('purchase.confirmed', purchase_id=purchase_id, order_id=order_id,
+                                 transaction_id=done.result().get('transactionId'),
+                                 duration_ms=_elapsed_ms(queued), write_behind=True)
+            else:
+                error = ('cancelled' if done.cancelled() else
+                         str(done.exception()) if done.exception() is not None else
+                         done.result().get('error', 'Unknown error'))
+                self.events.emit('purchase.confirm_failed', purchase_id=purchase_id, order_id=order_id,
+                                 error=error, duration_ms=_elapsed_ms(queued), write_behind=True)
+            if reservation is not None:
+                if confirmed:
+                    reservation.commit(purchase_result['amount_charged'])
+                else:
+                    reservation.release()
+        
+        future.add_done_callback(settle)
+        return future
+    
+    def flush_confirmations(self, timeout: Optional[float] = None) -> bool:
+        """Wait for all write-behind confirmations; True if they all finished in time."""
+        
+        return self.confirmations is None or self.confirmations.flush(timeout)
+    
+    def _format_timeout_response(self, error: AgentPayError) -> str:
+        """Report which phase of the purchase flow ran out of time."""
+        
+        phase = error.details.get('phase') or 'unknown'
+        return (f"❌ Purchase timed out during the {phase} phase "
+                f"(budget {error.details.get('budget')}s). No further steps were attempted.")
+    
+    def _format_pending_response(self, purchase_result: Dict) -> str:
+        """Format a purchase whose AgentPay confirmation is still in flight."""
+        
+        return f"""✅ Purchase completed successfully!
+
+🛍️ Order Details:
+   • Merchant: {purchase_result['merchant']}
+   • Order ID: {purchase_result['order_id']}
+   • Amount: ${purchase_result['amount_charged']:.2f}
+
+💳 Payment:
+   • Confirmation with AgentPay is being processed in the background
+   
+The purchase has been completed and will be charged to your payment method."""
     
     def _format_success_response(self, confirm_response: Dict, purchase_result: Dict) -> str:
         """Format a successful purchase response for LangChain."""
@@ -222,9 +745,251 @@ class AgentPayTool(BaseTool):
    
 The purchase has been completed and charged to your payment method."""
 
-    async def _arun(self, *args, **kwargs) -> str:
-        """Async version of the tool (delegates to sync version)."""
-        return self._run(*args, **kwargs)
+    async def aclose(self) -> None:
+        """Close the pooled async HTTP session."""
+        if self._async_client is not None:
+            await self._async_client.close()
+    
+    async def _arun(
+        self,
+        merchant: str,
+        amount: float,
+        category: str,
+        intent: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Execute the AgentPay flow without blocking the event loop."""
+        
+        key = self._flight_key(merchant, amount, category, intent, metadata)
+        if self.async_single_flight is None or key is None:
+            return await self._apurchase_flow(merchant, amount, category, intent, metadata)
+        return await self.async_single_flight.do(
+            key, self._apurchase_flow, merchant, amount, category, intent, metadata
+        )
+    
+    async def _apurchase_flow(self, merchant: str, amount: float, category: str,
+                              intent: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Run authorize → merchant → confirm for one purchase without blocking."""
+        
+        reservation = None
+        deadline = Deadline(self.purchase_timeout)
+        events = self.events
+        purchase_id = new_idempotency_key()
+        started = time.monotonic()
+        try:
+            # Step 1: Request Authorization from Control Tower (or draw from an envelope)
+            events.emit('purchase.authorize_requested', purchase_id=purchase_id,
+                        merchant=merchant, amount=amount, category=category)
+            
+            deadline.enter('authorize')
+            step = time.monotonic()
+            auth_response, reservation = await self._aauthorize_purchase(
+                merchant, amount, category, intent, metadata, deadline
+            )
+            
+            if not auth_response.get('authorized'):
+                self._emit_denied(purchase_id, auth_response, step)
+                return f"❌ Authorization denied: {auth_response.get('reason', 'Unknown error')}"
+            
+            authorization_id = auth_response['authorizationId']
+            self._emit_granted(purchase_id, auth_response, reservation, step)
+            
+            # Step 2: Simulate the actual purchase at the merchant
+            deadline.enter('merchant')
+            step = time.monotonic()
+            purchase_result = await self._asimulate_merchant_purchase(
+                merchant, amount, authorization_id, intent, deadline
+            )
+            
+            self._emit_merchant(purchase_id, purchase_result, step)
+            if not purchase_result['success']:
+                return f"❌ Purchase failed: {purchase_result['error']}"
+            if reservation is not None:
+                # Taxes and fees beyond the hold come out of the envelope, or the purchase fails before confirming
+                reservation.cover(purchase_result['amount_charged'])
+            
+            # Step 3: Confirm the transaction with AgentPay
+            if self.confirmations is not None:
+                # Write-behind: hand the confirmation (and the envelope hold) to the queue
+                self._confirm_later(authorization_id, amount, purchase_result, reservation, category, purchase_id)
+                reservation = None
+                events.emit('purchase.confirm_queued', purchase_id=purchase_id,
+                            order_id=purchase_result['order_id'], total_ms=_elapsed_ms(started))
+                return self._format_pending_response(purchase_result)
+            
+            deadline.enter('confirm')
+            step = time.monotonic()
+            confirm_response = await self._aconfirm_transaction(
+                authorization_id, amount, purchase_result['transaction_details'], reservation, deadline,
+                category=category
+            )
+            
+            self._emit_confirm(purchase_id, confirm_response, step, started)
+            if not confirm_response.get('success'):
+                return f"❌ Transaction confirmation failed: {confirm_response.get('error')}"
+            
+            if reservation is not None:
+                reservation.commit(purchase_result['amount_charged'])
+            
+            # Success! Return formatted result
+            return self._format_success_response(confirm_response, purchase_result)
+            
+        except AgentPayError as e:
+            self._emit_failed(purchase_id, e, started)
+            if e.code == 'DEADLINE_EXCEEDED':
+                return self._format_timeout_response(e)
+            return f"❌ AgentPay error: {str(e)}"
+        except Exception as e:
+            self._emit_failed(purchase_id, e, started)
+            return f"❌ AgentPay error: {str(e)}"
+        finally:
+            if reservation is not None:
+                reservation.release()
+
+
+def _elapsed_ms(started: float) -> float:
+    """Milliseconds since a time.monotonic() reading, for event timings."""
+    
+    return round((time.monotonic() - started) * 1000, 1)
+
+
+class SpendingHistoryInput(BaseModel):
+    """Input schema for AgentPay spending history queries."""
+    period: str = Field(default='today', description=f"Time window: {', '.join(PERIODS)}")
+    merchant: Optional[str] = Field(default=None, description="Only count this merchant (e.g., 'doordash.com')")
+    category: Optional[str] = Field(default=None, description="Only count this category (e.g., 'food')")
+
+
+class AgentPaySpendingTool(BaseTool):
+    """
+    LangChain tool answering "how much have I spent" from the local AgentPay ledger.
+    
+    Reads only the SQLite ledger, so agents can check their spending as often
+    as they like without an API call. Keep it fresh with ledger.sync().
+    """
+    
+    name = "agentpay_spending_history"
+    description = """
+    Check how much has already been spent through AgentPay.
+    
+    Parameters:
+    - period: 'today', '7d', '30d' or 'all' (default 'today')
+    - merchant: Optional merchant to filter by (e.g., 'doordash.com')
+    - category: Optional category to filter by (e.g., 'food')
+    """
+    
+    args_schema = SpendingHistoryInput
+    
+    def __init__(self, ledger: Ledger):
+        super().__init__()
+        self.ledger = ledger
+    
+    def _run(
+        self,
+        period: str = 'today',
+        merchant: Optional[str] = None,
+        category: Optional[str] = None,
+        run_manager: Optional[CallbackManagerForToolUse] = None,
+    ) -> str:
+        """Sum matching transactions in the local ledger."""
+        
+        try:
+            total, count = self.ledger.totals(since=period, merchant=merchant, category=category)
+        except ValueError as e:
+            return f"❌ Spending history error: {str(e)}"
+        
+        scope = ''.join([
+            f" at {merchant}" if merchant else '',
+            f" on {category}" if category else ''
+        ])
+        window = 'in total' if period == 'all' else ('today' if period == 'today' else f"in the last {period}")
+        return f"💰 Spent {window}{scope}: ${total:.2f} across {count} transaction{'s' if count != 1 else ''}"
+    
+    async def _arun(
+        self,
+        period: str = 'today',
+        merchant: Optional[str] = None,
+        category: Optional[str] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Ledger queries take microseconds, so the sync path is safe on the event loop."""
+        
+        return self._run(period, merchant, category)
+
+
+class LimitsInput(BaseModel):
+    """Input schema for AgentPay spending limit checks."""
+    amount: Optional[float] = Field(default=None, description="Optional amount in USD to check against the limits")
+
+
+class AgentPayLimitsTool(BaseTool):
+    """
+    LangChain tool reporting the agent's spending limits and remaining budget.
+    
+    Answers come from the client's limits cache: concurrent checks share one
+    /limits request, purchases confirmed through AgentPayTool are subtracted
+    locally, and a denial forces a refetch.
+    """
+    
+    name = "get_spending_limits"
+    description = """
+    Check current spending limits, today's spend and the remaining budget.
+    Optionally pass an amount to check whether a purchase of that size fits.
+    """
+    
+    args_schema = LimitsInput
+    
+    def __init__(self, client: Client, max_age: Optional[float] = None):
+        super().__init__()
+        self.client = client
+        # Freshness required per check (defaults to the client's limits_ttl)
+        self.max_age = max_age
+    
+    def _run(
+        self,
+        amount: Optional[float] = None,
+        run_manager: Optional[CallbackManagerForToolUse] = None,
+    ) -> str:
+        """Report limits from the cache, fetching them only when stale."""
+        
+        try:
+            limits = self.client.limits(max_age=self.max_age)
+        except AgentPayError as e:
+            return f"❌ Could not fetch spending limits: {str(e)}"
+        
+        return self._format_limits(limits, amount)
+    
+    async def _arun(
+        self,
+        amount: Optional[float] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Fresh cache hits answer inline; a refetch runs off the event loop."""
+        
+        cached = self.client.limits_cache().peek()
+        max_age = self.client.limits_ttl if self.max_age is None else self.max_age
+        if cached is not None and cached.age < max_age:
+            return self._format_limits(cached, amount)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._run, amount)
+    
+    def _format_limits(self, limits: SpendingLimits, amount: Optional[float]) -> str:
+        """Format limits for the agent, with a verdict when an amount was given."""
+        
+        def money(value: Optional[float]) -> str:
+            return 'no limit' if value is None else f"${value:.2f}"
+        
+        text = (f"Daily limit: {money(limits.daily_limit)}, Spent today: ${limits.daily_spent:.2f}, "
+                f"Remaining: {money(limits.remaining_daily)}, "
+                f"Per-transaction limit: {money(limits.per_transaction)}")
+        
+        if amount is None:
+            return text
+        if limits.allows(amount):
+            return f"✅ ${amount:.2f} fits within your limits. {text}"
+        return f"❌ ${amount:.2f} exceeds your limits. {text}"
 
 
 # Example LangChain agent using AgentPay
@@ -233,23 +998,22 @@ def create_agentpay_langchain_agent():
     Example: Create a LangChain agent with AgentPay purchasing capabilities.
     """
     
-    from langchain.agents import initialize_agent, Tool
+    from langchain.agents import initialize_agent
     from langchain.agents import AgentType
     from langchain.llms import OpenAI
     
-    # Initialize AgentPay tool
+    # Initialize AgentPay tool, recording purchases in a local ledger
     agentpay_tool = AgentPayTool(
-        agent_token="your_agentpay_jwt_token_here"
+        agent_token="your_agentpay_jwt_token_here",
+        ledger=True
     )
+    agentpay_tool.ledger.sync(max_age=300)
     
     # Create additional tools as needed
     tools = [
         agentpay_tool,
-        Tool(
-            name="get_spending_limits",
-            description="Check current spending limits and usage",
-            func=lambda x: "Daily limit: $100, Spent today: $23.45, Remaining: $76.55"
-        )
+        AgentPaySpendingTool(ledger=agentpay_tool.ledger),
+        AgentPayLimitsTool(client=agentpay_tool.client)
     ]
     
     # Initialize the LangChain agent
@@ -323,6 +1087,6 @@ Integration Benefits for LangChain Developers:
 Get started:
 1. Sign up at https://agentpay.com
 2. Get your agent JWT token
-3. Install: pip install langchain requests
+3. Install: pip install langchain "agentpay[async]"
 4. Use AgentPayTool in your LangChain agents!
 """ 
\ No newline at end of file